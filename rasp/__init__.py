@@ -21,3 +21,8 @@ class About:
     LICENSE = "MIT"
 
     DESCRIPTION = "Emulator for RASP machines"
+
+
+
+def run(program, inputs=None, max_cycles=None, ram=False):
+    return program.run(inputs, max_cycles, ram)
@@ -0,0 +1,435 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from rasp.instructions import InstructionSet
+
+
+class BasicBlock:
+
+    def __init__(self, start):
+        self.start = start
+        self.instructions = []
+        self.successors = []
+        self.predecessors = []
+
+    @property
+    def end(self):
+        return self.instructions[-1][0] + 2
+
+    @property
+    def last(self):
+        return self.instructions[-1]
+
+    def __repr__(self):
+        return f"BasicBlock({self.start}, {len(self.instructions)} instruction(s))"
+
+
+class Loop:
+
+    def __init__(self, header, body):
+        self.header = header
+        self.body = body
+        self.parent = None
+        self.children = []
+
+    @property
+    def depth(self):
+        return 1 if self.parent is None else self.parent.depth + 1
+
+    def __repr__(self):
+        return f"Loop({self.header}, {len(self.body)} block(s), depth={self.depth})"
+
+
+class ControlFlowGraph:
+
+    TAKEN = "taken"
+    FALLTHROUGH = "fallthrough"
+
+    READS = ("add", "subtract", "print")
+    WRITES = ("store", "read")
+
+
+    @staticmethod
+    def from_program(program, instructions=None):
+        from rasp.assembler import Assembler
+
+        executable = Assembler(instructions).build(program)
+        return ControlFlowGraph(executable.image, instructions=instructions)
+
+    @staticmethod
+    def from_memory(memory, instructions=None):
+        cells = [memory.peek(address) for address in range(memory.capacity)]
+        return ControlFlowGraph(cells, instructions=instructions)
+
+
+    def __init__(self, cells, entry=0, instructions=None):
+        self._cells = cells
+        self._instructions = instructions or InstructionSet.default()
+        self.entry = entry
+        self.blocks = {}
+        self._build()
+        self._dominators = None
+        self._intervals = None
+        self._loops = None
+        self._reaching = None
+        self._liveness = None
+
+
+    @property
+    def instruction_count(self):
+        return sum(len(each.instructions) for each in self.blocks.values())
+
+    @property
+    def edges(self):
+        return [(each.start, target, kind)
+                for each in self.blocks.values()
+                for target, kind in each.successors]
+
+    def block_of(self, address):
+        if address not in self._block_index:
+            raise RuntimeError(f"No instruction at address {address}")
+        return self.blocks[self._block_index[address]]
+
+    def is_code(self, address):
+        return address in self._code_cells
+
+
+    def cell(self, address):
+        if 0 <= address < len(self._cells):
+            return self._cells[address]
+        return 0
+
+    def _decode(self, address):
+        mnemonic = self._instructions.find_mnemonic(self.cell(address))
+        return address, mnemonic, self.cell(address + 1)
+
+    @staticmethod
+    def _naive_successors(instruction):
+        address, mnemonic, operand = instruction
+        if mnemonic == "halt":
+            return []
+        if mnemonic == "jump":
+            return [(operand, ControlFlowGraph.TAKEN),
+                    (address + 2, ControlFlowGraph.FALLTHROUGH)]
+        return [(address + 2, ControlFlowGraph.FALLTHROUGH)]
+
+
+    def _build(self):
+        decoded = {}
+        pending = [self.entry]
+        while pending:
+            address = pending.pop()
+            if address in decoded or address < 0:
+                continue
+            decoded[address] = self._decode(address)
+            pending += [target for target, kind in self._naive_successors(decoded[address])]
+
+        leaders = {self.entry}
+        for address, mnemonic, operand in decoded.values():
+            if mnemonic == "jump":
+                leaders.add(operand)
+                leaders.add(address + 2)
+            elif mnemonic == "halt":
+                leaders.add(address + 2)
+
+        blocks = {}
+        for leader in leaders:
+            if leader not in decoded:
+                continue
+            block = BasicBlock(leader)
+            address = leader
+            while True:
+                instruction = decoded[address]
+                block.instructions.append(instruction)
+                if instruction[1] in ("jump", "halt") or address + 2 in leaders:
+                    break
+                address += 2
+            block.successors = self._refined_successors(block)
+            blocks[leader] = block
+
+        self.blocks = self._reachable(blocks)
+        self._code_cells = set()
+        self._block_index = {}
+        for each_block in self.blocks.values():
+            for each_instruction in each_block.instructions:
+                self._code_cells.add(each_instruction[0])
+                self._code_cells.add(each_instruction[0] + 1)
+                self._block_index[each_instruction[0]] = each_block.start
+            for target, kind in each_block.successors:
+                self.blocks[target].predecessors.append(each_block.start)
+
+
+    def _refined_successors(self, block):
+        successors = self._naive_successors(block.last)
+        if block.last[1] == "jump" and len(block.instructions) > 1:
+            previous = block.instructions[-2]
+            if previous[1] == "load":
+                taken = previous[2] >= 0
+                successors = [(target, kind) for target, kind in successors
+                              if (kind == self.TAKEN) == taken]
+        return successors
+
+
+    def _reachable(self, blocks):
+        reachable = {}
+        pending = [self.entry]
+        while pending:
+            start = pending.pop()
+            if start in reachable or start not in blocks:
+                continue
+            reachable[start] = blocks[start]
+            pending += [target for target, kind in blocks[start].successors]
+        return reachable
+
+
+    def reverse_postorder(self):
+        order = []
+        visited = set()
+        stack = [(self.entry, iter(self.blocks[self.entry].successors))]
+        visited.add(self.entry)
+        while stack:
+            start, successors = stack[-1]
+            for target, kind in successors:
+                if target not in visited:
+                    visited.add(target)
+                    stack.append((target, iter(self.blocks[target].successors)))
+                    break
+            else:
+                stack.pop()
+                order.append(start)
+        order.reverse()
+        return order
+
+
+    def dominators(self):
+        if self._dominators is None:
+            order = self.reverse_postorder()
+            index = { start: position for position, start in enumerate(order) }
+            idom = { self.entry: self.entry }
+            changed = True
+            while changed:
+                changed = False
+                for start in order[1:]:
+                    candidates = [each for each in self.blocks[start].predecessors
+                                  if each in idom]
+                    new_idom = candidates[0]
+                    for other in candidates[1:]:
+                        new_idom = self._intersect(idom, index, other, new_idom)
+                    if idom.get(start) != new_idom:
+                        idom[start] = new_idom
+                        changed = True
+            self._dominators = idom
+        return self._dominators
+
+    @staticmethod
+    def _intersect(idom, index, left, right):
+        while left != right:
+            while index[left] > index[right]:
+                left = idom[left]
+            while index[right] > index[left]:
+                right = idom[right]
+        return left
+
+    def dominates(self, dominator, start):
+        if self._intervals is None:
+            self._intervals = self._number_dominator_tree()
+        return self._intervals[dominator][0] <= self._intervals[start][0] \
+            and self._intervals[start][1] <= self._intervals[dominator][1]
+
+    def _number_dominator_tree(self):
+        children = {}
+        for start, parent in self.dominators().items():
+            if start != parent:
+                children.setdefault(parent, []).append(start)
+        intervals = {}
+        counter = 0
+        stack = [(self.entry, False)]
+        while stack:
+            start, is_done = stack.pop()
+            if is_done:
+                intervals[start] = (intervals[start], counter)
+                counter += 1
+                continue
+            intervals[start] = counter
+            counter += 1
+            stack.append((start, True))
+            stack += [(child, False) for child in children.get(start, [])]
+        return intervals
+
+
+    def loops(self):
+        if self._loops is None:
+            bodies = {}
+            for source, target, kind in self.edges:
+                if self.dominates(target, source):
+                    body = bodies.setdefault(target, {target})
+                    pending = [source]
+                    while pending:
+                        start = pending.pop()
+                        if start not in body:
+                            body.add(start)
+                            pending += self.blocks[start].predecessors
+            loops = sorted((Loop(header, body) for header, body in bodies.items()),
+                           key=lambda loop: len(loop.body))
+            innermost = {}
+            for each_loop in loops:
+                for start in each_loop.body:
+                    inner = innermost.setdefault(start, each_loop)
+                    while inner.parent is not None:
+                        inner = inner.parent
+                    if inner is not each_loop:
+                        inner.parent = each_loop
+                        each_loop.children.append(inner)
+            self._loops = sorted(loops, key=lambda loop: loop.header)
+        return self._loops
+
+    def loop_depth(self, address):
+        start = self.block_of(address).start
+        return max((loop.depth for loop in self.loops() if start in loop.body),
+                   default=0)
+
+
+    def self_modifying_writes(self):
+        writes = []
+        for each_block in self.blocks.values():
+            for address, mnemonic, operand in each_block.instructions:
+                if mnemonic in self.WRITES and self.is_code(operand):
+                    writes.append((address, operand))
+        return sorted(writes)
+
+
+    def definitions(self):
+        return sorted((address, operand)
+                      for each_block in self.blocks.values()
+                      for address, mnemonic, operand in each_block.instructions
+                      if mnemonic in self.WRITES)
+
+
+    def reaching_definitions(self, start):
+        if self._reaching is None:
+            self._reaching = self._solve_reaching_definitions()
+        bits, definitions = self._reaching
+        return set(definitions[index][0] for index in self._bits(bits[start]))
+
+
+    def _solve_reaching_definitions(self):
+        definitions = self.definitions()
+        index = { address: position for position, (address, cell) in enumerate(definitions) }
+        by_cell = {}
+        for position, (address, cell) in enumerate(definitions):
+            by_cell[cell] = by_cell.get(cell, 0) | (1 << position)
+
+        gen = {}
+        kill = {}
+        for each_block in self.blocks.values():
+            generated = 0
+            killed = 0
+            for address, mnemonic, operand in each_block.instructions:
+                if mnemonic in self.WRITES:
+                    mask = by_cell[operand]
+                    killed |= mask
+                    generated = (generated & ~mask) | (1 << index[address])
+            gen[each_block.start] = generated
+            kill[each_block.start] = killed
+
+        order = self.reverse_postorder()
+        inputs = { start: 0 for start in order }
+        outputs = { start: gen[start] for start in order }
+        changed = True
+        while changed:
+            changed = False
+            for start in order:
+                incoming = 0
+                for each in self.blocks[start].predecessors:
+                    incoming |= outputs[each]
+                inputs[start] = incoming
+                outgoing = gen[start] | (incoming & ~kill[start])
+                if outgoing != outputs[start]:
+                    outputs[start] = outgoing
+                    changed = True
+        return inputs, definitions
+
+
+    def live_in(self, start):
+        return self._liveness_of(start)[0]
+
+    def live_out(self, start):
+        return self._liveness_of(start)[1]
+
+    def _liveness_of(self, start):
+        if self._liveness is None:
+            self._liveness = self._solve_liveness()
+        live_in, live_out, cells = self._liveness
+        return (set(cells[index] for index in self._bits(live_in[start])),
+                set(cells[index] for index in self._bits(live_out[start])))
+
+
+    def _solve_liveness(self):
+        cells = sorted(set(operand
+                           for each_block in self.blocks.values()
+                           for address, mnemonic, operand in each_block.instructions
+                           if mnemonic in self.READS + self.WRITES))
+        bit = { cell: 1 << position for position, cell in enumerate(cells) }
+
+        uses = {}
+        defs = {}
+        for each_block in self.blocks.values():
+            used = 0
+            defined = 0
+            for address, mnemonic, operand in each_block.instructions:
+                if mnemonic in self.READS and not defined & bit[operand]:
+                    used |= bit[operand]
+                elif mnemonic in self.WRITES:
+                    defined |= bit[operand]
+            uses[each_block.start] = used
+            defs[each_block.start] = defined
+
+        order = list(reversed(self.reverse_postorder()))
+        live_in = { start: 0 for start in order }
+        live_out = { start: 0 for start in order }
+        changed = True
+        while changed:
+            changed = False
+            for start in order:
+                outgoing = 0
+                for target, kind in self.blocks[start].successors:
+                    outgoing |= live_in[target]
+                live_out[start] = outgoing
+                incoming = uses[start] | (outgoing & ~defs[start])
+                if incoming != live_in[start]:
+                    live_in[start] = incoming
+                    changed = True
+        return live_in, live_out, cells
+
+
+    @staticmethod
+    def _bits(bitset):
+        while bitset:
+            lowest = bitset & -bitset
+            yield lowest.bit_length() - 1
+            bitset ^= lowest
+
+
+    def to_dot(self, program_map=None):
+        labels = {}
+        if program_map:
+            labels = { address: label
+                       for source, address, label in program_map.as_table() if label }
+        lines = ["digraph cfg {", '    node [shape=box, fontname="monospace"];']
+        for start in sorted(self.blocks):
+            text = "\\l".join(f"{address:>4}: {mnemonic} {operand}"
+                              for address, mnemonic, operand in self.blocks[start].instructions)
+            title = f"{labels[start]} ({start})" if start in labels else f"block {start}"
+            lines.append(f'    b{start} [label="{title}\\l{text}\\l"];')
+        for source, target, kind in self.edges:
+            style = "solid" if kind == self.TAKEN else "dashed"
+            lines.append(f'    b{source} -> b{target} [label="{kind}", style={style}];')
+        lines.append("}")
+        return "\n".join(lines) + "\n"
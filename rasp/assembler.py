@@ -11,8 +11,29 @@
 from rasp.assembly.ast import AssemblyProgram, Declaration, Operation
 from rasp.machine import InstructionSet
 
+from itertools import repeat
 
-class ProgramMap:
+
+class ModuleLookup:
+
+    @property
+    def entry_module(self):
+        if not self.modules:
+            return None
+        return self.modules[0][0]
+
+    def find_module(self, address):
+        for name, code_start, code_end, data_start, data_end in self.modules:
+            if code_start <= address < code_end or data_start <= address < data_end:
+                return name
+        return self.entry_module
+
+    def _is_in(self, address, module):
+        return not self.modules \
+            or self.find_module(address) == (module or self.entry_module)
+
+
+class ProgramMap(ModuleLookup):
 
     @staticmethod
     def read_from(stream):
@@ -42,19 +63,22 @@ class ProgramMap:
                                address,
                                each_declaration.label)
             address += each_declaration.reserved_size
+        program_map.size = address
         return program_map
 
     @staticmethod
-    def from_table(symbol_table):
-        program_map = ProgramMap()
+    def from_table(symbol_table, modules=None, size=None):
+        program_map = ProgramMap(modules, size)
         for source, address, symbol in symbol_table:
             program_map.record(source, address, symbol)
         return program_map
 
 
-    def __init__(self):
+    def __init__(self, modules=None, size=None):
         self._addresses = {}
         self._symbols = {}
+        self.modules = modules or []
+        self.size = size
 
     def record(self, source, address, symbol=None):
         entry = (source, address, symbol)
@@ -66,9 +90,9 @@ class ProgramMap:
                 raise RuntimeError(f"Duplicated symbol {symbol}.")
             self._symbols[symbol] = entry
 
-    def find_address_by_line(self, line_number):
+    def find_address_by_line(self, line_number, module=None):
         for line, address, symbol in self._addresses.values():
-            if line == line_number:
+            if line == line_number and self._is_in(address, module):
                  return address
         raise RuntimeError(f"Invalid line number {line_number}")
 
@@ -77,8 +101,8 @@ class ProgramMap:
             raise RuntimeError(f"Unknown symbol '{symbol}'")
         return self._symbols[symbol][1]
 
-    def find_source(self, address):
-        if address not in self._addresses:
+    def find_source(self, address, module=None):
+        if address not in self._addresses or not self._is_in(address, module):
             raise RuntimeError(f"Unknown address '{address}'")
         return self._addresses[address][0]
 
@@ -93,25 +117,167 @@ class Assembler:
         self._instructions = instructions or InstructionSet.default()
 
     def assemble(self, program, debug=True):
-        layout = []
-        program_map = ProgramMap.create_from(program)
+        return list(self.stream(program, debug))
 
-        layout.append(program.size)
-        for each_operation in program.code:
-            opcode = self._instructions.find_opcode(each_operation.mnemonic)
-            operand = each_operation.operand
-            if type(operand) == str:
-                operand = program_map.find_address(operand)
-            layout += [opcode, operand]
+    def build(self, program, debug=True):
+        from rasp.executable import Executable
 
-        for each_declaration in program.data:
-            layout += [each_declaration.initial_value
-                       for i in range(each_declaration.reserved_size)]
+        symbols = self._find_symbols(program)
+        deferred = DeferredStatements()
+        code = list(self._emit_code(program, symbols, deferred))
+        data = list(self._emit_data(deferred, symbols))
+        program_map = None
+        if debug:
+            program_map = ProgramMap.from_table(self._emit_debug_infos(deferred, symbols),
+                                                size=symbols.size)
+        return Executable(code, data, program_map)
 
+    def compile(self, program, debug=True, name=None):
+        from rasp.linker import ObjectFile
+
+        symbols = self._find_symbols(program)
+        imports = {}
+        relocations = []
+
+        def resolve(symbol, offset):
+            if symbols.defines(symbol):
+                relocations.append(offset)
+                return symbols.find_address(symbol)
+            imports.setdefault(symbol, []).append(offset)
+            return 0
+
+        deferred = DeferredStatements()
+        code = list(self._emit_code(program, symbols, deferred, resolve))
+        data = list(self._emit_data(deferred, symbols))
+        debug_infos = []
+        if debug:
+            debug_infos = list(self._emit_debug_infos(deferred, symbols))
+        return ObjectFile(code, data, symbols.exports, imports, relocations,
+                          debug_infos, name)
+
+    def stream(self, program, debug=True):
+        symbols = self._find_symbols(program)
+        symbols.check_references()
+        return self._emit_layout(program, symbols, debug)
+
+    def _emit_layout(self, program, symbols, debug):
+        deferred = DeferredStatements()
+        yield symbols.size
+        yield from self._emit_code(program, symbols, deferred)
+        for address, count, value in self._emit_data(deferred, symbols):
+            yield from repeat(value, count)
         if debug:
-            debug_infos = program_map.as_table()
-            layout.append(3 * len(debug_infos))
-            for source, address, label in debug_infos:
-                layout += [source, address, label or "?"]
+            yield 3 * symbols.entry_count
+            for source, address, label in self._emit_debug_infos(deferred, symbols):
+                yield from (source, address, label or "?")
+
+    def _find_symbols(self, program):
+        symbols = SymbolTable()
+        for each_statement in program.statements():
+            symbols.record(each_statement)
+        return symbols
+
+    def _emit_code(self, program, symbols, deferred, resolve=None):
+        resolve = resolve or (lambda symbol, offset: symbols.find_address(symbol))
+        address = 0
+        for each_statement in program.statements():
+            if isinstance(each_statement, Operation):
+                opcode = self._instructions.find_opcode(each_statement.mnemonic)
+                operand = each_statement.operand
+                if type(operand) == str:
+                    operand = resolve(operand, address + 1)
+                yield opcode
+                yield operand
+                deferred.code_lines.append(each_statement.location)
+                address += 2
+            else:
+                deferred.declarations.append(each_statement)
 
-        return layout
+    def _emit_data(self, deferred, symbols):
+        run = None
+        address = symbols.code_size
+        for each_declaration in deferred.declarations:
+            size = each_declaration.reserved_size
+            value = each_declaration.initial_value
+            if run and run[2] == value:
+                run = (run[0], run[1] + size, value)
+            elif size > 0:
+                if run:
+                    yield run
+                run = (address, size, value)
+            address += size
+        if run:
+            yield run
+
+    def _emit_debug_infos(self, deferred, symbols):
+        address = 0
+        for each_line in deferred.code_lines:
+            yield each_line, address, symbols.code_label_at(address)
+            address += 2
+        for each_declaration in deferred.declarations:
+            yield each_declaration.location, address, each_declaration.label
+            address += each_declaration.reserved_size
+
+
+class DeferredStatements:
+
+    def __init__(self):
+        self.declarations = []
+        self.code_lines = []
+
+
+class SymbolTable:
+
+    def __init__(self):
+        self._code_labels = {}
+        self._code_addresses = {}
+        self._data_labels = {}
+        self._references = {}
+        self.code_size = 0
+        self.data_size = 0
+        self.entry_count = 0
+
+    @property
+    def size(self):
+        return self.code_size + self.data_size
+
+    def record(self, statement):
+        if statement.label and (statement.label in self._code_labels
+                                or statement.label in self._data_labels):
+            raise RuntimeError(f"Duplicated symbol {statement.label}.")
+        if isinstance(statement, Operation):
+            if statement.label:
+                self._code_labels[statement.label] = self.code_size
+                self._code_addresses[self.code_size] = statement.label
+            if type(statement.operand) == str:
+                self._references[statement.operand] = None
+            self.code_size += 2
+        else:
+            if statement.label:
+                self._data_labels[statement.label] = self.data_size
+            self.data_size += statement.reserved_size
+        self.entry_count += 1
+
+    @property
+    def exports(self):
+        exports = dict(self._code_labels)
+        for label, offset in self._data_labels.items():
+            exports[label] = self.code_size + offset
+        return exports
+
+    def check_references(self):
+        for symbol in self._references:
+            self.find_address(symbol)
+
+    def code_label_at(self, address):
+        return self._code_addresses.get(address)
+
+    def defines(self, symbol):
+        return symbol in self._code_labels or symbol in self._data_labels
+
+    def find_address(self, symbol):
+        if symbol in self._code_labels:
+            return self._code_labels[symbol]
+        if symbol in self._data_labels:
+            return self.code_size + self._data_labels[symbol]
+        raise RuntimeError(f"Unknown symbol '{symbol}'")
@@ -58,6 +58,17 @@ class Operation:
 
 class AssemblyProgram:
 
+    @staticmethod
+    def from_statements(statements):
+        data = []
+        code = []
+        for each_statement in statements:
+            if isinstance(each_statement, Operation):
+                code.append(each_statement)
+            else:
+                data.append(each_statement)
+        return AssemblyProgram(data=data, code=code)
+
     def __init__(self, data, code):
         self.code = code
         self.data = data
@@ -67,6 +78,9 @@ class AssemblyProgram:
         return 2 * len(self.code) + sum(variable.reserved_size
                                         for variable in self.data)
 
+    def statements(self):
+        return iter(self.data + self.code)
+
     def __eq__(self, other):
         if not isinstance(other, AssemblyProgram):
             return False
@@ -0,0 +1,179 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from rasp.assembly.ast import AssemblyProgram, Operation
+
+
+class PeepholeOptimizer:
+
+    JUMP_THREADING = "jump threading"
+    REDUNDANT_LOADS = "redundant loads"
+    DEAD_CODE = "dead code"
+
+    MEMORY_ACCESSES = ("add", "subtract", "print", "read", "store")
+
+
+    def __init__(self):
+        self.report = {}
+        self.refusal = None
+        self._symbols = set()
+
+
+    @property
+    def removed_count(self):
+        return self.report.get(self.REDUNDANT_LOADS, 0) \
+            + self.report.get(self.DEAD_CODE, 0)
+
+
+    def optimize(self, program):
+        self.report = { self.JUMP_THREADING: 0,
+                        self.REDUNDANT_LOADS: 0,
+                        self.DEAD_CODE: 0 }
+        self.refusal = self._find_refusal(program)
+        if self.refusal:
+            return program
+
+        self._symbols = set(each.label for each in program.data) \
+            | set(each.label for each in program.code if each.label)
+        code = list(program.code)
+        changed = True
+        while changed:
+            changed = self._thread_jumps(code) \
+                | self._remove_redundant_loads(code) \
+                | self._remove_dead_code(code)
+        return AssemblyProgram(data=program.data, code=code)
+
+
+    def _find_refusal(self, program):
+        code_labels = set(each.label for each in program.code if each.label)
+        for each in program.code:
+            if each.mnemonic == "halt":
+                continue
+            if each.mnemonic == "load":
+                if type(each.operand) == str:
+                    return f"line {each.location} loads the address of '{each.operand}'"
+                continue
+            if type(each.operand) != str:
+                return f"line {each.location} uses the absolute address {each.operand}"
+            if each.mnemonic in self.MEMORY_ACCESSES and each.operand in code_labels:
+                return f"line {each.location} accesses the code at '{each.operand}'"
+        return None
+
+
+    def _thread_jumps(self, code):
+        changed = False
+        labels = self._index_labels(code)
+        for index, each in enumerate(code):
+            if each.mnemonic != "jump" or each.operand not in labels:
+                continue
+            target = self._final_target(code, labels, each.operand)
+            known = self._known_accumulator(code, index)
+            destination = code[labels[target]]
+            if known is not None and destination.mnemonic == "load" \
+               and destination.operand == known \
+               and labels[target] + 1 < len(code):
+                target = self._label_of(code, labels, labels[target] + 1)
+            if target != each.operand:
+                code[index] = self._copy(each, operand=target)
+                self.report[self.JUMP_THREADING] += 1
+                changed = True
+        return changed
+
+
+    def _final_target(self, code, labels, label):
+        visited = set()
+        while label in labels and label not in visited:
+            visited.add(label)
+            destination = code[labels[label]]
+            if destination.mnemonic != "jump" or destination.operand not in labels:
+                break
+            label = destination.operand
+        return label
+
+
+    def _remove_redundant_loads(self, code):
+        changed = False
+        index = 0
+        while index + 1 < len(code):
+            current, following = code[index], code[index+1]
+            if current.mnemonic == "load" and following.mnemonic == "load" \
+               and not current.label:
+                del code[index]
+                self.report[self.REDUNDANT_LOADS] += 1
+                changed = True
+                continue
+            if current.mnemonic == "store" and index + 2 < len(code):
+                after = code[index+2]
+                if following.mnemonic == "load" and following.operand == 0 \
+                   and after.mnemonic == "add" and after.operand == current.operand \
+                   and not following.label and not after.label:
+                    del code[index+1:index+3]
+                    self.report[self.REDUNDANT_LOADS] += 2
+                    changed = True
+                    continue
+            index += 1
+        return changed
+
+
+    def _remove_dead_code(self, code):
+        changed = False
+        index = 0
+        while index < len(code):
+            each = code[index]
+            if each.mnemonic == "jump" and not each.label and index + 1 < len(code) \
+               and code[index+1].label == each.operand:
+                del code[index]
+                self.report[self.DEAD_CODE] += 1
+                changed = True
+                continue
+            if each.mnemonic == "halt" or self._is_unconditional_jump(code, index):
+                while index + 1 < len(code) and not code[index+1].label:
+                    del code[index+1]
+                    self.report[self.DEAD_CODE] += 1
+                    changed = True
+            index += 1
+        return changed
+
+
+    def _is_unconditional_jump(self, code, index):
+        known = self._known_accumulator(code, index)
+        return code[index].mnemonic == "jump" and known is not None and known >= 0
+
+
+    @staticmethod
+    def _known_accumulator(code, index):
+        if index > 0 and code[index-1].mnemonic == "load" and not code[index].label \
+           and type(code[index-1].operand) == int:
+            return code[index-1].operand
+        return None
+
+
+    def _label_of(self, code, labels, index):
+        if not code[index].label:
+            label = f"{code[index-1].label}_next"
+            while label in labels or label in self._symbols:
+                label += "_"
+            code[index] = self._copy(code[index], label=label)
+            labels[label] = index
+            self._symbols.add(label)
+        return code[index].label
+
+
+    @staticmethod
+    def _index_labels(code):
+        return { each.label: index for index, each in enumerate(code) if each.label }
+
+
+    @staticmethod
+    def _copy(operation, operand=None, label=None):
+        return Operation(operation.mnemonic,
+                         operand if operand is not None else operation.operand,
+                         label or operation.label,
+                         operation.location)
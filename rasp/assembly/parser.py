@@ -11,8 +11,22 @@
 from rasp.assembly.ast import AssemblyProgram, Declaration, Operation
 
 
+class AssemblyFile:
+
+    def __init__(self, assembly_file, parser=None):
+        self._path = assembly_file
+        self._parser = parser or AssemblyParser()
+
+    def statements(self):
+        with open(self._path, "r") as source:
+            text = source.read()
+        yield from self._parser.parse_statements(text)
+
+
 class AssemblyParser:
 
+    MNEMONICS = ("halt", "load", "store", "jump", "read", "print", "add", "subtract")
+
 
     @staticmethod
     def read_file(assembly_file):
@@ -22,8 +36,38 @@ class AssemblyParser:
 
 
     def parse(self, text):
+        return AssemblyProgram.from_statements(self.parse_statements(text))
+
+
+    def parse_statements(self, text):
+        segments = []
+        statement = self._statement_grammar(segments)
+        line_number, line_start, position = 1, 0, 0
+        for tokens, start, end in statement.scanString(text):
+            expected = statement.preParse(text, position)
+            if expected != start:
+                self._fail(text, expected)
+            line_number += text.count("\n", line_start, start)
+            line_start, position = start, end
+            if isinstance(tokens[0], str):
+                if segments and segments[-1][1] == 0:
+                    self._fail(text, start)
+                segments.append([tokens[0], 0])
+                continue
+            segments[-1][1] += 1
+            tokens[0].location = line_number
+            yield tokens[0]
+        position = statement.preParse(text, position)
+        if position != len(text) or not segments or segments[-1][1] == 0:
+            self._fail(text, position)
+
+
+    def _statement_grammar(self, segments):
         import pyparsing as pp
 
+        def in_segment(kind):
+            return lambda: bool(segments) and segments[-1][0] == kind
+
         comments = pp.Suppress(";") + pp.restOfLine()
 
         identifier = pp.Word(pp.alphas, pp.alphanums + '_')
@@ -31,56 +75,48 @@ class AssemblyParser:
         integer = pp.Combine(pp.Optional(pp.Char("-+")) + pp.Word(pp.nums))\
                     .setParseAction(lambda t: int(t[0]))
 
+        data_segment = (
+            pp.Suppress("segment") + pp.Suppress(":") + pp.Keyword("data")
+        ).addCondition(lambda: not segments)
+
+        code_segment = (
+            pp.Suppress("segment") + pp.Suppress(":") + pp.Keyword("code")
+        ).addCondition(lambda: not any(kind == "code" for kind, _ in segments))
+
         declaration = (
             identifier + integer + integer
-        ).setParseAction(self._build_declaration)
+        ).setParseAction(self._build_declaration).addCondition(in_segment("data"))
 
-        data_segment = (
-            pp.Suppress("segment") + pp.Suppress(":") + pp.Literal("data") \
-            + pp.Group(pp.OneOrMore(declaration))
-        )
+        mnemonic = pp.oneOf(self.MNEMONICS, asKeyword=True)
 
-        mnemonic = pp.oneOf(("halt", "load", "store", "jump", "read",
-                             "print", "add", "subtract"))
+        label = identifier + pp.Suppress(":")
 
-        operation = (
-            pp.Optional(identifier + pp.Suppress(":")) + (mnemonic + (identifier | integer))
-        ).setParseAction(self._build_operation)
+        halt = pp.Keyword("halt") \
+            + pp.Optional(~mnemonic + ~label + identifier | integer, default=0)
 
-        code_segment = (
-            pp.Suppress("segment") + pp.Suppress(":") + pp.Literal("code")  \
-            + pp.Group(pp.OneOrMore(operation))
-        )
+        operation = (
+            pp.Optional(label) + (halt | mnemonic + (identifier | integer))
+        ).setParseAction(self._build_operation).addCondition(in_segment("code"))
 
-        program = (
-            data_segment + code_segment | data_segment | code_segment
-        ).setParseAction(self._build_program)
+        statement = data_segment | code_segment | declaration | operation
+        statement.ignore(comments)
+        return statement
 
-        program.ignore(comments)
 
-        return program.parseString(text)[0]
+    @staticmethod
+    def _fail(text, position):
+        from pyparsing import ParseException
+        raise ParseException(text, position, "Invalid statement")
 
 
-    def _build_declaration(self, source, position, tokens):
-        line_number = len(source[0:position+1].splitlines())
-        return Declaration(tokens[0], tokens[1], tokens[2], location=line_number)
+    @staticmethod
+    def _build_declaration(tokens):
+        return Declaration(tokens[0], tokens[1], tokens[2])
 
 
-    def _build_operation(self, source, position, tokens):
-        line_number = len(source[0:position+1].splitlines())
+    @staticmethod
+    def _build_operation(tokens):
         if len(tokens) == 3:
-            return Operation(tokens[1], tokens[2], tokens[0], location=line_number)
+            return Operation(tokens[1], tokens[2], tokens[0])
         else:
-            return Operation(tokens[0], tokens[1], location=line_number)
-
-
-    def _build_program(self, tokens):
-        data = []
-        code = []
-        for index in range(len(tokens)):
-            if tokens[index] == "data":
-                data = tokens[index+1].asList()
-            elif tokens[index] == "code":
-                code = tokens[index+1].asList()
-        return AssemblyProgram(data=data,
-                               code=code)
+            return Operation(tokens[0], tokens[1])
@@ -8,21 +8,9 @@
 #
 
 
-import logging
-
 from rasp import About
-from rasp.assembly.parser import AssemblyParser
-from rasp.assembler import Assembler, ProgramMap
-from rasp.debug.controller import DebugController
-from rasp.debug.core import Debugger
-from rasp.debug.view import DebugView
-from rasp.executable import Loader
-from rasp.machine import RASP, Profiler
-
-from pyparsing import ParseException
-from pathlib import Path
 
-from sys import argv, stdout
+from sys import argv, stdin, stdout
 
 
 
@@ -37,6 +25,9 @@ class Presenter:
     def syntax_error(self, error):
         self._print(f"Syntax Error.")
 
+    def assembly_error(self, error):
+        self._print(f"Error: {error}")
+
     def source_code_loaded_from(self, source):
         self._print(f"Assembly code loaded from '{source}'.")
 
@@ -54,9 +45,151 @@ class Presenter:
         self._print(f"Error: Could not read '{executable_file}'")
         self._print(f" - Use 'rasp assemble source.asm' to get an RASP executable file.")
 
+    def optimization_refused(self, reason):
+        self._print(f"Warning: Optimization skipped, as {reason}.")
+
+    def optimization_done(self, report):
+        details = ", ".join(f"{rule}: {count}" for rule, count in report.items())
+        self._print(f"Optimization: {details}.")
+
+    def object_file_created(self, object_file):
+        self._print(f"Object code written in '{object_file}'.")
+
+    def object_file_not_found(self, object_file):
+        self._print(f"Error: Could not open object file '{object_file}'")
+
+    def link_error(self, error):
+        self._print(f"Link Error: {error}.")
+
+    def analysis(self, source, graph, program_map=None):
+        locations = {}
+        if program_map:
+            locations = { address: f" (line {line}{', ' + label if label else ''})"
+                          for line, address, label in program_map.as_table() }
+        name = lambda address: f"{address}{locations.get(address, '')}"
+
+        self._print(f"Analysis of '{source}':")
+        self._print(f" - {graph.instruction_count} instruction(s) in "
+                    f"{len(graph.blocks)} basic block(s), {len(graph.edges)} edge(s)")
+        for each_loop in graph.loops():
+            indent = "  " * (each_loop.depth - 1)
+            self._print(f" - {indent}Loop at {name(each_loop.header)}, "
+                        f"depth {each_loop.depth}, {len(each_loop.body)} block(s)")
+        for address, target in graph.self_modifying_writes():
+            self._print(f" - Self-modifying write at {name(address)} into {name(target)}")
+        inputs = ", ".join(name(each) for each in sorted(graph.live_in(graph.entry)))
+        self._print(f" - Cells read before being written: {inputs or 'None'}")
+
+    def estimate(self, source, estimate):
+        self._print(f"Estimate for '{source}':")
+        if estimate.inputs:
+            self._print(f" - Inputs: {', '.join(estimate.inputs)}")
+        for each_loop in estimate.loops:
+            indent = "  " * (each_loop.loop.depth - 1)
+            iterations = f"{each_loop.iterations} iteration(s)" if each_loop.is_known \
+                else "unknown number of iterations"
+            self._print(f" - {indent}Loop {each_loop.number} at {each_loop.location}: "
+                        f"{iterations}")
+        for name, definition in estimate.definitions.items():
+            self._print(f" - where {name} = {definition}")
+        for each_index in estimate.indexes:
+            self._print(f" - where {each_index} counts the iterations "
+                        f"of loop {each_index[1:]}, from 0")
+        self._print(f" - Best case: {self._cycles(estimate.best)}")
+        self._print(f" - Worst case: {self._cycles(estimate.worst)}")
+        for each_reason in estimate.reasons:
+            self._print(f"   Unknown bound: {each_reason}.")
+
+    @staticmethod
+    def _cycles(bound):
+        return "unknown" if bound is None else f"{bound} cycle(s)"
+
+    def listing(self, source_lines, listing):
+        annotations = { line: (cost, depth) for line, cost, depth in listing }
+        self._print("")
+        self._print(f"{'Line':>5} {'Cost':>5} {'Depth':>5}  Source")
+        for number, text in enumerate(source_lines, 1):
+            cost, depth = "", ""
+            if number in annotations:
+                cost, depth = annotations[number]
+                depth = "dead" if depth is None else depth
+            self._print(f"{number:>5} {cost:>5} {depth:>5}  {text}")
+
+    def coverage_saved(self, coverage_file):
+        self._print(f"Coverage written in '{coverage_file}'.")
+
+    def missing_debug_infos(self, executable_file):
+        self._print(f"Error: '{executable_file}' has no debugging information")
+        self._print(f" - Use 'rasp assemble --debug source.asm' to include it.")
+
+    def timeline_created(self, timeline_file):
+        self._print(f"Timeline written in '{timeline_file}'.")
+
+    def dot_file_created(self, dot_file):
+        self._print(f"Control-flow graph written in '{dot_file}'.")
+
+    def script_results(self, records):
+        import json
+        self._print(json.dumps(records, indent=2))
+
+    def script_not_found(self, script_file):
+        self._print(f"Error: Could not open debugger script '{script_file}'")
+
     def source_not_found(self, source_file):
         self._print(f"Error: Could not open assembly file '{source_file}'")
 
+    def test_result(self, result):
+        self._print(f" - {result.scenario} / {result.name}: "
+                    f"{result.status.upper()} ({result.cycles} cycles)")
+        if result.message:
+            self._print(f"   {result.message}")
+
+    def test_summary(self, results):
+        passed = sum(1 for each in results if each.is_success)
+        self._print(f"{passed} / {len(results)} test(s) passed.")
+
+    def junit_report_created(self, report_file):
+        self._print(f"JUnit report written in '{report_file}'.")
+
+    def fuzz_mismatch(self, mismatch):
+        self._print(f" - Seed {mismatch.case.seed}: '{mismatch.engine}' disagrees with the reference")
+        for field, expected, found in mismatch.differences:
+            self._print(f"   {field}: expected {expected}, but found {found}")
+        self._print(f"   Reproducer: {mismatch.case.to_json()}")
+
+    def fuzz_summary(self, runs, mismatches):
+        self._print(f"{runs - len(mismatches)} / {runs} random program(s) agreed.")
+
+    def fuzz_error(self, error):
+        self._print(f"Error: {error}")
+
+    def server_started(self, socket_path, workers):
+        self._print(f"Serving on '{socket_path}' with {workers} worker(s). Press Ctrl+C to stop.")
+
+    def server_unavailable(self, socket_path):
+        self._print(f"Error: No RASP server is listening on '{socket_path}'")
+        self._print(f" - Use 'rasp serve --socket {socket_path}' to start one.")
+
+    def server_options_ignored(self):
+        self._print("Error: The server only runs RASP machines, without profiling, tracing,")
+        self._print("       coverage or memory-mapping.")
+
+    def memory_not_mapped(self, memory_file):
+        self._print(f"Error: Could not map the memory onto '{memory_file or 'a temporary file'}'")
+
+    def output(self, value):
+        self._print(str(value))
+
+    def cycle_budget_exhausted(self, executable_file, cycles):
+        self._print(f"Error: '{executable_file}' did not halt within {cycles} cycles")
+
+    def scenarios_not_found(self, directory):
+        self._print(f"Error: Could not find scenarios in '{directory}'")
+
+    def missing_extra(self, module, extra):
+        self._print(f"Error: Could not import '{module}'")
+        self._print(f" - Use 'pip install rasp-machine[{extra}]' to install it.")
+
     def version(self):
         self._print(f"{About.NAME} {About.VERSION} -- {About.DESCRIPTION}")
         self._print(f"{About.COPYRIGHT}")
@@ -69,6 +202,10 @@ class ErrorCodes:
     EXECUTABLE_NOT_FOUND = 2
     SYNTAX_ERROR = 3
     UNKNOWN_ERROR = 4
+    LINK_ERROR = 5
+    MISSING_DEBUG_INFOS = 6
+    TEST_FAILURE = 7
+    SERVER_UNAVAILABLE = 8
 
 
 class Controller:
@@ -77,32 +214,69 @@ class Controller:
     DEBUG = 2
     EXECUTE = 3
     VERSION = 4
+    LINK = 5
+    ANALYZE = 6
+    ESTIMATE = 7
+    TEST = 8
+    FUZZ = 9
+    SERVE = 10
 
-    def __init__(self, output=None):
+    def __init__(self, output=None, log_file=None):
         self._present = Presenter(output)
-        self._assembler = Assembler()
-        self._load = Loader()
-        self._assembly = AssemblyParser
+        self._log_file = log_file
+
+    def _log_error(self, error):
+        import logging
+        if self._log_file and not logging.getLogger().handlers:
+            logging.basicConfig(filename=self._log_file, level=logging.INFO)
+        logging.error(error)
 
 
-    def assemble(self, assembly_file, include_debug, output_file):
+    def assemble(self, assembly_file, include_debug, output_file,
+                 file_format="text", compile_only=False, optimize=False):
+        from pyparsing import ParseException
+        from rasp.assembler import Assembler
+        from rasp.assembly.parser import AssemblyFile
+        from rasp.executable import Loader
+        from pathlib import Path
+
+        assembler = Assembler()
         try:
-            program = self._assembly.read_file(assembly_file)
+            program = AssemblyFile(assembly_file)
+            if optimize:
+                program = self._optimize(program)
+            if compile_only:
+                module = assembler.compile(program, include_debug,
+                                           Path(assembly_file).stem)
+            elif file_format == Loader.BINARY:
+                executable = assembler.build(program, include_debug)
+            else:
+                layout = assembler.stream(program, include_debug)
 
         except ParseException as error:
             self._present.syntax_error(error)
             return ErrorCodes.SYNTAX_ERROR
 
+        except RuntimeError as error:
+            self._present.assembly_error(error)
+            return ErrorCodes.SYNTAX_ERROR
+
         except FileNotFoundError as error:
             self._present.source_not_found(assembly_file)
             return ErrorCodes.SOURCE_NOT_FOUND
 
         try:
-            executable = self._assembler.assemble(program, include_debug)
-            output = Path(assembly_file).with_suffix(".rx")
+            output = Path(assembly_file).with_suffix(".ro" if compile_only else ".rx")
             if output_file:
                 output = Path(output_file)
-            self._load.save_as(executable, output)
+            if compile_only:
+                module.save_as(output)
+                self._present.object_file_created(str(output))
+                return ErrorCodes.OK
+            if file_format == Loader.BINARY:
+                Loader().save_as(executable, output, file_format)
+            else:
+                Loader().save_layout(layout, output)
             self._present.executable_created(str(output))
             return ErrorCodes.OK
 
@@ -111,13 +285,145 @@ class Controller:
             return ErrorCodes.EXECUTABLE_NOT_FOUND
 
 
-    def debug(self, executable_file, source_file=None):
+    def _optimize(self, program):
+        from rasp.assembly.ast import AssemblyProgram
+        from rasp.assembly.optimizer import PeepholeOptimizer
+
+        optimizer = PeepholeOptimizer()
+        program = AssemblyProgram.from_statements(program.statements())
+        program = optimizer.optimize(program)
+        if optimizer.refusal:
+            self._present.optimization_refused(optimizer.refusal)
+        else:
+            self._present.optimization_done(optimizer.report)
+        return program
+
+
+    def link(self, object_files, include_debug, output_file,
+             file_format="text"):
+        from rasp.executable import Loader
+        from rasp.linker import Linker, ObjectFile
+        from pathlib import Path
+
+        modules = []
+        for each_file in object_files:
+            try:
+                modules.append(ObjectFile.read_from(each_file))
+            except FileNotFoundError as error:
+                self._present.object_file_not_found(each_file)
+                return ErrorCodes.SOURCE_NOT_FOUND
+
+        try:
+            executable = Linker().link(modules, include_debug)
+        except RuntimeError as error:
+            self._present.link_error(error)
+            return ErrorCodes.LINK_ERROR
+
+        output = Path(object_files[0]).with_suffix(".rx")
+        if output_file:
+            output = Path(output_file)
+        try:
+            Loader().save_as(executable, output, file_format)
+            self._present.executable_created(str(output))
+            return ErrorCodes.OK
+
+        except FileNotFoundError as error:
+            self._present.executable_not_found(str(output))
+            return ErrorCodes.EXECUTABLE_NOT_FOUND
+
+
+    def analyze(self, program_file, dot_file=None):
+        from pyparsing import ParseException
+        from rasp.analysis import ControlFlowGraph
+        from rasp.assembler import Assembler
+        from rasp.assembly.ast import AssemblyProgram
+        from rasp.assembly.parser import AssemblyFile
+        from rasp.executable import Loader
+        from rasp.machine import RASP
+        from pathlib import Path
+
+        try:
+            if Path(program_file).suffix == ".asm":
+                statements = AssemblyFile(program_file).statements()
+                program = AssemblyProgram.from_statements(statements)
+                program_map = Assembler().build(program).debug_infos
+                graph = ControlFlowGraph.from_program(program)
+            else:
+                machine = RASP()
+                program_map = Loader().from_file(machine.memory, program_file)
+                graph = ControlFlowGraph.from_memory(machine.memory)
+
+        except ParseException as error:
+            self._present.syntax_error(error)
+            return ErrorCodes.SYNTAX_ERROR
+
+        except RuntimeError as error:
+            self._present.assembly_error(error)
+            return ErrorCodes.SYNTAX_ERROR
+
+        except FileNotFoundError as error:
+            self._present.source_not_found(program_file)
+            return ErrorCodes.SOURCE_NOT_FOUND
+
+        self._present.analysis(program_file, graph, program_map)
+        if dot_file:
+            Path(dot_file).write_text(graph.to_dot(program_map))
+            self._present.dot_file_created(dot_file)
+        return ErrorCodes.OK
+
+
+    def estimate(self, assembly_file, with_listing=True):
+        from pyparsing import ParseException
+        from rasp.assembly.ast import AssemblyProgram
+        from rasp.assembly.parser import AssemblyFile
+        from rasp.estimation import CycleEstimator
+        from pathlib import Path
+
+        try:
+            statements = AssemblyFile(assembly_file).statements()
+            program = AssemblyProgram.from_statements(statements)
+            estimate = CycleEstimator.from_program(program).estimate()
+            source_lines = Path(assembly_file).read_text().splitlines()
+
+        except ParseException as error:
+            self._present.syntax_error(error)
+            return ErrorCodes.SYNTAX_ERROR
+
+        except RuntimeError as error:
+            self._present.assembly_error(error)
+            return ErrorCodes.SYNTAX_ERROR
+
+        except FileNotFoundError as error:
+            self._present.source_not_found(assembly_file)
+            return ErrorCodes.SOURCE_NOT_FOUND
+
+        self._present.estimate(assembly_file, estimate)
+        if with_listing:
+            self._present.listing(source_lines, estimate.listing)
+        return ErrorCodes.OK
+
+
+    def debug(self, executable_file, source_file=None, history_size=1000000, dap=None,
+              script_file=None):
+        if dap:
+            return self._serve_debug_adapter(executable_file, source_file,
+                                             history_size, dap)
+        if script_file:
+            return self._run_debugger_script(executable_file, source_file,
+                                             history_size, script_file)
+        from rasp.debug.controller import DebugController
+        from rasp.debug.core import Debugger
+        from rasp.debug.view import DebugView
+        from rasp.executable import Loader
+        from rasp.machine import RASP
+
         source_code = self._load_source_code(executable_file, source_file)
         try:
             view = DebugView()
             machine = RASP(input_device=view, output_device=view)
-            debug_infos = self._load.from_file(machine.memory, executable_file)
-            debugger = Debugger(machine, view, debug_infos, source_code)
+            debug_infos = Loader().from_file(machine.memory, executable_file)
+            debugger = Debugger(machine, view, debug_infos, source_code,
+                                history_size)
             session = DebugController(debugger, view)
             session.start()
             return ErrorCodes.OK
@@ -128,7 +434,63 @@ class Controller:
 
 
 
+    def _run_debugger_script(self, executable_file, source_file, history_size,
+                             script_file):
+        from rasp.debug.script import run_script
+
+        source_code, source_path = self._find_source_code(executable_file, source_file)
+        try:
+            with open(script_file, "r") as script:
+                commands = script.read().splitlines()
+        except FileNotFoundError:
+            self._present.script_not_found(script_file)
+            return ErrorCodes.SOURCE_NOT_FOUND
+        try:
+            records = run_script(executable_file, commands, source_code,
+                                 (line for line in stdin if line.strip()),
+                                 history_size)
+            self._present.script_results(records)
+            return ErrorCodes.OK
+
+        except FileNotFoundError as error:
+            self._present.executable_not_found(executable_file)
+            return ErrorCodes.EXECUTABLE_NOT_FOUND
+
+    @staticmethod
+    def _find_source_code(executable_file, source_file):
+        from pathlib import Path
+
+        source = Path(source_file or Path(executable_file).with_suffix(".asm"))
+        if not source.exists():
+            return None, None
+        return source.read_text(), str(source.resolve())
+
+    def _serve_debug_adapter(self, executable_file, source_file, history_size, dap):
+        from rasp.debug.core import Debugger
+        from rasp.debug.dap import AdapterView, DebugAdapter, serve_on
+        from rasp.executable import Loader
+        from rasp.machine import RASP
+
+        source_code, source_path = self._find_source_code(executable_file, source_file)
+        try:
+            view = AdapterView()
+            machine = RASP(input_device=view, output_device=view)
+            debug_infos = Loader().from_file(machine.memory, executable_file)
+            debugger = Debugger(machine, view, debug_infos, source_code, history_size)
+            adapter = DebugAdapter(debugger, machine, view, debug_infos, source_path)
+            if dap == "stdio":
+                adapter.serve(stdin.buffer, stdout.buffer)
+            else:
+                serve_on(int(dap), adapter)
+            return ErrorCodes.OK
+
+        except FileNotFoundError as error:
+            self._present.executable_not_found(executable_file)
+            return ErrorCodes.EXECUTABLE_NOT_FOUND
+
     def _load_source_code(self, executable_file, source_file):
+        from pathlib import Path
+
         source = Path(executable_file).with_suffix(".asm")
         if source_file:
             source = Path(source_file)
@@ -143,32 +505,244 @@ class Controller:
             self._present.missing_source_code()
 
 
-    def execute(self, executable_file, use_profiler=False):
-        machine = RASP()
-        if use_profiler:
-            profiler = Profiler()
-            machine.cpu.attach(profiler)
-            machine.memory.attach(profiler)
+    def execute(self, executable_file, use_profiler=False, timeline_file=None,
+                bucket=1000, tracked_cells=None, coverage_file=None,
+                server=None, max_cycles=None, memory_file=None, memory_size=None,
+                ram=False):
+        if server:
+            if use_profiler or timeline_file or coverage_file or memory_file or memory_size \
+               or ram:
+                self._present.server_options_ignored()
+                return ErrorCodes.UNKNOWN_ERROR
+            return self._execute_on(server, executable_file, max_cycles)
+
+        from rasp.executable import Loader
+        from rasp.machine import InputDevice, MappedMemory, Memory, OutputDevice, RASP, Profiler
+
+        if memory_file or memory_size:
+            try:
+                memory = MappedMemory(memory_size or 1000, memory_file)
+            except OSError as error:
+                self._present.memory_not_mapped(memory_file)
+                self._log_error(error)
+                return ErrorCodes.UNKNOWN_ERROR
+        else:
+            memory = Memory()
 
         try:
-            with open(executable_file, "r") as code:
-                self._load.from_stream(machine.memory, code)
-                machine.run()
-                if use_profiler:
-                    data_file = Path(executable_file).with_suffix(".perf")
-                    profiler.save_results_as(data_file)
-                return ErrorCodes.OK
+            with_debug_infos = timeline_file is not None or coverage_file is not None
+            if ram:
+                from rasp.program import Program
+
+                program = Program.from_file(executable_file, with_debug_infos)
+                program_map = program.program_map
+                machine = program.instantiate(input_device=InputDevice(),
+                                              output_device=OutputDevice(),
+                                              memory=memory,
+                                              ram=True)
+            else:
+                machine = RASP(memory=memory)
+                program_map = Loader().from_file(machine.memory, executable_file,
+                                                 with_debug_infos=with_debug_infos)
+            if use_profiler:
+                profiler = Profiler()
+                machine.cpu.attach(profiler)
+                machine.memory.attach(profiler)
+            if coverage_file:
+                if program_map is None:
+                    self._present.missing_debug_infos(executable_file)
+                    return ErrorCodes.MISSING_DEBUG_INFOS
+                from rasp.coverage import Coverage, CoverageRecorder
+
+                image = [machine.memory.peek(address)
+                         for address in range(machine.memory.capacity)]
+                recorder = CoverageRecorder(machine)
+                machine.cpu.attach(recorder)
+            if timeline_file:
+                from rasp.timeline import Timeline
+
+                with open(timeline_file, "w") as destination:
+                    cells = self._find_cells(program_map, tracked_cells or [])
+                    timeline = Timeline(destination, machine, program_map, cells, bucket)
+                    timeline.attach()
+                    try:
+                        is_halted = self._run(machine, max_cycles)
+                    finally:
+                        timeline.close()
+                self._present.timeline_created(timeline_file)
+            else:
+                is_halted = self._run(machine, max_cycles)
+            if use_profiler:
+                from pathlib import Path
+
+                data_file = Path(executable_file).with_suffix(".perf")
+                profiler.save_results_as(data_file)
+            if coverage_file:
+                from pathlib import Path
+
+                source = str(Path(executable_file).with_suffix(".asm").resolve())
+                coverage = Coverage()
+                coverage.add_run(source, recorder, program_map, image)
+                coverage.add_to(coverage_file)
+                self._present.coverage_saved(coverage_file)
+            if not is_halted:
+                self._present.cycle_budget_exhausted(executable_file, max_cycles)
+                return ErrorCodes.UNKNOWN_ERROR
+            return ErrorCodes.OK
 
         except FileNotFoundError as error:
             self._present.executable_not_found(executable_file)
-            logging.error(error)
+            self._log_error(error)
             return ErrorCodes.EXECUTABLE_NOT_FOUND
 
         except Exception as error:
             self._present.execution_failed(executable_file)
-            logging.error(error)
+            self._log_error(error)
             return ErrorCodes.UNKNOWN_ERROR
 
+        finally:
+            if memory_file or memory_size:
+                memory.close()
+
+    @staticmethod
+    def _run(machine, max_cycles):
+        from rasp.machine import RAM
+
+        if max_cycles is None:
+            machine.run()
+            return True
+        if isinstance(machine, RAM):
+            machine.run(max_cycles)
+            return machine.is_stopped
+        for each_cycle in range(max_cycles):
+            if machine.is_stopped:
+                return True
+            machine.run_one_cycle()
+        return machine.is_stopped
+
+    def _execute_on(self, server, executable_file, max_cycles):
+        from rasp.server import Client
+
+        try:
+            inputs = (int(line) for line in stdin if line.strip())
+            result = Client(server).execute(executable_file, inputs, max_cycles,
+                                            self._present.output)
+
+        except FileNotFoundError as error:
+            self._present.executable_not_found(executable_file)
+            return ErrorCodes.EXECUTABLE_NOT_FOUND
+
+        except ConnectionError as error:
+            self._present.server_unavailable(server)
+            return ErrorCodes.SERVER_UNAVAILABLE
+
+        except Exception as error:
+            self._present.execution_failed(executable_file)
+            self._log_error(error)
+            return ErrorCodes.UNKNOWN_ERROR
+
+        if result["status"] == "timeout":
+            self._present.cycle_budget_exhausted(executable_file, result["cycles"])
+            return ErrorCodes.UNKNOWN_ERROR
+        if result["status"] == "error":
+            self._present.execution_failed(executable_file)
+            self._log_error(result["message"])
+            return ErrorCodes.UNKNOWN_ERROR
+        return ErrorCodes.OK
+
+    @staticmethod
+    def _find_cells(program_map, tracked_cells):
+        cells = {}
+        for each in tracked_cells:
+            if each.isdigit():
+                cells[f"memory[{each}]"] = int(each)
+            elif program_map is None:
+                raise RuntimeError(f"Cannot track '{each}' without debug information")
+            else:
+                cells[each] = program_map.find_address(each)
+        return cells
+
+
+    def test(self, directory, jobs=1, max_cycles=None, junit_file=None, cache_directory=None,
+             coverage_file=None):
+        from rasp.coverage import Coverage
+        from rasp.testing import ImageCache, JUnitReport, ScenarioLibrary, TestRunner
+
+        try:
+            scenarios = ScenarioLibrary(directory).all()
+            coverage = Coverage() if coverage_file else None
+            runner = TestRunner(ImageCache(cache_directory), jobs, max_cycles, coverage)
+            results = runner.run(scenarios)
+
+        except FileNotFoundError as error:
+            self._present.scenarios_not_found(directory)
+            return ErrorCodes.SOURCE_NOT_FOUND
+
+        except ImportError as error:
+            self._present.missing_extra(error.name, "test")
+            return ErrorCodes.UNKNOWN_ERROR
+
+        except Exception as error:
+            self._present.execution_failed(directory)
+            self._log_error(error)
+            return ErrorCodes.UNKNOWN_ERROR
+
+        for each_result in results:
+            self._present.test_result(each_result)
+        self._present.test_summary(results)
+        if junit_file:
+            JUnitReport(results).save_as(junit_file)
+            self._present.junit_report_created(junit_file)
+        if coverage_file:
+            coverage.add_to(coverage_file)
+            self._present.coverage_saved(coverage_file)
+        if not all(each.is_success for each in results):
+            return ErrorCodes.TEST_FAILURE
+        return ErrorCodes.OK
+
+
+    def fuzz(self, seed=0, runs=1000, engines=None, max_cycles=10000, jobs=1,
+             reproducer_file=None):
+        from rasp.fuzz import fuzz
+
+        try:
+            mismatches = fuzz(seed, runs, engines, max_cycles, jobs)
+
+        except RuntimeError as error:
+            self._present.fuzz_error(error)
+            return ErrorCodes.UNKNOWN_ERROR
+
+        for each_mismatch in mismatches:
+            self._present.fuzz_mismatch(each_mismatch)
+        self._present.fuzz_summary(runs, mismatches)
+        if reproducer_file:
+            with open(reproducer_file, "w") as reproducers:
+                for each_mismatch in mismatches:
+                    reproducers.write(each_mismatch.case.to_json() + "\n")
+        if mismatches:
+            return ErrorCodes.TEST_FAILURE
+        return ErrorCodes.OK
+
+
+    def serve(self, socket_path, workers=1, max_cycles=1000000):
+        from rasp.server import JobServer
+
+        try:
+            server = JobServer(socket_path, workers, max_cycles)
+        except OSError as error:
+            self._present.server_unavailable(socket_path)
+            self._log_error(error)
+            return ErrorCodes.SERVER_UNAVAILABLE
+
+        self._present.server_started(socket_path, workers)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return ErrorCodes.OK
+
 
     def version(self):
         self._present.version()
@@ -180,15 +754,65 @@ class Controller:
         if arguments.command == Controller.ASSEMBLE:
             return self.assemble(arguments.assembly_file,
                                  arguments.debug,
-                                 arguments.output)
+                                 arguments.output,
+                                 arguments.format,
+                                 arguments.compile_only,
+                                 arguments.optimize)
+
+        if arguments.command == Controller.LINK:
+            return self.link(arguments.object_files,
+                             arguments.debug,
+                             arguments.output,
+                             arguments.format)
+
+        if arguments.command == Controller.ANALYZE:
+            return self.analyze(arguments.program_file,
+                                arguments.dot)
+
+        if arguments.command == Controller.ESTIMATE:
+            return self.estimate(arguments.assembly_file,
+                                 not arguments.no_listing)
 
         if arguments.command == Controller.EXECUTE:
             return self.execute(arguments.executable_file,
-                                arguments.use_profiler)
+                                arguments.use_profiler,
+                                arguments.timeline,
+                                arguments.bucket,
+                                arguments.track,
+                                arguments.coverage,
+                                arguments.server,
+                                arguments.max_cycles,
+                                arguments.memory_file,
+                                arguments.memory_size,
+                                arguments.ram)
 
         if arguments.command == Controller.DEBUG:
            return self.debug(arguments.executable_file,
-                             arguments.asm_source)
+                             arguments.asm_source,
+                             arguments.history_size,
+                             arguments.dap,
+                             arguments.script)
+
+        if arguments.command == Controller.TEST:
+            return self.test(arguments.directory,
+                             arguments.jobs,
+                             arguments.max_cycles,
+                             arguments.junit,
+                             arguments.cache,
+                             arguments.coverage)
+
+        if arguments.command == Controller.FUZZ:
+            return self.fuzz(arguments.seed,
+                             arguments.runs,
+                             arguments.engine,
+                             arguments.max_cycles,
+                             arguments.jobs,
+                             arguments.save)
+
+        if arguments.command == Controller.SERVE:
+            return self.serve(arguments.socket,
+                              arguments.workers,
+                              arguments.max_cycles)
 
         if arguments.command == Controller.VERSION:
             return self.version()
@@ -197,6 +821,7 @@ class Controller:
     @staticmethod
     def _parse(command_line):
         from argparse import ArgumentParser
+        from rasp.executable import Loader
 
         parser = ArgumentParser(
             prog=About.CLI_PROGRAM,
@@ -212,16 +837,55 @@ class Controller:
         assembler.add_argument("--output", "-o",
                                metavar="EXE_FILE",
                                help="Name of the executable file to generate")
+        assembler.add_argument("--format", "-f",
+                               choices=[Loader.TEXT, Loader.BINARY],
+                               default=Loader.TEXT,
+                               help="Format of the executable file (default: text)")
+        assembler.add_argument("--optimize", "-O",
+                               help="Run the peephole optimizer before assembling",
+                               action="store_true")
+        assembler.add_argument("--compile-only", "-c",
+                               help="Produce a relocatable object file to link later",
+                               action="store_true")
         assembler.add_argument("assembly_file",
                                metavar="FILE",
                                help="The RASP assembly file to compile to machine code")
         assembler.set_defaults(command=Controller.ASSEMBLE)
 
+        linker = subparsers.add_parser("link",
+                                       help="link RASP object files into an executable")
+        linker.add_argument("--debug", "-d",
+                            help="Inline debugging information into the executable",
+                            action="store_true")
+        linker.add_argument("--output", "-o",
+                            metavar="EXE_FILE",
+                            help="Name of the executable file to generate")
+        linker.add_argument("--format", "-f",
+                            choices=[Loader.TEXT, Loader.BINARY],
+                            default=Loader.TEXT,
+                            help="Format of the executable file (default: text)")
+        linker.add_argument("object_files",
+                            metavar="FILE",
+                            nargs="+",
+                            help="The RASP object files to link, the first one being the entry point")
+        linker.set_defaults(command=Controller.LINK)
+
         debugger = subparsers.add_parser("debug",
                                          help='starts the interactive debugger')
         debugger.add_argument("--asm-source", "-s",
                               metavar="ASM_FILE",
                               help="Assembly source code associated with the executable")
+        debugger.add_argument("--history-size",
+                              metavar="CELLS",
+                              type=int,
+                              default=1000000,
+                              help="Cells kept to step back in time (0 disables it)")
+        debugger.add_argument("--script",
+                              metavar="COMMAND_FILE",
+                              help="Run the debugger commands from the given file and print JSON")
+        debugger.add_argument("--dap",
+                              metavar="PORT",
+                              help="Serve the Debug Adapter Protocol on the given TCP port, or 'stdio'")
         debugger.add_argument("executable_file",
                               metavar="FILE",
                               help="The RASP executable file to compile to debug")
@@ -232,11 +896,136 @@ class Controller:
         runner.add_argument("--use-profiler", "-p",
                             help="Profile the CPU & memory usage of the program",
                             action="store_true")
+        runner.add_argument("--coverage",
+                            metavar="LCOV_FILE",
+                            help="Add the line and branch coverage of this run to the given LCOV file")
+        runner.add_argument("--timeline",
+                            metavar="JSON_FILE",
+                            help="Write the execution timeline in the Chrome Trace format")
+        runner.add_argument("--bucket",
+                            metavar="CYCLES",
+                            type=int,
+                            default=1000,
+                            help="Cycles aggregated into each timeline event (default: 1000)")
+        runner.add_argument("--track",
+                            metavar="CELL",
+                            action="append",
+                            help="Symbol or address of a memory cell to plot on the timeline")
+        runner.add_argument("--server",
+                            metavar="SOCKET",
+                            help="Run on the 'rasp serve' daemon listening on SOCKET, with inputs from stdin")
+        runner.add_argument("--max-cycles",
+                            metavar="CYCLES",
+                            type=int,
+                            help="Cycles after which the program is stopped")
+        runner.add_argument("--ram",
+                            help="Run on a RAM machine, whose code is decoded once and cannot be modified",
+                            action="store_true")
+        runner.add_argument("--memory-file",
+                            metavar="FILE",
+                            help="Map the memory onto FILE (64-bit words), kept after the run")
+        runner.add_argument("--memory-size",
+                            metavar="CELLS",
+                            type=int,
+                            help="Cells of a memory-mapped memory (default: 1000, grows to fit the program)")
         runner.add_argument("executable_file",
                             metavar="FILE",
                             help="The RASP executable file to compile to debug")
         runner.set_defaults(command=Controller.EXECUTE)
 
+        analyzer = subparsers.add_parser("analyze",
+                                         help="analyze the control flow of a RASP program")
+        analyzer.add_argument("--dot",
+                              metavar="DOT_FILE",
+                              help="Write the control-flow graph in the given DOT file")
+        analyzer.add_argument("program_file",
+                              metavar="FILE",
+                              help="The RASP assembly (.asm) or executable file to analyze")
+        analyzer.set_defaults(command=Controller.ANALYZE)
+
+        estimator = subparsers.add_parser("estimate",
+                                          help="estimate the cycles a RASP program needs")
+        estimator.add_argument("--no-listing",
+                               action="store_true",
+                               help="Do not print the annotated source code")
+        estimator.add_argument("assembly_file",
+                               metavar="FILE.asm",
+                               help="The RASP assembly file to estimate")
+        estimator.set_defaults(command=Controller.ESTIMATE)
+
+        tester = subparsers.add_parser("test",
+                                       help="run the YAML test scenarios found in a directory")
+        tester.add_argument("--jobs", "-j",
+                            metavar="N",
+                            type=int,
+                            default=1,
+                            help="Number of processes running tests in parallel (default: 1)")
+        tester.add_argument("--max-cycles",
+                            metavar="CYCLES",
+                            type=int,
+                            default=1000000,
+                            help="Cycles after which a test fails as a timeout (default: 1000000)")
+        tester.add_argument("--junit",
+                            metavar="XML_FILE",
+                            help="Write the results as a JUnit XML report")
+        tester.add_argument("--cache",
+                            metavar="CACHE_DIR",
+                            help="Directory where compiled programs are kept between runs")
+        tester.add_argument("--coverage",
+                            metavar="LCOV_FILE",
+                            help="Add the line and branch coverage of the scenarios to the given LCOV file")
+        tester.add_argument("directory",
+                            metavar="DIR",
+                            help="Directory containing the YAML scenarios")
+        tester.set_defaults(command=Controller.TEST)
+
+        fuzzer = subparsers.add_parser("fuzz",
+                                       help="compare the execution engines on random programs")
+        fuzzer.add_argument("--seed",
+                            type=int,
+                            default=0,
+                            help="Seed of the first random program (default: 0)")
+        fuzzer.add_argument("--runs",
+                            metavar="N",
+                            type=int,
+                            default=1000,
+                            help="Number of random programs to run (default: 1000)")
+        fuzzer.add_argument("--engine",
+                            action="append",
+                            help="Engine to compare with the reference (default: all)")
+        fuzzer.add_argument("--max-cycles",
+                            metavar="CYCLES",
+                            type=int,
+                            default=10000,
+                            help="Cycles after which a program is stopped (default: 10000)")
+        fuzzer.add_argument("--jobs", "-j",
+                            metavar="N",
+                            type=int,
+                            default=1,
+                            help="Number of processes running programs in parallel (default: 1)")
+        fuzzer.add_argument("--save",
+                            metavar="JSON_FILE",
+                            help="Write the shrunk reproducers, one JSON object per line")
+        fuzzer.set_defaults(command=Controller.FUZZ)
+
+        server = subparsers.add_parser("serve",
+                                       help="run RASP executables sent over a local socket")
+        server.add_argument("--socket",
+                            metavar="PATH",
+                            required=True,
+                            help="Path of the Unix socket to listen on")
+        server.add_argument("--workers", "-j",
+                            metavar="N",
+                            type=int,
+                            default=1,
+                            help="Number of worker processes (default: 1)")
+        server.add_argument("--max-cycles",
+                            metavar="CYCLES",
+                            type=int,
+                            default=1000000,
+                            help="Largest cycle budget granted to a job (default: 1000000)")
+        server.set_defaults(command=Controller.SERVE)
+
         about = subparsers.add_parser("version",
                                       help="show version, license and other details")
         about.set_defaults(command=Controller.VERSION)
@@ -246,7 +1035,5 @@ class Controller:
 
 
 def main():
-    logging.basicConfig(filename='rasp.log', level=logging.INFO)
-
-    rasp = Controller(stdout)
+    rasp = Controller(stdout, log_file="rasp.log")
     return rasp.run(argv)
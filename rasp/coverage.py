@@ -0,0 +1,188 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from contextlib import contextmanager
+from pathlib import Path
+
+from rasp.analysis import ControlFlowGraph
+from rasp.instructions import JumpIfPositive
+
+
+
+class CoverageRecorder:
+
+    def __init__(self, machine):
+        self._peek = machine.memory.peek
+        self._cpu = machine.cpu
+        self.hits = {}
+        self.branches = {}
+
+    def on_new_cpu_cycle(self, count=1, ip=0):
+        self.hits[ip] = self.hits.get(ip, 0) + count
+        if self._peek(ip) == JumpIfPositive.CODE:
+            branch = self.branches.get(ip)
+            if branch is None:
+                branch = self.branches[ip] = [0, 0]
+            if self._cpu.accumulator >= 0:
+                branch[Coverage.TAKEN] += 1
+            else:
+                branch[Coverage.FALLTHROUGH] += 1
+
+    def __getstate__(self):
+        return { "hits": self.hits, "branches": self.branches }
+
+
+
+class Coverage:
+
+    TAKEN = 0
+    FALLTHROUGH = 1
+
+    def __init__(self):
+        self._lines = {}
+        self._branches = {}
+
+    @property
+    def sources(self):
+        return sorted(set(self._lines) | set(self._branches))
+
+    def lines(self, source):
+        return dict(self._lines.get(source, {}))
+
+    def branches(self, source):
+        return dict(self._branches.get(source, {}))
+
+    def add_run(self, source, recorder, program_map, cells, offset=0):
+        graph = ControlFlowGraph(cells)
+        lines = self._lines.setdefault(source, {})
+        branches = self._branches.setdefault(source, {})
+        instructions = set(recorder.hits)
+        jumps = set(recorder.branches)
+        for each_block in graph.blocks.values():
+            for address, mnemonic, operand in each_block.instructions:
+                instructions.add(address)
+                if mnemonic == "jump":
+                    jumps.add(address)
+        for address in instructions:
+            line = self._find_line(program_map, address, offset)
+            if line is not None:
+                lines[line] = lines.get(line, 0) + recorder.hits.get(address, 0)
+        for address in jumps:
+            line = self._find_line(program_map, address, offset)
+            if line is None:
+                continue
+            counts = recorder.branches.get(address)
+            for branch in (self.TAKEN, self.FALLTHROUGH):
+                key = (line, branch)
+                if counts is None:
+                    branches.setdefault(key, None)
+                else:
+                    branches[key] = (branches.get(key) or 0) + counts[branch]
+
+    @staticmethod
+    def _find_line(program_map, address, offset):
+        try:
+            return program_map.find_source(address) + offset
+        except RuntimeError:
+            return None
+
+    def merge(self, other):
+        for source, lines in other._lines.items():
+            merged = self._lines.setdefault(source, {})
+            for line, hits in lines.items():
+                merged[line] = merged.get(line, 0) + hits
+        for source, branches in other._branches.items():
+            merged = self._branches.setdefault(source, {})
+            for key, taken in branches.items():
+                if taken is None:
+                    merged.setdefault(key, None)
+                else:
+                    merged[key] = (merged.get(key) or 0) + taken
+        return self
+
+    def save_as(self, file_name):
+        with open(file_name, "w") as destination:
+            self.write_to(destination)
+
+    def add_to(self, file_name):
+        with open(file_name, "a+") as lcov:
+            with locked(lcov):
+                lcov.seek(0)
+                merged = Coverage.read_from(lcov).merge(self)
+                lcov.seek(0)
+                lcov.truncate()
+                merged.write_to(lcov)
+
+    def write_to(self, destination):
+        for source in self.sources:
+            destination.write("TN:\n")
+            destination.write(f"SF:{source}\n")
+            branches = self._branches.get(source, {})
+            for (line, branch), taken in sorted(branches.items()):
+                count = "-" if taken is None else taken
+                destination.write(f"BRDA:{line},0,{branch},{count}\n")
+            destination.write(f"BRF:{len(branches)}\n")
+            destination.write(f"BRH:{sum(1 for each in branches.values() if each)}\n")
+            lines = self._lines.get(source, {})
+            for line, hits in sorted(lines.items()):
+                destination.write(f"DA:{line},{hits}\n")
+            destination.write(f"LF:{len(lines)}\n")
+            destination.write(f"LH:{sum(1 for each in lines.values() if each)}\n")
+            destination.write("end_of_record\n")
+
+    @staticmethod
+    def load(file_name):
+        if not Path(file_name).exists():
+            return Coverage()
+        with open(file_name, "r") as lcov:
+            return Coverage.read_from(lcov)
+
+    @staticmethod
+    def read_from(lcov):
+        coverage = Coverage()
+        source = None
+        for each_line in lcov:
+            key, _, value = each_line.strip().partition(":")
+            if key == "SF":
+                source = value
+                coverage._lines.setdefault(source, {})
+                coverage._branches.setdefault(source, {})
+            elif key == "DA":
+                line, hits = value.split(",")[:2]
+                coverage._lines[source][int(line)] = int(hits)
+            elif key == "BRDA":
+                line, block, branch, taken = value.split(",")
+                coverage._branches[source][(int(line), int(branch))] = \
+                    None if taken == "-" else int(taken)
+        return coverage
+
+
+
+@contextmanager
+def locked(stream):
+    try:
+        from fcntl import flock, LOCK_EX, LOCK_UN
+    except ImportError:
+        from msvcrt import locking, LK_LOCK, LK_UNLCK
+        stream.seek(0)
+        locking(stream.fileno(), LK_LOCK, 1)
+        try:
+            yield stream
+        finally:
+            stream.flush()
+            stream.seek(0)
+            locking(stream.fileno(), LK_UNLCK, 1)
+        return
+    flock(stream.fileno(), LOCK_EX)
+    try:
+        yield stream
+    finally:
+        stream.flush()
+        flock(stream.fileno(), LOCK_UN)
@@ -0,0 +1,143 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+import operator
+
+
+class Operand:
+
+    ACCUMULATOR = "acc"
+    INSTRUCTION_POINTER = "ip"
+    MEMORY = "memory"
+    CONSTANT = "constant"
+
+    @staticmethod
+    def accumulator():
+        return Operand(Operand.ACCUMULATOR)
+
+    @staticmethod
+    def instruction_pointer():
+        return Operand(Operand.INSTRUCTION_POINTER)
+
+    @staticmethod
+    def memory(address):
+        return Operand(Operand.MEMORY, address)
+
+    @staticmethod
+    def constant(value):
+        return Operand(Operand.CONSTANT, value)
+
+    def __init__(self, kind, value=None):
+        self.kind = kind
+        self.value = value
+
+    @property
+    def is_constant(self):
+        return self.kind == self.CONSTANT
+
+    def compile(self, machine, resolve):
+        if self.kind == self.ACCUMULATOR:
+            cpu = machine.cpu
+            return lambda: cpu.accumulator
+        if self.kind == self.INSTRUCTION_POINTER:
+            cpu = machine.cpu
+            return lambda: cpu.instruction_pointer
+        if self.kind == self.MEMORY:
+            address = self.value
+            if isinstance(address, str):
+                address = resolve(address)
+            if not 0 <= address < machine.memory.capacity:
+                raise RuntimeError(f"Invalid address {address}")
+            peek = machine.memory.peek
+            return lambda: peek(address)
+        value = self.value
+        return lambda: value
+
+    def __eq__(self, other):
+        if not isinstance(other, Operand):
+            return False
+        return self.kind == other.kind \
+            and self.value == other.value
+
+    def __str__(self):
+        if self.kind == self.MEMORY:
+            return f"memory[{self.value}]"
+        if self.kind == self.CONSTANT:
+            return str(self.value)
+        return self.kind
+
+
+class Condition:
+
+    OPERATORS = {
+        "<": operator.lt,
+        "<=": operator.le,
+        ">": operator.gt,
+        ">=": operator.ge,
+        "==": operator.eq,
+        "!=": operator.ne
+    }
+
+    def __init__(self, left, comparison, right):
+        if comparison not in self.OPERATORS:
+            raise RuntimeError(f"Unknown comparison '{comparison}'")
+        self.left = left
+        self.comparison = comparison
+        self.right = right
+
+    def compile(self, machine, resolve):
+        compare = self.OPERATORS[self.comparison]
+        left = self.left.compile(machine, resolve)
+        if self.right.is_constant:
+            value = self.right.value
+            return lambda: compare(left(), value)
+        right = self.right.compile(machine, resolve)
+        return lambda: compare(left(), right())
+
+    def __eq__(self, other):
+        if not isinstance(other, Condition):
+            return False
+        return self.left == other.left \
+            and self.comparison == other.comparison \
+            and self.right == other.right
+
+    def __str__(self):
+        return f"{self.left} {self.comparison} {self.right}"
+
+
+class Breakpoint:
+
+    def __init__(self, address, condition=None, ignore_count=0, predicate=None):
+        self.address = address
+        self.condition = condition
+        self.ignore_count = ignore_count
+        self.hits = 0
+        self._predicate = predicate
+
+    @property
+    def is_conditional(self):
+        return self._predicate is not None or self.ignore_count > 0
+
+    def holds(self):
+        return self._predicate is None or self._predicate()
+
+    def is_triggered(self):
+        if self._predicate is not None and not self._predicate():
+            return False
+        self.hits += 1
+        return self.hits > self.ignore_count
+
+    def __str__(self):
+        text = ""
+        if self.condition is not None:
+            text += f"if {self.condition}"
+        if self.ignore_count > 0:
+            text += f" after {self.ignore_count} hits ({self.hits} so far)"
+        return text.strip()
@@ -9,6 +9,7 @@
 
 
 
+from rasp.debug.breakpoints import Condition, Operand
 from rasp.debug.view import DebugView
 from rasp.debug.core import Debugger
 from rasp.machine import RASP
@@ -19,6 +20,8 @@ import pyparsing as pp
 
 class DebugController:
 
+    _GRAMMAR = None
+
 
     def __init__(self, debugger, view):
         self._debugger = debugger
@@ -40,8 +43,39 @@ class DebugController:
         self._view.show_closing()
 
 
+    def run_script(self, commands):
+        for each_line in commands:
+            text = each_line.strip()
+            if not text or text.startswith("#"):
+                continue
+            self._view.begin(text)
+            try:
+                command = self._parse_command(text)
+            except Exception:
+                self._view.invalid_command(text)
+                continue
+            if command.is_quit():
+                break
+            try:
+                command.send_to(self._debugger, self._view)
+            except Exception as error:
+                self._view.report_error(error)
+
+
     @staticmethod
     def _parse_command(text):
+        return DebugController._grammar().parseString(text, parseAll=True)[0]
+
+
+    @classmethod
+    def _grammar(cls):
+        if cls._GRAMMAR is None:
+            cls._GRAMMAR = cls._build_grammar()
+        return cls._GRAMMAR
+
+
+    @staticmethod
+    def _build_grammar():
         identifier = pp.Word(pp.alphas, pp.alphanums + '_')
 
         integer = pp.Combine(
@@ -64,29 +98,84 @@ class DebugController:
             pp.Suppress("set") + pp.Suppress("memory") + address + integer
         ).setParseAction(lambda tokens: SetMemory(tokens[0], tokens[1]))
 
+        operand = (
+            pp.Keyword("acc").setParseAction(lambda tokens: Operand.accumulator())
+            | pp.Keyword("ip").setParseAction(lambda tokens: Operand.instruction_pointer())
+            | (pp.Suppress("memory") + pp.Suppress("[") + (address | identifier) + pp.Suppress("]")
+               ).setParseAction(lambda tokens: Operand.memory(tokens[0]))
+            | integer.copy().addParseAction(lambda tokens: Operand.constant(tokens[0]))
+        )
+
+        condition = (
+            operand + pp.oneOf(["<=", ">=", "==", "!=", "<", ">"]) + operand
+        ).setParseAction(lambda tokens: Condition(*tokens))
+
         break_at = (
-            pp.Suppress("break") + pp.Suppress("at") + pp.oneOf(["line", "address"]) + address
-        ).setParseAction(lambda tokens: Break(tokens[1], tokens[0] == "line"))
+            pp.Suppress("break") + pp.Suppress("at")
+            + ((pp.oneOf(["line", "address"]) + address) | address | identifier)("target")
+            + pp.Optional(pp.Suppress("if") + condition("condition"))
+            + pp.Optional(pp.Suppress("after") + address("ignore_count")
+                          + pp.Suppress(pp.Optional("hits")))
+        ).setParseAction(lambda tokens: Break(tokens.target[-1],
+                                              tokens.target[0] == "line",
+                                              tokens.condition or None,
+                                              tokens.ignore_count or 0))
 
         clear = (
             pp.Suppress("clear") + pp.oneOf(["line", "address"]) + address
         ).setParseAction(lambda tokens: Clear(tokens[1], tokens[0] == "line"))
 
+        clear_watch = (
+            pp.Suppress("clear") + pp.Suppress("watch") + address
+        ).setParseAction(lambda tokens: ClearWatch(tokens[0]))
+
+        access = pp.Optional(
+            pp.Keyword("read") | pp.Keyword("write") | pp.Keyword("access"),
+            default="write")
+
+        watch_range = (
+            pp.Suppress("watch") + access + address + pp.Optional(address)
+        ).setParseAction(lambda tokens: Watch(*tokens[1:], kind=tokens[0]))
+
+        watch_symbol = (
+            pp.Suppress("watch") + access + identifier
+        ).setParseAction(lambda tokens: WatchSymbol(tokens[1], tokens[0]))
+
+        step_back = (
+            pp.Suppress("step") + pp.Suppress("back") + pp.Optional(address)
+        ).setParseAction(lambda tokens: StepBack(*tokens))
+
         step = (
             pp.Suppress("step") + pp.Optional(integer)
         ).setParseAction(lambda tokens: Step(*tokens))
 
+        reverse_continue = (
+            pp.Suppress("reverse") + pp.Suppress("continue")
+        ).setParseAction(lambda tokens: ReverseContinue())
+
+        goto_cycle = (
+            pp.Suppress("goto") + pp.Suppress("cycle") + address
+        ).setParseAction(lambda tokens: GotoCycle(tokens[0]))
+
         run = (
             pp.Suppress("run") | pp.Suppress("continue")
         ).setParseAction(lambda tokens: Run())
 
+        trace = (
+            pp.Suppress("trace") + pp.oneOf(["on", "off"])
+        ).setParseAction(lambda tokens: Trace(tokens[0] == "on"))
+
         stop = (
             pp.Suppress("quit") | pp.Suppress("exit")
         ).setParseAction(lambda tokens: Quit())
 
         show_mem = (
-            pp.Suppress("show") + pp.Suppress("memory") + address + address
-        ).setParseAction(lambda tokens: ShowMemory(tokens[0], tokens[1]))
+            pp.Suppress("show") + pp.Suppress("memory") + pp.Optional(address) + pp.Optional(address)
+        ).setParseAction(lambda tokens: ShowMemory(*tokens))
+
+        show_changes = (
+            pp.Suppress("show") + pp.Suppress("changes")
+        ).setParseAction(lambda tokens: ShowChanges())
 
         show_breakpoints = (
             pp.Suppress("show") + pp.Suppress("breakpoints")
@@ -96,6 +185,10 @@ class DebugController:
             pp.Suppress("show") + pp.Suppress("cpu")
         ).setParseAction(lambda tokens: ShowCPU())
 
+        show_watchpoints = (
+            pp.Suppress("show") + pp.Suppress("watchpoints")
+        ).setParseAction(lambda tokens: ShowWatchpoints())
+
         show_source = (
             pp.Suppress("show") + pp.Suppress("source") + pp.Optional(integer) + pp.Optional(integer)
         ).setParseAction(lambda tokens: ShowSource(*tokens))
@@ -111,12 +204,15 @@ class DebugController:
         command = (
             set_ip | set_acc | set_mem \
             | help_me \
-            | break_at | clear | step | stop | run \
-            | show_mem | show_cpu | show_source | show_breakpoints | show_symbol
+            | break_at | clear_watch | clear | step_back | step | stop | run | trace \
+            | reverse_continue | goto_cycle \
+            | watch_range | watch_symbol \
+            | show_mem | show_changes | show_cpu | show_source | show_breakpoints | show_watchpoints \
+            | show_symbol
 
         )
 
-        return command.parseString(text)[0]
+        return command
 
 
 class Command:
@@ -189,22 +285,34 @@ class SetMemory(Command):
 
 class Break(Command):
 
-    def __init__(self, address, is_line_number=False):
+    def __init__(self, address, is_line_number=False, condition=None, ignore_count=0):
         super().__init__()
         self._address = address
         self._is_line_number = is_line_number
+        self._condition = condition
+        self._ignore_count = ignore_count
 
     def send_to(self, debugger, view):
         if self._is_line_number:
-            debugger.set_breakpoint_at_line(self._address)
+            debugger.set_breakpoint_at_line(self._address,
+                                            self._condition,
+                                            self._ignore_count)
+        elif isinstance(self._address, str):
+            debugger.set_breakpoint_at_symbol(self._address,
+                                              self._condition,
+                                              self._ignore_count)
         else:
-            debugger.set_breakpoint(self._address)
+            debugger.set_breakpoint(self._address,
+                                    self._condition,
+                                    self._ignore_count)
 
     def __eq__(self, other):
         if not isinstance(other, Break):
             return False
         return self._address == other._address \
-            and self._is_line_number == other._is_line_number
+            and self._is_line_number == other._is_line_number \
+            and self._condition == other._condition \
+            and self._ignore_count == other._ignore_count
 
 
 class Clear(Command):
@@ -226,9 +334,72 @@ class Clear(Command):
             and self._is_line_number == other._is_line_number
 
 
+class Watch(Command):
+
+    def __init__(self, start, end=None, kind="write"):
+        super().__init__()
+        self._start = start
+        self._end = end
+        self._kind = kind
+
+    def send_to(self, debugger, view):
+        debugger.watch(self._start, self._end, self._kind)
+
+    def __eq__(self, other):
+        if not isinstance(other, Watch):
+            return False
+        return self._start == other._start \
+            and self._end == other._end \
+            and self._kind == other._kind
+
+
+class WatchSymbol(Command):
+
+    def __init__(self, symbol, kind="write"):
+        super().__init__()
+        self._symbol = symbol
+        self._kind = kind
+
+    def send_to(self, debugger, view):
+        debugger.watch_symbol(self._symbol, self._kind)
+
+    def __eq__(self, other):
+        if not isinstance(other, WatchSymbol):
+            return False
+        return self._symbol == other._symbol \
+            and self._kind == other._kind
+
+
+class ClearWatch(Command):
+
+    def __init__(self, address):
+        super().__init__()
+        self._address = address
+
+    def send_to(self, debugger, view):
+        debugger.clear_watchpoint(self._address)
+
+    def __eq__(self, other):
+        if not isinstance(other, ClearWatch):
+            return False
+        return self._address == other._address
+
+
+class ShowWatchpoints(Command):
+
+    def __init__(self):
+        super().__init__()
+
+    def send_to(self, debugger, view):
+        debugger.show_watchpoints()
+
+    def __eq__(self, other):
+        return isinstance(other, ShowWatchpoints)
+
+
 class ShowMemory(Command):
 
-    def __init__(self, start, end):
+    def __init__(self, start=None, end=None):
         self._start = start
         self._end = end
 
@@ -239,7 +410,19 @@ class ShowMemory(Command):
         if not isinstance(other, ShowMemory):
             return False
         return self._start == other._start \
-        and self._end == self._end
+        and self._end == other._end
+
+
+class ShowChanges(Command):
+
+    def __init__(self):
+        super().__init__()
+
+    def send_to(self, debugger, view):
+        debugger.show_changes()
+
+    def __eq__(self, other):
+        return isinstance(other, ShowChanges)
 
 
 class ShowSource(Command):
@@ -310,6 +493,63 @@ class Step(Command):
         return isinstance(other, Step)
 
 
+class StepBack(Command):
+
+    def __init__(self, step_count=None):
+        super().__init__()
+        self._step_count = step_count or 1
+
+    def send_to(self, debugger, view):
+        debugger.step_back(self._step_count)
+
+    def __eq__(self, other):
+        if not isinstance(other, StepBack):
+            return False
+        return self._step_count == other._step_count
+
+
+class ReverseContinue(Command):
+
+    def __init__(self):
+        super().__init__()
+
+    def send_to(self, debugger, view):
+        debugger.reverse_continue()
+
+    def __eq__(self, other):
+        return isinstance(other, ReverseContinue)
+
+
+class GotoCycle(Command):
+
+    def __init__(self, cycle):
+        super().__init__()
+        self._cycle = cycle
+
+    def send_to(self, debugger, view):
+        debugger.goto_cycle(self._cycle)
+
+    def __eq__(self, other):
+        if not isinstance(other, GotoCycle):
+            return False
+        return self._cycle == other._cycle
+
+
+class Trace(Command):
+
+    def __init__(self, is_enabled):
+        super().__init__()
+        self._is_enabled = is_enabled
+
+    def send_to(self, debugger, view):
+        debugger.set_trace(self._is_enabled)
+
+    def __eq__(self, other):
+        if not isinstance(other, Trace):
+            return False
+        return self._is_enabled == other._is_enabled
+
+
 class Quit(Command):
 
     def __init__(self):
@@ -8,53 +8,93 @@
 #
 
 
+from rasp.debug.breakpoints import Breakpoint
+from rasp.debug.history import History, ReplayInputDevice, ReplayOutputDevice
+from rasp.debug.watchpoints import Watchpoint, WatchpointIndex
 from rasp.instructions import Load
 from rasp.machine import RASP
 
 
 class Debugger:
 
-    def __init__(self, machine, view, program_map=None, assembly_code=None):
+    PAGE_SIZE = 128
+    ROW_SIZE = 8
+    DETAILED_VIEW = 16
+
+    def __init__(self, machine, view, program_map=None, assembly_code=None,
+                 history_size=1000000):
         self._machine = machine
         self._ui = view
         self._map = program_map
         self._assembly_code = assembly_code.splitlines() if assembly_code else None
         self._breakpoints = set()
+        self._conditions = {}
+        self._watchpoints = WatchpointIndex()
+        self._is_tracing = False
+        self._next_page = None
+        self._history = History(machine, history_size)
+        machine.input_device = ReplayInputDevice(machine.input_device, self._history)
+        machine.output_device = ReplayOutputDevice(machine.output_device, self._history)
 
     def set_instruction_pointer(self, address):
         self._machine.cpu.instruction_pointer = address
+        self._history.forget_future()
 
     def set_accumulator(self, value):
         self._machine.cpu.accumulator = value
+        self._history.forget_future()
 
     def set_memory(self, address, value):
         self._machine.memory.write(address, value)
+        self._history.forget_future()
 
     def show_breakpoints(self):
         infos = []
         for any_address in self._breakpoints:
-            value = self._machine.memory.read(any_address)
+            value = self._machine.memory.peek(any_address)
             mnemonic = self._machine.instructions.find_mnemonic(value)
+            condition = self._conditions.get(any_address)
             infos.append((
                 any_address,
                 any_address == self._machine.cpu.instruction_pointer,
                 value,
-                mnemonic
+                mnemonic,
+                str(condition) if condition else ""
             ))
         self._ui.show_breakpoints(infos)
 
     def show_cpu(self):
+        try:
+            instruction = str(self._machine.next_instruction)
+        except IndexError:
+            instruction = "out of memory"
         view = ( self._machine.cpu.accumulator,
                  self._machine.cpu.instruction_pointer,
-                 str(self._machine.next_instruction) )
+                 instruction,
+                 self._history.cycle )
 
         self._ui.show_cpu(view)
 
-    def show_memory(self, start, end):
+    def show_memory(self, start=None, end=None):
+        if start is None:
+            if self._next_page is None:
+                self._ui.report_error("No more memory to show")
+                return
+            start, end = self._next_page
+        elif end is None:
+            end = start + self.PAGE_SIZE - 1
+        end = min(end, self._machine.memory.capacity - 1)
+        if end - start < self.DETAILED_VIEW:
+            self._next_page = None
+            self._show_cells(start, end)
+        else:
+            self._show_page(start, end)
+
+    def _show_cells(self, start, end):
         view = []
         address = start
         while address <= end:
-            value = self._machine.memory.read(address)
+            value = self._machine.memory.peek(address)
             opcode = self._machine.instructions.find_mnemonic(value)
             is_ip = address == self._machine.cpu.instruction_pointer
             is_bp = address in self._breakpoints
@@ -62,17 +102,38 @@ class Debugger:
             address += 1
         self._ui.show_memory(view)
 
+    def _show_page(self, start, end):
+        last = min(end, start + self.PAGE_SIZE - 1)
+        peek = self._machine.memory.peek
+        rows = []
+        for row in range(start, last + 1, self.ROW_SIZE):
+            rows.append((row, [peek(address)
+                               for address in range(row, min(row + self.ROW_SIZE, last + 1))]))
+        remaining = end - last
+        self._next_page = (last + 1, end) if remaining > 0 else None
+        self._ui.show_memory_dump(rows, remaining)
+
+    def show_changes(self):
+        peek = self._machine.memory.peek
+        changes = []
+        for address, old_value in sorted(self._history.changes.items()):
+            new_value = peek(address)
+            if new_value != old_value:
+                changes.append((address, old_value, new_value))
+        self._ui.show_changes(changes)
+
     def show_source(self, start, end):
         if not self._assembly_code:
-            ui.no_source_code()
+            self._ui.no_source_code()
 
         else:
-            current_location = self._map.find_source(self._machine.cpu.instruction_pointer)
+            current_location = self._current_line()
             if start is None and end is None:
-                start = max(1, current_location - 5)
+                start = max(1, (current_location or 1) - 5)
                 end = start + 10
             elif end is None:
                 end = start + 10
+            end = min(end, len(self._assembly_code))
 
             fragment = []
             for each_line in range(start, end+1):
@@ -100,43 +161,176 @@ class Debugger:
             self._ui.report_error(error)
 
     def run(self):
+        self._history.mark()
+        self._watchpoints.hit = None
+        if self._is_tracing:
+            while True:
+                self._execute_one_instruction()
+                if self._machine.is_stopped or self._watchpoints.hit \
+                   or self._stops_here():
+                    break
+        else:
+            self._run_until_break_point()
+        self._show_watchpoint_hit()
+        self.show_cpu()
+
+    def _run_until_break_point(self):
+        machine = self._machine
+        cpu = machine.cpu
+        instructions = machine.instructions
+        breakpoints = self._breakpoints
+        watchpoints = self._watchpoints
+        record = self._history.record
+        stops_here = self._stops_here
         while True:
-            self._execute_one_instruction()
-            if self._machine.is_stopped or self._at_break_point:
+            instruction = instructions.read_from(machine)
+            record(instruction)
+            instruction.send_to(machine)
+            while not machine.is_stopped and cpu.instruction_pointer not in breakpoints \
+                  and watchpoints.hit is None:
+                instruction = instructions.read_from(machine)
+                record(instruction)
+                instruction.send_to(machine)
+            if machine.is_stopped or watchpoints.hit is not None or stops_here():
                 break
-        self.show_cpu()
+
+    def _stops_here(self):
+        address = self._machine.cpu.instruction_pointer
+        if address not in self._breakpoints:
+            return False
+        condition = self._conditions.get(address)
+        return condition is None or condition.is_triggered()
+
+    def _holds_here(self):
+        address = self._machine.cpu.instruction_pointer
+        if address not in self._breakpoints:
+            return False
+        condition = self._conditions.get(address)
+        return condition is None or condition.holds()
 
     def _execute_one_instruction(self):
-        instruction = self._machine.next_instruction
-        print(str(instruction))
-        self._ui.show_instruction(str(instruction))
-        self._machine.run_one_cycle()
+        instruction = self._machine.instructions.read_from(self._machine)
+        if self._is_tracing:
+            self._ui.show_instruction(str(instruction))
+        self._history.record(instruction)
+        instruction.send_to(self._machine)
+
+    def set_trace(self, is_enabled):
+        self._is_tracing = is_enabled
 
     def step(self, step_count=1):
+        self._history.mark()
+        self._watchpoints.hit = None
         for each_step in range(step_count):
             self._execute_one_instruction()
-            self.show_cpu()
-            if self._at_break_point or self._machine.is_stopped:
+            if self._machine.is_stopped or self._watchpoints.hit \
+               or self._stops_here():
                 break
-        current_line_number = self._map.find_source(self._machine.cpu.instruction_pointer)
-        self.show_source(current_line_number-1, current_line_number+1)
+        self._show_current_location()
 
-    @property
-    def _at_break_point(self):
-        return self._machine.cpu.instruction_pointer in self._breakpoints
+    def step_back(self, step_count=1):
+        self._history.mark()
+        self._watchpoints.hit = None
+        try:
+            for each_step in range(step_count):
+                self._history.undo()
+                if self._holds_here():
+                    break
+        except RuntimeError as error:
+            self._ui.report_error(error)
+        self._show_current_location()
 
-    def set_breakpoint(self, address):
-        self._breakpoints.add(address)
+    def reverse_continue(self):
+        self._history.mark()
+        self._watchpoints.hit = None
+        history = self._history
+        watchpoints = self._watchpoints
+        try:
+            while True:
+                writes = history.undo()
+                if self._holds_here():
+                    break
+                hits = [(address, value) for address, value in writes
+                        if watchpoints.find(address, Watchpoint.WRITE)]
+                if hits:
+                    address, value = hits[0]
+                    watchpoints.hit = (Watchpoint.WRITE, address, value)
+                    break
+        except RuntimeError as error:
+            self._ui.report_error(error)
+        self._show_current_location()
 
+    def goto_cycle(self, cycle):
+        self._history.mark()
+        history = self._history
+        try:
+            if cycle < history.cycle:
+                history.rewind_to(cycle)
+            machine = self._machine
+            while history.cycle < cycle and not machine.is_stopped:
+                instruction = machine.instructions.read_from(machine)
+                history.record(instruction)
+                instruction.send_to(machine)
+            self._watchpoints.hit = None
+        except RuntimeError as error:
+            self._ui.report_error(error)
+        self._show_current_location()
+
+    def _show_current_location(self):
+        self._show_watchpoint_hit()
+        self.show_cpu()
+        if self._assembly_code:
+            current_line_number = self._current_line()
+            if current_line_number is not None:
+                self.show_source(current_line_number-1, current_line_number+1)
+
+    def _current_line(self):
+        try:
+            return self._map.find_source(self._machine.cpu.instruction_pointer)
+        except RuntimeError:
+            return None
 
-    def set_breakpoint_at_line(self, line_number):
+    def set_breakpoint(self, address, condition=None, ignore_count=0):
+        try:
+            predicate = None
+            if condition is not None:
+                predicate = condition.compile(self._machine, self._find_symbol)
+            breakpoint = Breakpoint(address, condition, ignore_count, predicate)
+            if breakpoint.is_conditional:
+                self._conditions[address] = breakpoint
+            else:
+                self._conditions.pop(address, None)
+            self._breakpoints.add(address)
+
+        except RuntimeError as error:
+            self._ui.report_error(error)
+
+    def set_breakpoint_at_line(self, line_number, condition=None, ignore_count=0):
         if not self._assembly_code:
             self._ui.report_error("Error: Assembly code is not available.")
-        address = self._map.find_address_by_line(line_number)
-        self.set_breakpoint(address)
+        try:
+            address = self._map.find_address_by_line(line_number)
+            self.set_breakpoint(address, condition, ignore_count)
+
+        except RuntimeError as error:
+            self._ui.report_error(error)
+
+    def set_breakpoint_at_symbol(self, symbol, condition=None, ignore_count=0):
+        try:
+            address = self._find_symbol(symbol)
+            self.set_breakpoint(address, condition, ignore_count)
+
+        except RuntimeError as error:
+            self._ui.report_error(error)
+
+    def _find_symbol(self, symbol):
+        if self._map is None:
+            raise RuntimeError("Debug information is not available")
+        return self._map.find_address(symbol)
 
     def clear_breakpoint(self, address):
         self._breakpoints.remove(address)
+        self._conditions.pop(address, None)
 
 
     def clear_breakpoint_at_line(self, line_number):
@@ -144,3 +338,39 @@ class Debugger:
             self._ui.report_error("Error: Assembly code is not available")
         address = self._map.find_address_by_line(line_number)
         self.clear_breakpoint(address)
+
+
+    def watch(self, start, end=None, kind=Watchpoint.WRITE):
+        if not self._watchpoints:
+            self._machine.memory.attach(self._watchpoints)
+        self._watchpoints.add(Watchpoint(start, end, kind))
+
+    def watch_symbol(self, symbol, kind=Watchpoint.WRITE):
+        try:
+            start = self._find_symbol(symbol)
+            following = [address for line, address, label in self._map.as_table()
+                         if address > start]
+            if following:
+                end = min(following) - 1
+            else:
+                end = (self._map.size or start + 1) - 1
+            self.watch(start, end, kind)
+
+        except RuntimeError as error:
+            self._ui.report_error(error)
+
+    def clear_watchpoint(self, address):
+        removed = self._watchpoints.remove_at(address)
+        if not removed:
+            self._ui.report_error(f"No watchpoint at address {address}")
+        if removed and not self._watchpoints:
+            self._machine.memory.detach(self._watchpoints)
+
+    def show_watchpoints(self):
+        self._ui.show_watchpoints([(each.kind, each.start, each.end)
+                                   for each in self._watchpoints])
+
+    def _show_watchpoint_hit(self):
+        if self._watchpoints.hit:
+            kind, address, value = self._watchpoints.hit
+            self._ui.show_watchpoint_hit(kind, address, value)
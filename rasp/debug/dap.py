@@ -0,0 +1,380 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from base64 import b64encode
+from pathlib import Path
+
+import json
+import socket
+import struct
+
+from rasp.debug.controller import DebugController
+
+
+
+class Connection:
+
+    HEADER = b"Content-Length: "
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._sequence = 0
+
+    def receive(self):
+        length = None
+        while True:
+            line = self._reader.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                break
+            if line.startswith(self.HEADER):
+                length = int(line[len(self.HEADER):])
+        if length is None:
+            raise RuntimeError("Missing 'Content-Length' header")
+        return json.loads(self._reader.read(length).decode("utf-8"))
+
+    def send(self, message):
+        self._sequence += 1
+        message["seq"] = self._sequence
+        body = json.dumps(message).encode("utf-8")
+        self._writer.write(self.HEADER + str(len(body)).encode("ascii") + b"\r\n\r\n")
+        self._writer.write(body)
+        self._writer.flush()
+
+    def respond(self, request, body=None, success=True, message=None):
+        response = {
+            "type": "response",
+            "request_seq": request["seq"],
+            "command": request["command"],
+            "success": success
+        }
+        if body is not None:
+            response["body"] = body
+        if message is not None:
+            response["message"] = message
+        self.send(response)
+
+    def notify(self, event, body=None):
+        message = { "type": "event", "event": event }
+        if body is not None:
+            message["body"] = body
+        self.send(message)
+
+
+
+class AdapterView:
+
+    def __init__(self):
+        self._connection = None
+        self.inputs = []
+        self.watchpoint_hit = None
+
+    def connect(self, connection):
+        self._connection = connection
+
+    def read(self):
+        if not self.inputs:
+            raise RuntimeError("No more input available")
+        return int(self.inputs.pop(0))
+
+    def write(self, value):
+        self._output(f"{value}\n", "stdout")
+
+    def report_error(self, error):
+        self._output(f"Error: {str(error)}.\n", "stderr")
+
+    def no_source_code(self):
+        self._output("Assembly code is not available.\n", "stderr")
+
+    def show_watchpoint_hit(self, kind, address, value):
+        self.watchpoint_hit = (kind, address, value)
+
+    def _output(self, text, category):
+        if self._connection:
+            self._connection.notify("output", { "category": category, "output": text })
+
+    def show_cpu(self, view):
+        pass
+
+    def show_source(self, code_fragment):
+        pass
+
+    def show_memory(self, memory_fragment):
+        pass
+
+    def show_memory_dump(self, rows, remaining):
+        pass
+
+    def show_changes(self, changes):
+        pass
+
+    def show_breakpoints(self, infos):
+        pass
+
+    def show_watchpoints(self, infos):
+        pass
+
+    def show_instruction(self, instruction):
+        pass
+
+
+
+class DebugAdapter:
+
+    THREAD = 1
+    REGISTERS = 1
+    SYMBOLS = 2
+    CELL_SIZE = 8
+    CELL = struct.Struct("<q")
+
+    def __init__(self, debugger, machine, view, program_map=None, source_path=None):
+        self._debugger = debugger
+        self._machine = machine
+        self._view = view
+        self._map = program_map
+        self._source_path = source_path
+        self._breakpoints = {}
+        self._connection = None
+
+    def serve(self, reader, writer):
+        self._connection = Connection(reader, writer)
+        self._view.connect(self._connection)
+        while True:
+            request = self._connection.receive()
+            if request is None:
+                break
+            if not self.handle(request):
+                break
+
+    def handle(self, request):
+        command = request.get("command", "")
+        handler = getattr(self, "_on_" + self._as_identifier(command), None)
+        if handler is None:
+            self._connection.respond(request,
+                                     success=False,
+                                     message=f"Unsupported request '{command}'")
+            return True
+        try:
+            return handler(request, request.get("arguments", {})) is not False
+
+        except RuntimeError as error:
+            self._connection.respond(request, success=False, message=str(error))
+            return True
+
+    @staticmethod
+    def _as_identifier(command):
+        return "".join("_" + letter.lower() if letter.isupper() else letter
+                       for letter in command)
+
+    def _on_initialize(self, request, arguments):
+        self._connection.respond(request, {
+            "supportsConfigurationDoneRequest": True,
+            "supportsConditionalBreakpoints": True,
+            "supportsHitConditionalBreakpoints": True,
+            "supportsReadMemoryRequest": True,
+            "supportsStepBack": True
+        })
+        self._connection.notify("initialized")
+
+    def _on_launch(self, request, arguments):
+        self._view.inputs = list(arguments.get("inputs", []))
+        self._connection.respond(request)
+
+    def _on_attach(self, request, arguments):
+        self._on_launch(request, arguments)
+
+    def _on_configuration_done(self, request, arguments):
+        self._connection.respond(request)
+        self._notify_stop("entry")
+
+    def _on_set_breakpoints(self, request, arguments):
+        source = arguments.get("source", {}).get("path")
+        for (path, line), address in list(self._breakpoints.items()):
+            if path == source:
+                self._debugger.clear_breakpoint(address)
+                del self._breakpoints[(path, line)]
+        results = []
+        for each in arguments.get("breakpoints", []):
+            line = each["line"]
+            try:
+                if self._map is None:
+                    raise RuntimeError("Debug information is not available")
+                address = self._map.find_address_by_line(line, self._module_of(arguments))
+                command = f"break at address {address}"
+                if each.get("condition"):
+                    command += f" if {each['condition']}"
+                if each.get("hitCondition"):
+                    command += f" after {max(0, int(each['hitCondition']) - 1)} hits"
+                DebugController._parse_command(command).send_to(self._debugger, self._view)
+                self._breakpoints[(source, line)] = address
+                results.append({ "verified": True, "line": line })
+
+            except Exception as error:
+                results.append({ "verified": False, "line": line, "message": str(error) })
+        self._connection.respond(request, { "breakpoints": results })
+
+    def _module_source(self, module):
+        if module is None or module == self._map.entry_module:
+            return self._source_path
+        entry = Path(self._source_path)
+        return str(entry.with_name(module + entry.suffix))
+
+    def _module_of(self, arguments):
+        path = arguments.get("source", {}).get("path")
+        if path is None or not self._map.modules:
+            return None
+        return Path(path).stem
+
+    def _on_threads(self, request, arguments):
+        self._connection.respond(request, {
+            "threads": [ { "id": self.THREAD, "name": "RASP" } ]
+        })
+
+    def _on_stack_trace(self, request, arguments):
+        address = self._machine.cpu.instruction_pointer
+        frame = {
+            "id": 0,
+            "name": str(self._machine.next_instruction),
+            "line": 0,
+            "column": 0,
+            "instructionPointerReference": str(address)
+        }
+        module = None
+        if self._map is not None:
+            module = self._map.find_module(address)
+            try:
+                frame["line"] = self._map.find_source(address, module)
+                frame["column"] = 1
+            except RuntimeError:
+                pass
+        if self._source_path:
+            frame["source"] = { "path": self._module_source(module) }
+        self._connection.respond(request, { "stackFrames": [frame], "totalFrames": 1 })
+
+    def _on_scopes(self, request, arguments):
+        scopes = [ { "name": "Registers",
+                     "variablesReference": self.REGISTERS,
+                     "expensive": False } ]
+        if self._map is not None:
+            scopes.append({ "name": "Symbols",
+                            "variablesReference": self.SYMBOLS,
+                            "expensive": False })
+        self._connection.respond(request, { "scopes": scopes })
+
+    def _on_variables(self, request, arguments):
+        reference = arguments.get("variablesReference")
+        cpu = self._machine.cpu
+        variables = []
+        if reference == self.REGISTERS:
+            variables = [
+                self._variable("ACC", cpu.accumulator),
+                self._variable("IP", cpu.instruction_pointer,
+                               memory_reference=cpu.instruction_pointer)
+            ]
+        elif reference == self.SYMBOLS and self._map is not None:
+            memory = self._machine.memory
+            for line, address, symbol in self._map.as_table():
+                if symbol:
+                    variables.append(self._variable(symbol,
+                                                    memory.peek(address),
+                                                    memory_reference=address))
+        self._connection.respond(request, { "variables": variables })
+
+    @staticmethod
+    def _variable(name, value, memory_reference=None):
+        variable = { "name": name, "value": str(value), "variablesReference": 0 }
+        if memory_reference is not None:
+            variable["memoryReference"] = str(memory_reference)
+        return variable
+
+    def _on_read_memory(self, request, arguments):
+        memory = self._machine.memory
+        start = int(arguments["memoryReference"]) * self.CELL_SIZE \
+            + arguments.get("offset", 0)
+        end = start + arguments["count"]
+        first = max(0, start // self.CELL_SIZE)
+        last = min(memory.capacity, -(-end // self.CELL_SIZE))
+        cells = []
+        for address in range(first, last):
+            try:
+                cells.append(self.CELL.pack(memory.peek(address)))
+            except struct.error:
+                break
+        data = b"".join(cells)[start - first * self.CELL_SIZE:end - first * self.CELL_SIZE]
+        self._connection.respond(request, {
+            "address": str(start // self.CELL_SIZE),
+            "data": b64encode(data).decode("ascii"),
+            "unreadableBytes": (end - start) - len(data)
+        })
+
+    def _on_continue(self, request, arguments):
+        self._connection.respond(request, { "allThreadsContinued": True })
+        self._view.watchpoint_hit = None
+        self._resume(self._debugger.run, "breakpoint")
+
+    def _on_next(self, request, arguments):
+        self._connection.respond(request)
+        self._view.watchpoint_hit = None
+        self._resume(self._debugger.step, "step")
+
+    def _on_step_in(self, request, arguments):
+        self._on_next(request, arguments)
+
+    def _on_step_back(self, request, arguments):
+        self._connection.respond(request)
+        self._resume(self._debugger.step_back, "step")
+
+    def _on_reverse_continue(self, request, arguments):
+        self._connection.respond(request)
+        self._view.watchpoint_hit = None
+        self._resume(self._debugger.reverse_continue, "breakpoint")
+
+    def _on_disconnect(self, request, arguments):
+        self._connection.respond(request)
+        return False
+
+    def _resume(self, run, reason):
+        try:
+            run()
+
+        except Exception as error:
+            self._view.report_error(error)
+            self._notify_stop("exception", str(error))
+            return
+        self._notify_stop(reason)
+
+    def _notify_stop(self, reason, description=None):
+        if self._machine.is_stopped:
+            self._connection.notify("exited", { "exitCode": 0 })
+            self._connection.notify("terminated")
+            return
+        body = { "reason": reason, "threadId": self.THREAD, "allThreadsStopped": True }
+        if description:
+            body["description"] = description
+        if self._view.watchpoint_hit:
+            kind, address, value = self._view.watchpoint_hit
+            body["reason"] = "data breakpoint"
+            body["description"] = f"{kind} {value} at address {address}"
+        self._connection.notify("stopped", body)
+
+
+
+def serve_on(port, adapter):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(("127.0.0.1", port))
+        server.listen(1)
+        connection, client = server.accept()
+        with connection:
+            stream = connection.makefile("rwb")
+            adapter.serve(stream, stream)
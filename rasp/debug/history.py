@@ -0,0 +1,183 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from collections import deque
+
+
+class History:
+
+    NO_WRITES = ()
+
+    def __init__(self, machine, limit=1000000, interval=10000):
+        self._machine = machine
+        self.limit = limit
+        self.interval = interval
+        self.cycle = 0
+        self.horizon = 0
+        self._first = 0
+        self._entries = deque()
+        self._checkpoints = deque()
+        self._inputs = {}
+        self._size = 0
+        self.is_replaying = False
+        self.changes = {}
+
+    @property
+    def first_cycle(self):
+        return self._first
+
+    @property
+    def size(self):
+        return self._size
+
+    def mark(self):
+        self.changes = {}
+
+    def record(self, instruction):
+        self.is_replaying = self.cycle < self.horizon
+        machine = self._machine
+        written_cells = instruction.written_cells
+        writes = self.NO_WRITES
+        if written_cells:
+            capacity = machine.memory.capacity
+            writes = tuple((address, machine.memory.peek(address))
+                           for address in written_cells
+                           if -capacity <= address < capacity)
+            for address, value in writes:
+                if address not in self.changes:
+                    self.changes[address] = value
+        if self.limit > 0:
+            if self.cycle % self.interval == 0 \
+               and (not self._checkpoints or self._checkpoints[-1][0] < self.cycle):
+                self._save_checkpoint()
+            self._entries.append((machine.cpu.instruction_pointer,
+                                  machine.cpu.accumulator,
+                                  writes))
+            self._size += 2 + 2 * len(writes)
+        self.cycle += 1
+        self.horizon = max(self.horizon, self.cycle)
+        if self.limit <= 0:
+            self._first = self.cycle
+        elif self._size > self.limit:
+            self._evict()
+
+    def record_input(self, value):
+        self._inputs[self.cycle - 1] = value
+        self._size += 1
+
+    def recorded_input(self):
+        if not self.is_replaying:
+            return None
+        return self._inputs.get(self.cycle - 1)
+
+    def forget_future(self):
+        self.horizon = self.cycle
+        for cycle in [each for each in self._inputs if each >= self.cycle]:
+            del self._inputs[cycle]
+            self._size -= 1
+
+    def undo(self):
+        if self.cycle <= self._first:
+            raise RuntimeError(f"History starts at cycle {self._first}")
+        ip, accumulator, writes = self._entries.pop()
+        self._size -= 2 + 2 * len(writes)
+        machine = self._machine
+        for address, value in reversed(writes):
+            if address not in self.changes:
+                self.changes[address] = machine.memory.peek(address)
+            machine.memory.load_image(address, [value])
+        machine.cpu.instruction_pointer = ip
+        machine.cpu.accumulator = accumulator
+        machine.resume()
+        self.cycle -= 1
+        while self._checkpoints and self._checkpoints[-1][0] > self.cycle:
+            self._drop_checkpoint(-1)
+        return writes
+
+    def rewind_to(self, target):
+        if target < self._first:
+            raise RuntimeError(f"History starts at cycle {self._first}")
+        checkpoint = None
+        for each in self._checkpoints:
+            if each[0] <= target:
+                checkpoint = each
+        if checkpoint is None or self.cycle - target <= target - checkpoint[0]:
+            while self.cycle > target:
+                self.undo()
+            return self.cycle
+        cycle = checkpoint[0]
+        while self.cycle > cycle:
+            ip, accumulator, writes = self._entries.pop()
+            self._size -= 2 + 2 * len(writes)
+            self.cycle -= 1
+        while self._checkpoints and self._checkpoints[-1][0] > cycle:
+            self._drop_checkpoint(-1)
+        cycle, ip, accumulator, cells = checkpoint
+        machine = self._machine
+        for address, value in enumerate(cells):
+            current = machine.memory.peek(address)
+            if current != value and address not in self.changes:
+                self.changes[address] = current
+        machine.memory.load_image(0, list(cells))
+        machine.cpu.instruction_pointer = ip
+        machine.cpu.accumulator = accumulator
+        machine.resume()
+        return cycle
+
+    def _save_checkpoint(self):
+        machine = self._machine
+        cells = [machine.memory.peek(address)
+                 for address in range(machine.memory.capacity)]
+        self._checkpoints.append((self.cycle,
+                                  machine.cpu.instruction_pointer,
+                                  machine.cpu.accumulator,
+                                  cells))
+        self._size += 2 + len(cells)
+
+    def _drop_checkpoint(self, index):
+        cycle, ip, accumulator, cells = self._checkpoints[index]
+        del self._checkpoints[index]
+        self._size -= 2 + len(cells)
+
+    def _evict(self):
+        while self._size > self.limit and self._entries:
+            ip, accumulator, writes = self._entries.popleft()
+            self._size -= 2 + 2 * len(writes)
+            if self._first in self._inputs:
+                del self._inputs[self._first]
+                self._size -= 1
+            self._first += 1
+            while self._checkpoints and self._checkpoints[0][0] < self._first:
+                self._drop_checkpoint(0)
+
+
+class ReplayInputDevice:
+
+    def __init__(self, device, history):
+        self._device = device
+        self._history = history
+
+    def read(self):
+        value = self._history.recorded_input()
+        if value is None:
+            value = self._device.read()
+            self._history.record_input(value)
+        return value
+
+
+class ReplayOutputDevice:
+
+    def __init__(self, device, history):
+        self._device = device
+        self._history = history
+
+    def write(self, value):
+        if not self._history.is_replaying:
+            self._device.write(value)
@@ -0,0 +1,123 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from rasp.debug.controller import DebugController
+from rasp.debug.core import Debugger
+from rasp.executable import Loader
+from rasp.machine import RASP
+
+
+
+def run_script(executable_file, commands, assembly_code=None, inputs=None,
+               history_size=1000000):
+    view = ScriptView(inputs)
+    machine = RASP(input_device=view, output_device=view)
+    debug_infos = Loader().from_file(machine.memory, executable_file)
+    debugger = Debugger(machine, view, debug_infos, assembly_code, history_size)
+    DebugController(debugger, view).run_script(commands)
+    return view.records
+
+
+
+class ScriptView:
+
+    def __init__(self, inputs=None):
+        self._inputs = iter(inputs or [])
+        self.records = []
+
+    def begin(self, command):
+        self.records.append({ "command": command, "results": [] })
+
+    def _report(self, kind, **details):
+        if not self.records:
+            self.begin(None)
+        self.records[-1]["results"].append({ "type": kind, **details })
+
+    def show_help(self):
+        pass
+
+    def show_memory(self, memory_fragment):
+        self._report("memory", cells=[
+            { "address": address,
+              "value": value,
+              "is_current": is_current,
+              "is_breakpoint": is_breakpoint,
+              "mnemonic": mnemonic }
+            for address, value, is_current, is_breakpoint, mnemonic in memory_fragment
+        ])
+
+    def show_memory_dump(self, rows, remaining):
+        self._report("memory_dump",
+                     rows=[ { "address": start, "values": values } for start, values in rows ],
+                     remaining=remaining)
+
+    def show_changes(self, changes):
+        self._report("changes", cells=[
+            { "address": address, "old": old_value, "new": new_value }
+            for address, old_value, new_value in changes
+        ])
+
+    def show_breakpoints(self, infos):
+        self._report("breakpoints", breakpoints=[
+            { "address": address,
+              "is_current": is_current,
+              "value": value,
+              "mnemonic": mnemonic,
+              "condition": condition }
+            for address, is_current, value, mnemonic, condition in infos
+        ])
+
+    def show_watchpoints(self, infos):
+        self._report("watchpoints", watchpoints=[
+            { "kind": kind, "start": start, "end": end }
+            for kind, start, end in infos
+        ])
+
+    def show_watchpoint_hit(self, kind, address, value):
+        self._report("watchpoint", kind=kind, address=address, value=value)
+
+    def show_cpu(self, view):
+        self._report("cpu",
+                     acc=view[0],
+                     ip=view[1],
+                     instruction=view[2],
+                     cycle=view[3])
+
+    def show_source(self, code_fragment):
+        self._report("source", lines=[
+            { "line": line_number,
+              "is_current": is_current,
+              "is_breakpoint": is_breakpoint,
+              "code": code }
+            for line_number, is_current, is_breakpoint, code in code_fragment
+        ])
+
+    def no_source_code(self):
+        self.report_error("Assembly code is not available")
+
+    def show_instruction(self, instruction):
+        self._report("instruction", instruction=instruction)
+
+    def invalid_command(self, command):
+        self._report("error", message=f"Invalid command '{command}'")
+
+    def report_error(self, error):
+        self._report("error", message=str(error))
+
+    def read(self):
+        try:
+            value = int(next(self._inputs))
+        except StopIteration:
+            raise RuntimeError("No more input available")
+        self._report("input", value=value)
+        return value
+
+    def write(self, value):
+        self._report("output", value=value)
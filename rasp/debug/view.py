@@ -21,21 +21,31 @@ class DebugView:
         items = [
             "break at address <address>",
             "break at line <line_number>",
+            "break at <address|symbol> (if <condition>)? (after <count> hits)?",
             "clear address <address>",
             "clear line <line_number>",
+            "clear watch <address>",
             "continue",
             "exit",
+            "goto cycle <cycle>",
             "set acc <value>",
             "set ip <value>",
             "set memory <address> <value>",
             "show breakpoints",
+            "show changes",
             "show cpu",
-            "show memory <from:address> <to:address>?",
+            "show memory <from:address>? <to:address>?",
             "show source <from:line> <to:line>?",
+            "show watchpoints",
             "show <symbol>",
             "step <count:value>?",
+            "step back <count:value>?",
+            "trace on|off",
             "quit",
-            "run"
+            "reverse continue",
+            "run",
+            "watch (read|write|access)? <from:address> <to:address>?",
+            "watch (read|write|access)? <symbol>"
         ]
 
         self._format_list("Available commands", items)
@@ -57,17 +67,43 @@ class DebugView:
             items.append(item)
         self._format_list("Memory", items)
 
+    def show_memory_dump(self, rows, remaining):
+        items = []
+        for start, values in rows:
+            cells = " ".join(f"{value:>6}" for value in values)
+            items.append(f"{start:0>4}: {cells}")
+        if remaining > 0:
+            items.append(f"... {remaining} more cell(s), use 'show memory' to continue")
+        self._format_list("Memory", items)
+
+    def show_changes(self, changes):
+        items = [f"{address:0>4}: {old_value:>6} -> {new_value}"
+                 for address, old_value, new_value in changes]
+        self._format_list("Changes", items)
+
     def show_breakpoints(self, infos):
         items = []
-        for address, is_current, value, mnemonic in infos:
+        for address, is_current, value, mnemonic, condition in infos:
             current = ">>>" if is_current else "   "
-            items.append(f"{current} {address:>5}: {value:>5} {mnemonic:<20}")
+            items.append(f"{current} {address:>5}: {value:>5} {mnemonic:<20} {condition}".rstrip())
         self._format_list("Breakpoints", items)
 
+    def show_watchpoints(self, infos):
+        items = []
+        for kind, start, end in infos:
+            cells = f"{start:>5}" if start == end else f"{start:>5} to {end}"
+            items.append(f"{kind:<6} {cells}")
+        self._format_list("Watchpoints", items)
+
+    def show_watchpoint_hit(self, kind, address, value):
+        action = "Read" if kind == "read" else "Write"
+        self._format_message(f"Watchpoint: {action} {value} at address {address}")
+
     def show_cpu(self, view):
         self._format_list("CPU:", [
             f"ACC: {view[0]:>6}",
-            f" IP: {view[1]:0>6} ~ {view[2]}"
+            f" IP: {view[1]:0>6} ~ {view[2]}",
+            f"CYC: {view[3]:>6}"
         ])
 
     def show_source(self, code_fragment):
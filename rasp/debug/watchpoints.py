@@ -0,0 +1,127 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from bisect import bisect_right
+
+
+class Watchpoint:
+
+    READ = "read"
+    WRITE = "write"
+    ACCESS = "access"
+
+    MASKS = { READ: 1, WRITE: 2, ACCESS: 3 }
+
+
+    def __init__(self, start, end=None, kind=WRITE):
+        if kind not in self.MASKS:
+            raise RuntimeError(f"Unknown kind of watchpoint '{kind}'")
+        self.start = start
+        self.end = start if end is None else end
+        if self.end < self.start:
+            raise RuntimeError(f"Invalid address range {start}-{end}")
+        self.kind = kind
+
+    @property
+    def mask(self):
+        return self.MASKS[self.kind]
+
+    def covers(self, address):
+        return self.start <= address <= self.end
+
+    def __eq__(self, other):
+        if not isinstance(other, Watchpoint):
+            return False
+        return self.start == other.start \
+            and self.end == other.end \
+            and self.kind == other.kind
+
+    def __str__(self):
+        cells = str(self.start) if self.start == self.end else f"{self.start}-{self.end}"
+        return f"{self.kind} {cells}"
+
+
+class WatchpointIndex:
+
+    def __init__(self):
+        self._watchpoints = []
+        self._starts = []
+        self._segments = []
+        self._lowest = 0
+        self._highest = -1
+        self.hit = None
+
+    def __len__(self):
+        return len(self._watchpoints)
+
+    def __iter__(self):
+        return iter(self._watchpoints)
+
+    def add(self, watchpoint):
+        if watchpoint not in self._watchpoints:
+            self._watchpoints.append(watchpoint)
+            self._rebuild()
+
+    def remove_at(self, address):
+        removed = [each for each in self._watchpoints if each.covers(address)]
+        self._watchpoints = [each for each in self._watchpoints
+                             if not each.covers(address)]
+        self._rebuild()
+        return removed
+
+    def find(self, address, kind=Watchpoint.ACCESS):
+        index = bisect_right(self._starts, address) - 1
+        if index < 0:
+            return []
+        end, mask, watchpoints = self._segments[index]
+        if address > end or not mask & Watchpoint.MASKS[kind]:
+            return []
+        return [each for each in watchpoints if each.mask & Watchpoint.MASKS[kind]]
+
+    def on_read(self, address, value):
+        self._check(address, value, 1)
+
+    def on_write(self, address, value):
+        self._check(address, value, 2)
+
+    def _check(self, address, value, mask):
+        if address < self._lowest or address > self._highest:
+            return
+        index = bisect_right(self._starts, address) - 1
+        if index >= 0:
+            end, watched, watchpoints = self._segments[index]
+            if address <= end and watched & mask and self.hit is None:
+                kind = Watchpoint.READ if mask == 1 else Watchpoint.WRITE
+                self.hit = (kind, address, value)
+
+    def _rebuild(self):
+        boundaries = sorted(set([each.start for each in self._watchpoints]
+                                + [each.end + 1 for each in self._watchpoints]))
+        self._starts = []
+        self._segments = []
+        self._lowest = 0
+        self._highest = -1
+        active = []
+        by_start = sorted(self._watchpoints, key=lambda watchpoint: watchpoint.start)
+        position = 0
+        for start, following in zip(boundaries, boundaries[1:]):
+            while position < len(by_start) and by_start[position].start <= start:
+                active.append(by_start[position])
+                position += 1
+            active = [each for each in active if each.end >= start]
+            if active:
+                mask = 0
+                for each in active:
+                    mask |= each.mask
+                self._starts.append(start)
+                self._segments.append((following - 1, mask, list(active)))
+        if self._segments:
+            self._lowest = self._starts[0]
+            self._highest = self._segments[-1][0]
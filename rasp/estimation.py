@@ -0,0 +1,672 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from rasp.analysis import ControlFlowGraph
+
+
+class Polynomial:
+
+    @staticmethod
+    def constant(value):
+        return Polynomial({(): value})
+
+    @staticmethod
+    def symbol(name):
+        return Polynomial({(name,): 1})
+
+
+    def __init__(self, terms=None):
+        self.terms = { monomial: coefficient
+                       for monomial, coefficient in (terms or {}).items()
+                       if coefficient != 0 }
+
+    @property
+    def symbols(self):
+        return set(name for monomial in self.terms for name in monomial)
+
+    @property
+    def is_constant(self):
+        return all(monomial == () for monomial in self.terms)
+
+    @property
+    def value(self):
+        return self.terms.get((), 0)
+
+    def coefficient(self, monomial):
+        return self.terms.get(monomial, 0)
+
+    def __add__(self, other):
+        terms = dict(self.terms)
+        for monomial, coefficient in other.terms.items():
+            terms[monomial] = terms.get(monomial, 0) + coefficient
+        return Polynomial(terms)
+
+    def __neg__(self):
+        return Polynomial({ monomial: -coefficient
+                            for monomial, coefficient in self.terms.items() })
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __mul__(self, other):
+        terms = {}
+        for left, left_coefficient in self.terms.items():
+            for right, right_coefficient in other.terms.items():
+                monomial = tuple(sorted(left + right))
+                terms[monomial] = terms.get(monomial, 0) \
+                    + left_coefficient * right_coefficient
+        return Polynomial(terms)
+
+    def substitute(self, mapping):
+        result = Polynomial()
+        for monomial, coefficient in self.terms.items():
+            term = Polynomial.constant(coefficient)
+            for name in monomial:
+                term = term * mapping.get(name, Polynomial.symbol(name))
+            result = result + term
+        return result
+
+    def lowest(self, other):
+        return Polynomial({ monomial: min(self.coefficient(monomial),
+                                          other.coefficient(monomial))
+                            for monomial in set(self.terms) | set(other.terms) })
+
+    def highest(self, other):
+        return Polynomial({ monomial: max(self.coefficient(monomial),
+                                          other.coefficient(monomial))
+                            for monomial in set(self.terms) | set(other.terms) })
+
+    @property
+    def key(self):
+        return tuple(sorted(self.terms.items()))
+
+    def __eq__(self, other):
+        return isinstance(other, Polynomial) and self.terms == other.terms
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __str__(self):
+        if not self.terms:
+            return "0"
+        text = ""
+        ordered = sorted(self.terms.items(), key=lambda term: (len(term[0]), term[0]))
+        for monomial, coefficient in ordered:
+            factors = []
+            for name in sorted(set(monomial)):
+                power = monomial.count(name)
+                factors.append(name if power == 1 else f"{name}^{power}")
+            if abs(coefficient) != 1 or not factors:
+                factors.insert(0, str(abs(coefficient)))
+            term = "*".join(factors)
+            if not text:
+                text = term if coefficient > 0 else f"-{term}"
+            else:
+                text += f" + {term}" if coefficient > 0 else f" - {term}"
+        return text
+
+    def __repr__(self):
+        return f"Polynomial({self})"
+
+
+class TripCount:
+
+    def __init__(self, bound, step, is_nonnegative):
+        self.bound = bound
+        self.step = step
+        self.is_nonnegative = is_nonnegative
+
+    def __str__(self):
+        bound = str(self.bound) if self.is_nonnegative else f"max(0, {self.bound})"
+        if self.step == 1:
+            return bound
+        return f"ceil({bound} / {self.step})"
+
+
+class LoopEstimate:
+
+    def __init__(self, number, loop, location, iterations=None, reason=None):
+        self.number = number
+        self.loop = loop
+        self.location = location
+        self.iterations = iterations
+        self.reason = reason
+
+    @property
+    def is_known(self):
+        return self.iterations is not None
+
+
+class Estimate:
+
+    def __init__(self, best, worst, loops, definitions, inputs, listing, reasons):
+        self.best = best
+        self.worst = worst
+        self.loops = loops
+        self.definitions = definitions
+        self.inputs = inputs
+        self.indexes = sorted(set(name
+                                  for each in definitions.values()
+                                  for name in each.bound.symbols
+                                  if name[0] == "i" and name[1:].isdigit()))
+        self.listing = listing
+        self.reasons = reasons
+
+
+class EstimationError(Exception):
+    pass
+
+
+class Path:
+
+    def __init__(self, state, accumulator=None, best=None, worst=None):
+        self.state = state
+        self.accumulator = accumulator
+        self.best = best if best is not None else Polynomial()
+        self.worst = worst
+
+    def charge(self, best, worst):
+        return Path(self.state, self.accumulator, self.best + best,
+                    None if self.worst is None or worst is None else self.worst + worst)
+
+
+class CycleEstimator:
+
+    LATCH = "latch"
+    HALT = "halt"
+
+    @staticmethod
+    def from_program(program, instructions=None):
+        from rasp.assembler import Assembler
+
+        executable = Assembler(instructions).build(program)
+        graph = ControlFlowGraph(executable.image, instructions=instructions)
+        return CycleEstimator(graph, executable.debug_infos, len(executable.code))
+
+
+    def __init__(self, graph, program_map=None, code_size=None):
+        self._graph = graph
+        self._program_map = program_map
+        self._code_size = code_size
+        self._loops = { each.header: each for each in graph.loops() }
+        self._innermost = {}
+        for each_loop in sorted(graph.loops(), key=lambda loop: loop.depth):
+            for start in each_loop.body:
+                self._innermost[start] = each_loop
+        self._trips = {}
+        self._interned = {}
+        self._nonnegative = set()
+        self._inputs = {}
+        self._reports = {}
+        self._labels = {}
+        if program_map is not None:
+            self._labels = { address: label
+                             for line, address, label in program_map.as_table() if label }
+
+
+    def estimate(self):
+        self._reports = {}
+        reasons = []
+        best, worst = None, None
+        try:
+            writes = self._graph.self_modifying_writes()
+            if writes:
+                address, target = writes[0]
+                raise EstimationError(f"{self._locate(address)} modifies the code "
+                                      f"at {self._locate(target)}")
+            entry = Path({}, None, Polynomial(), Polynomial())
+            start = self._classify(None, self._graph.entry)
+            endpoints, outputs = self._run_region(None, start, entry)
+            if self.HALT not in endpoints:
+                raise EstimationError("the program never halts")
+            best = endpoints[self.HALT].best
+            worst = endpoints[self.HALT].worst
+
+        except EstimationError as error:
+            reasons.append(str(error))
+
+        return self._summarize(best, worst, reasons)
+
+
+    def _run_region(self, loop, start, path, stop=None):
+        order = self._sort_region(loop, start, stop)
+        incoming = { start: path }
+        endpoints = {}
+        outputs = {}
+        for node in order:
+            current = incoming.pop(node, None)
+            if current is None:
+                continue
+            exits = self._run_node(loop, node, current)
+            outputs[node] = exits[0][1] if exits else current
+            if node == stop:
+                continue
+            for target, each_path in exits:
+                key = self._classify(loop, target)
+                table = incoming if self._is_node(key) else endpoints
+                if key in table:
+                    table[key] = self._merge(table[key], each_path)
+                else:
+                    table[key] = each_path
+        return endpoints, outputs
+
+
+    def _merge(self, left, right):
+        state = {}
+        for address in set(left.state) | set(right.state):
+            value = self._value(left.state, address)
+            state[address] = value if value == self._value(right.state, address) else None
+        accumulator = left.accumulator if left.accumulator == right.accumulator else None
+        worst = None
+        if left.worst is not None and right.worst is not None:
+            worst = left.worst.highest(right.worst)
+        return Path(state, accumulator, left.best.lowest(right.best), worst)
+
+
+    def _sort_region(self, loop, start, stop):
+        successors = {}
+        pending = [start]
+        while pending:
+            node = pending.pop()
+            if node in successors:
+                continue
+            successors[node] = []
+            if node == stop:
+                continue
+            for target in self._targets_of(node):
+                key = self._classify(loop, target)
+                if self._is_node(key):
+                    successors[node].append(key)
+                    pending.append(key)
+
+        predecessor_count = { node: 0 for node in successors }
+        for targets in successors.values():
+            for each in targets:
+                predecessor_count[each] += 1
+        order = []
+        ready = [start] if predecessor_count[start] == 0 else []
+        while ready:
+            node = ready.pop()
+            order.append(node)
+            for each in successors[node]:
+                predecessor_count[each] -= 1
+                if predecessor_count[each] == 0:
+                    ready.append(each)
+        if len(order) != len(successors):
+            raise EstimationError("the control flow is irreducible")
+        return order
+
+
+    def _targets_of(self, node):
+        if isinstance(node, int):
+            block = self._graph.blocks[node]
+            if not block.successors:
+                return [None]
+            return [target for target, kind in block.successors]
+        return [target for source, target in self._exits_of(node)]
+
+
+    def _exits_of(self, loop):
+        exits = []
+        for start in sorted(loop.body):
+            block = self._graph.blocks[start]
+            if not block.successors:
+                exits.append((start, None))
+            for target, kind in block.successors:
+                if target not in loop.body:
+                    exits.append((start, target))
+        return exits
+
+
+    def _classify(self, loop, target):
+        if target is None:
+            return self.HALT
+        if loop is not None and target == loop.header:
+            return self.LATCH
+        if loop is not None and target not in loop.body:
+            return ("exit", target)
+        inner = self._innermost.get(target)
+        if inner is None or inner is loop:
+            return target
+        while inner.parent is not loop:
+            inner = inner.parent
+        return inner
+
+    @staticmethod
+    def _is_node(key):
+        return key not in (CycleEstimator.LATCH, CycleEstimator.HALT) \
+            and not isinstance(key, tuple)
+
+
+    def _run_node(self, loop, node, path):
+        if not isinstance(node, int):
+            return self._run_loop(node, path)
+        block = self._graph.blocks[node]
+        state = dict(path.state)
+        accumulator = path.accumulator
+        for address, mnemonic, operand in block.instructions:
+            if mnemonic == "load":
+                accumulator = Polynomial.constant(operand)
+            elif mnemonic in ("add", "subtract"):
+                value = self._value(state, operand)
+                if accumulator is None or value is None:
+                    accumulator = None
+                elif mnemonic == "add":
+                    accumulator = accumulator + value
+                else:
+                    accumulator = accumulator - value
+            elif mnemonic == "store":
+                state[operand] = accumulator
+            elif mnemonic == "read":
+                state[operand] = self._input(address, operand) if loop is None else None
+        cost = Polynomial.constant(len(block.instructions))
+        after = Path(state, accumulator, path.best, path.worst).charge(cost, cost)
+        return [(target, after) for target in self._targets_of(node)]
+
+
+    def _value(self, state, address):
+        if address in state:
+            return state[address]
+        return Polynomial.constant(self._graph.cell(address))
+
+
+    def _input(self, address, cell):
+        if address not in self._inputs:
+            name = self._labels.get(cell) or f"input{len(self._inputs) + 1}"
+            while name in self._inputs.values():
+                name += "_"
+            self._inputs[address] = name
+        return Polynomial.symbol(self._inputs[address])
+
+
+    def _run_loop(self, loop, path):
+        written = set(operand
+                      for start in loop.body
+                      for address, mnemonic, operand in self._graph.blocks[start].instructions
+                      if mnemonic in ControlFlowGraph.WRITES)
+
+        exit_test, reason = self._find_exit_test(loop)
+        if exit_test is None:
+            return self._run_unknown_loop(loop, path, written, reason)
+
+        index = f"i@{loop.header}"
+        self._nonnegative.add(index)
+        increments = self._find_increments(loop, path, written)
+        state = dict(path.state)
+        for address in written:
+            entry = self._value(path.state, address)
+            if increments.get(address) is None or entry is None:
+                state[address] = None
+            else:
+                state[address] = entry + increments[address] * Polynomial.symbol(index)
+        iteration = Path(state, None, Polynomial(), Polynomial())
+
+        source, target, is_taken = exit_test
+        endpoints, outputs = self._run_region(loop, loop.header, iteration, stop=source)
+        before = outputs[source]
+        count, reason = self._count_iterations(before.accumulator, index, is_taken)
+        if count is None:
+            return self._run_unknown_loop(loop, path, written, reason)
+
+        inside = [each for each in self._targets_of(source) if each != target][0]
+        if inside == loop.header:
+            after = Path(before.state, before.accumulator, Polynomial(), Polynomial())
+        else:
+            start = Path(before.state, before.accumulator, Polynomial(), Polynomial())
+            endpoints, outputs = self._run_region(loop, self._classify(loop, inside), start)
+            after = endpoints[self.LATCH]
+
+        best = self._total(before.best, after.best, index, count, True)
+        if best is None:
+            return self._run_unknown_loop(
+                loop, path, written, "its cost varies irregularly between iterations")
+        worst = self._total(before.worst, after.worst, index, count, False)
+
+        self._reports[loop.header] = (count, None)
+        state = dict(before.state)
+        for address in written:
+            state[address] = self._substitute(before.state.get(address), index, count)
+        accumulator = self._substitute(before.accumulator, index, count)
+        exit_path = Path(state, accumulator, path.best, path.worst)
+        return [(target, exit_path.charge(best, worst))]
+
+
+    def _count_iterations(self, condition, index, is_taken):
+        if condition is None:
+            return None, "its exit test depends on values that do not change by a fixed step"
+        if not is_taken:
+            condition = -condition - Polynomial.constant(1)
+        step = condition.coefficient((index,))
+        initial = condition - Polynomial.constant(step) * Polynomial.symbol(index)
+        if self._depends_on_poly(initial, index):
+            return None, "its exit test does not change by a fixed step"
+        if initial.is_constant and initial.value >= 0:
+            return Polynomial(), None
+        if step <= 0:
+            return None, "its exit test does not move towards the exit, so it may never end"
+        return self._trip(-initial, step), None
+
+
+    def _total(self, before, after, index, count, lowest):
+        before = self._bound(before, index, count, lowest)
+        after = self._bound(after, index, count, lowest)
+        if before is None or after is None:
+            return None
+        return (count + Polynomial.constant(1)) * before + count * after
+
+
+    def _find_increments(self, loop, path, written):
+        state = dict(path.state)
+        for address in written:
+            state[address] = Polynomial.symbol(f"${address}")
+        start = Path(state, None, Polynomial(), Polynomial())
+        endpoints, outputs = self._run_region(loop, loop.header, start)
+        if self.LATCH not in endpoints:
+            return {}
+        increments = {}
+        for address in written:
+            final = endpoints[self.LATCH].state.get(address)
+            if final is None:
+                continue
+            increment = final - Polynomial.symbol(f"${address}")
+            if not any(self._depends_on_poly(increment, f"${each}") for each in written):
+                increments[address] = increment
+        return increments
+
+
+    def _find_exit_test(self, loop):
+        exits = self._exits_of(loop)
+        if len(exits) != 1:
+            return None, f"it has {len(exits)} exits" if exits else "it has no exit"
+        source, target = exits[0]
+        if target is None:
+            return None, "it ends by halting the machine"
+        if self._innermost.get(source) is not loop:
+            return None, "it exits from a nested loop"
+        if len(self._graph.blocks[source].successors) != 2:
+            return None, "its exit is not a conditional jump"
+        latches = [each for each in self._graph.blocks[loop.header].predecessors
+                   if each in loop.body]
+        if not all(self._graph.dominates(source, each) for each in latches):
+            return None, "its exit test does not run on every iteration"
+        is_taken = any(each == target and kind == ControlFlowGraph.TAKEN
+                       for each, kind in self._graph.blocks[source].successors)
+        return (source, target, is_taken), None
+
+
+    def _run_unknown_loop(self, loop, path, written, reason):
+        state = dict(path.state)
+        for address in written:
+            state[address] = None
+        endpoints, outputs = self._run_region(loop, loop.header,
+                                              Path(state, None, Polynomial(), Polynomial()))
+        self._reports[loop.header] = (None, reason)
+        exits = []
+        for key, each_path in endpoints.items():
+            if key == self.LATCH:
+                continue
+            target = None if key == self.HALT else key[1]
+            exits.append((target, Path(each_path.state, each_path.accumulator,
+                                       path.best + each_path.best, None)))
+        return exits
+
+
+    def _trip(self, bound, step):
+        if bound.is_constant:
+            return Polynomial.constant(max(0, -(-bound.value // step)))
+        is_nonnegative = self._is_nonnegative(bound)
+        if step == 1 and is_nonnegative:
+            return bound
+        key = (bound.key, step)
+        if key not in self._interned:
+            name = f"t{len(self._trips) + 1}"
+            self._trips[name] = TripCount(bound, step, is_nonnegative)
+            self._nonnegative.add(name)
+            self._interned[key] = name
+        return Polynomial.symbol(self._interned[key])
+
+
+    def _is_nonnegative(self, polynomial):
+        return all(coefficient > 0 for coefficient in polynomial.terms.values()) \
+            and polynomial.symbols <= self._nonnegative
+
+
+    def _depends_on(self, name, index):
+        if name == index:
+            return True
+        if name in self._trips:
+            return self._depends_on_poly(self._trips[name].bound, index)
+        return False
+
+    def _depends_on_poly(self, polynomial, index):
+        return any(self._depends_on(each, index) for each in polynomial.symbols)
+
+
+    def _bound(self, polynomial, index, count, lowest):
+        if polynomial is None:
+            return None
+        result = Polynomial()
+        for monomial, coefficient in polynomial.terms.items():
+            term = Polynomial.constant(coefficient)
+            if any(self._depends_on(each, index) for each in monomial):
+                if not set(monomial) <= self._nonnegative:
+                    return None
+                for each in monomial:
+                    factor = self._bound_symbol(each, index, count,
+                                                lowest == (coefficient > 0))
+                    if factor is None:
+                        return None
+                    term = term * factor
+            else:
+                term = Polynomial({monomial: coefficient})
+            result = result + term
+        return result
+
+    def _bound_symbol(self, name, index, count, lowest):
+        if name == index:
+            return Polynomial() if lowest else count
+        if not self._depends_on(name, index):
+            return Polynomial.symbol(name)
+        trip = self._trips[name]
+        bound = self._bound(trip.bound, index, count, lowest)
+        if bound is None:
+            return None
+        return self._trip(bound, trip.step)
+
+
+    def _substitute(self, polynomial, index, value):
+        if polynomial is None:
+            return None
+        mapping = {}
+        for name in polynomial.symbols:
+            if name == index:
+                mapping[name] = value
+            elif self._depends_on(name, index):
+                trip = self._trips[name]
+                mapping[name] = self._trip(self._substitute(trip.bound, index, value),
+                                           trip.step)
+        return polynomial.substitute(mapping)
+
+
+    def _summarize(self, best, worst, reasons):
+        loops = []
+        names = {}
+        for number, header in enumerate(sorted(self._loops), 1):
+            names[f"i@{header}"] = f"i{number}"
+        for number, header in enumerate(sorted(self._loops), 1):
+            count, reason = self._reports.get(header, (None, "it is never reached"))
+            if count is None:
+                reasons.append(f"loop {number} at {self._locate(header)} runs an "
+                               f"unknown number of times, because {reason}")
+            elif len(count.symbols) == 1:
+                symbol = next(iter(count.symbols))
+                if count == Polynomial.symbol(symbol) and symbol in self._trips \
+                   and symbol not in names:
+                    names[symbol] = f"n{number}"
+            loops.append(LoopEstimate(number, self._loops[header],
+                                      self._locate(header), count, reason))
+
+        used = []
+        pending = [best, worst] + [each.iterations for each in loops]
+        while pending:
+            polynomial = pending.pop(0)
+            if polynomial is None:
+                continue
+            for name in sorted(polynomial.symbols, key=self._creation_order):
+                if name in self._trips and name not in used:
+                    used.append(name)
+                    pending.append(self._trips[name].bound)
+        auxiliaries = [name for name in sorted(used, key=self._creation_order)
+                       if name not in names]
+        for number, name in enumerate(auxiliaries, 1):
+            names[name] = f"m{number}"
+
+        mapping = { name: Polynomial.symbol(new_name) for name, new_name in names.items() }
+        rename = lambda polynomial: None if polynomial is None \
+            else polynomial.substitute(mapping)
+        for each_loop in loops:
+            each_loop.iterations = rename(each_loop.iterations)
+        definitions = {}
+        ordered = sorted(used, key=lambda name: (names[name][0] != "n",
+                                                 int(names[name][1:])))
+        for name in ordered:
+            trip = self._trips[name]
+            definitions[names[name]] = TripCount(rename(trip.bound), trip.step,
+                                                 trip.is_nonnegative)
+        inputs = [name for address, name in sorted(self._inputs.items())]
+        return Estimate(rename(best), rename(worst), loops, definitions, inputs,
+                        self._listing(), reasons)
+
+    def _creation_order(self, name):
+        return (0, int(name[1:])) if name in self._trips else (1, name)
+
+
+    def _listing(self):
+        if self._program_map is None:
+            return []
+        listing = []
+        for line, address, label in self._program_map.as_table():
+            if self._code_size is not None and address >= self._code_size:
+                continue
+            if self._graph.is_code(address):
+                listing.append((line, 1, self._graph.loop_depth(address)))
+            else:
+                listing.append((line, 1, None))
+        return listing
+
+    def _locate(self, address):
+        if self._program_map is None:
+            return f"address {address}"
+        try:
+            location = f"line {self._program_map.find_source(address)}"
+        except RuntimeError:
+            return f"address {address}"
+        label = self._labels.get(address)
+        return f"{location} ({label})" if label else location
@@ -8,48 +8,105 @@
 #
 
 
-from rasp.assembler import ProgramMap
+from rasp.assembler import ModuleLookup, ProgramMap
 
+from array import array
 from io import StringIO
+from itertools import islice
+from mmap import mmap, ACCESS_READ
+from os import remove, replace
+from os.path import exists
+
+import struct
+import sys
+
+
+class Executable:
+
+    def __init__(self, code, data=None, debug_infos=None):
+        self.code = code
+        self.data = data or []
+        self.debug_infos = debug_infos
+
+    @property
+    def size(self):
+        return len(self.code) + sum(count for address, count, value in self.data)
+
+    @property
+    def image(self):
+        image = list(self.code)
+        for address, count, value in self.data:
+            image += [value] * count
+        return image
+
+    def as_layout(self):
+        layout = [self.size] + self.image
+        if self.debug_infos:
+            debug_infos = self.debug_infos.as_table()
+            layout.append(3 * len(debug_infos))
+            for source, address, label in debug_infos:
+                layout += [source, address, label or Loader.NO_LABEL]
+            if self.debug_infos.modules:
+                layout.append(5 * len(self.debug_infos.modules))
+                for each_module in self.debug_infos.modules:
+                    layout += list(each_module)
+        return layout
 
 
 class Loader:
 
     NO_LABEL = "?"
 
+    TEXT = "text"
+    BINARY = "binary"
+
 
-    def from_file(self, memory, file_name):
+    def from_file(self, memory, file_name, with_debug_infos=True):
+        if BinaryFormat.is_binary(file_name):
+            return BinaryFormat().load(memory, file_name, with_debug_infos)
         with open(file_name, "r") as file_stream:
-            return self.from_stream(memory, file_stream)
+            return self.from_stream(memory, file_stream, with_debug_infos)
 
 
     def from_text(self, memory, text):
         return self.from_stream(memory, StringIO(text))
 
-    def from_stream(self, memory, stream):
-        content = stream.read().split()
+    def from_stream(self, memory, stream, with_debug_infos=True):
+        content = stream.read()
+        if isinstance(content, bytes):
+            if content.startswith(BinaryFormat.MAGIC):
+                return BinaryFormat().load_from(memory, content, with_debug_infos)
+            content = content.decode("utf-8")
+        content = content.split(maxsplit=1)
         code_length = int(content[0])
-        address = 0
-        for any_cell in content[1:code_length+1]:
-            if any_cell:
-                try:
-                    memory.write(address, int(any_cell))
-                    address += 1
-                except ValueError as error:
-                    raise RuntimeError(f"Unable to read Cell {address}: "
-                                       f"Expected an integer, but found {any_cell}")
+        content = content[1].split(maxsplit=code_length) if len(content) > 1 else []
+        memory.load_image(0, self._read_cells(content[:code_length]))
 
-        index = code_length + 1
-        if len(content) <= code_length + 1:
+        if len(content) <= code_length or not with_debug_infos:
             return None
-        return self._read_debug_infos(content[code_length+1:])
+        debug_infos = self._read_debug_infos(content[code_length].split())
+        debug_infos.size = code_length
+        return debug_infos
+
 
+    @staticmethod
+    def _read_cells(content):
+        try:
+            return [int(each) for each in content]
+        except ValueError:
+            cells = []
+            for address, any_cell in enumerate(content):
+                try:
+                    cells.append(int(any_cell))
+                except ValueError:
+                    raise RuntimeError(f"Unable to read Cell {address}: "
+                                       f"Expected an integer, but found {any_cell}")
 
     def _read_debug_infos(self, content):
         debug_infos = ProgramMap()
         count = int(content[0])
         index = 1
-        while index < len(content):
+        while index < 1 + count:
             line_number = int(content[index])
             memory_address = int(content[index + 1])
             label = content[index + 2]
@@ -57,10 +114,334 @@ class Loader:
                 label = None
             debug_infos.record(line_number, memory_address, label)
             index += 3
+        if index < len(content):
+            end = index + 1 + int(content[index])
+            for index in range(index + 1, end, 5):
+                name = content[index]
+                debug_infos.modules.append(
+                    (name, *(int(each) for each in content[index+1:index+5])))
+        return debug_infos
+
+
+    @staticmethod
+    def save_as(executable, file_name, file_format=TEXT):
+        if file_format == Loader.BINARY:
+            BinaryFormat().save_as(executable, file_name)
+            return
+        Loader.save_layout(executable.as_layout(), file_name)
+
+    @staticmethod
+    def save_layout(layout, file_name, chunk_size=4096):
+        layout = iter(layout)
+        partial_file = f"{file_name}.part"
+        try:
+            with open(partial_file, "w") as rx_file:
+                separator = ""
+                while True:
+                    chunk = " ".join(str(each) for each in islice(layout, chunk_size))
+                    if not chunk:
+                        break
+                    rx_file.write(separator + chunk)
+                    separator = " "
+        except BaseException:
+            if exists(partial_file):
+                remove(partial_file)
+            raise
+        replace(partial_file, file_name)
+
+
+class BinaryFormat:
+
+    MAGIC = b"RASPX"
+    VERSION = 4
+
+    HEADER = struct.Struct("<5sBH")
+    SECTION = struct.Struct("<BBqQQQ")
+
+    CODE = 1
+    DATA = 2
+    DEBUG = 3
+    MODULES = 4
+
+    WORDS = 1
+    VARINTS = 2
+    RUNS = 3
+    TABLES = 4
+
+    WORD_MIN = -2**63
+    WORD_MAX = 2**63 - 1
+
+
+    @staticmethod
+    def is_binary(file_name):
+        with open(file_name, "rb") as rx_file:
+            return rx_file.read(len(BinaryFormat.MAGIC)) == BinaryFormat.MAGIC
+
+
+    def save_as(self, executable, file_name):
+        encoding, payload = self._encode_cells(executable.code)
+        payloads = [
+            (self.CODE, encoding, 0, len(executable.code), payload),
+            (self.DATA, self.RUNS, len(executable.code), len(executable.data),
+             self._encode_runs(executable.data))
+        ]
+        if executable.debug_infos:
+            table = executable.debug_infos.as_table()
+            payloads.append((self.DEBUG, self.TABLES, 0, len(table),
+                             DebugSection.encode(table)))
+            modules = executable.debug_infos.modules
+            if modules:
+                import json
+                payloads.append((self.MODULES, 0, 0, len(modules),
+                                 json.dumps(modules).encode("utf-8")))
+
+        offset = self.HEADER.size + len(payloads) * self.SECTION.size
+        with open(file_name, "wb") as rx_file:
+            rx_file.write(self.HEADER.pack(self.MAGIC, self.VERSION, len(payloads)))
+            for kind, encoding, address, count, payload in payloads:
+                rx_file.write(self.SECTION.pack(kind, encoding, address, count,
+                                                offset, len(payload)))
+                offset += len(payload)
+            for each in payloads:
+                rx_file.write(each[-1])
+
+
+    def load(self, memory, file_name, with_debug_infos=True):
+        with open(file_name, "rb") as rx_file, \
+             mmap(rx_file.fileno(), 0, access=ACCESS_READ) as content:
+            return self.load_from(memory, content, with_debug_infos, file_name)
+
+
+    def load_from(self, memory, content, with_debug_infos=True, file_name=None):
+        debug_infos = None
+        modules = []
+        end = 0
+        for kind, encoding, address, count, offset, size in self._sections(content):
+            if kind == self.MODULES:
+                import json
+                modules = [tuple(each) for each in json.loads(content[offset:offset+size])]
+                continue
+            if kind == self.DEBUG:
+                if not with_debug_infos:
+                    continue
+                if encoding == self.TABLES:
+                    debug_infos = DebugSection(file_name, offset,
+                                               content if file_name is None else None)
+                else:
+                    debug_infos = self._decode_debug_infos(
+                        content[offset:offset+size], count)
+                continue
+            payload = content[offset:offset+size]
+            if encoding == self.RUNS:
+                for start, length, value in self._decode_runs(payload, count):
+                    memory.fill(start, length, value)
+                    end = max(end, start + length)
+                continue
+            memory.load_image(address, self._decode_cells(encoding, payload, count))
+            end = max(end, address + count)
+        if debug_infos is not None:
+            debug_infos.modules = modules
+            debug_infos.size = end
+        return debug_infos
+
+
+    def _sections(self, content):
+        magic, version, count = self.HEADER.unpack_from(content, 0)
+        if magic != self.MAGIC:
+            raise RuntimeError("Not a binary RASP executable")
+        if version > self.VERSION:
+            raise RuntimeError(f"Unsupported executable version {version} "
+                               f"(expected {self.VERSION} or less)")
+        for index in range(count):
+            position = self.HEADER.size + index * self.SECTION.size
+            kind, encoding, address, cell_count, offset, size = \
+                self.SECTION.unpack_from(content, position)
+            yield kind, encoding, address, cell_count, offset, size
+
+
+    def _encode_cells(self, cells):
+        if all(self.WORD_MIN <= each <= self.WORD_MAX for each in cells):
+            words = array("q", cells)
+            if sys.byteorder == "big":
+                words.byteswap()
+            return self.WORDS, words.tobytes()
+        return self.VARINTS, self._encode_varints(cells)
+
+
+    def _decode_cells(self, encoding, payload, count):
+        if encoding == self.WORDS:
+            words = array("q")
+            words.frombytes(payload)
+            if sys.byteorder == "big":
+                words.byteswap()
+            return words.tolist()
+        if encoding == self.VARINTS:
+            cells, position = self._decode_varints(payload, 0, count)
+            return cells
+        raise RuntimeError(f"Unknown cell encoding {encoding}")
+
+
+    def _encode_runs(self, runs):
+        return self._encode_varints(each for run in runs for each in run)
+
+
+    def _decode_runs(self, payload, count):
+        values, position = self._decode_varints(payload, 0, 3 * count)
+        return zip(values[0::3], values[1::3], values[2::3])
+
+
+    def _decode_debug_infos(self, payload, count):
+        debug_infos = ProgramMap()
+        position = 0
+        for index in range(count):
+            (source, address, length), position = \
+                self._decode_varints(payload, position, 3)
+            label = payload[position:position+length].decode("utf-8")
+            position += length
+            debug_infos.record(source, address, label or None)
         return debug_infos
 
 
     @staticmethod
-    def save_as(data, file_name):
-        with open(file_name, "w") as rx_file:
-                rx_file.write(" ".join(str(each) for each in data))
+    def _encode_varints(values):
+        buffer = bytearray()
+        for value in values:
+            value = (value << 1) if value >= 0 else ((-value << 1) - 1)
+            while value >= 0x80:
+                buffer.append((value & 0x7F) | 0x80)
+                value >>= 7
+            buffer.append(value)
+        return bytes(buffer)
+
+
+    @staticmethod
+    def _decode_varints(payload, position, count):
+        values = []
+        for index in range(count):
+            value = 0
+            shift = 0
+            while True:
+                byte = payload[position]
+                position += 1
+                value |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            values.append((value >> 1) if not value & 1 else -((value + 1) >> 1))
+        return values, position
+
+
+
+class DebugSection(ModuleLookup):
+
+    COUNTS = struct.Struct("<QQ")
+    LINE = struct.Struct("<qq")
+    SYMBOL = struct.Struct("<qQQ")
+
+
+    @staticmethod
+    def encode(table):
+        lines = sorted((address, source) for source, address, label in table)
+        symbols = sorted((label.encode("utf-8"), address)
+                         for source, address, label in table if label)
+        buffer = bytearray(DebugSection.COUNTS.pack(len(lines), len(symbols)))
+        for address, source in lines:
+            buffer += DebugSection.LINE.pack(address, source)
+        names = bytearray()
+        for name, address in symbols:
+            buffer += DebugSection.SYMBOL.pack(address, len(names), len(name))
+            names += name
+        return bytes(buffer + names)
+
+
+    def __init__(self, file_name, offset, content=None):
+        self._file_name = file_name
+        self._offset = offset
+        self._content = None
+        self._buffer = content
+        self._line_count = 0
+        self._symbol_count = 0
+        self.modules = []
+        self.size = None
+
+
+    def find_address_by_line(self, line_number, module=None):
+        for address, line in self.LINE.iter_unpack(self._lines()):
+            if line == line_number and self._is_in(address, module):
+                return address
+        raise RuntimeError(f"Invalid line number {line_number}")
+
+
+    def find_address(self, symbol):
+        self._open()
+        name = symbol.encode("utf-8")
+        low, high = 0, self._symbol_count
+        while low < high:
+            middle = (low + high) // 2
+            address, found = self._symbol_at(middle)
+            if found == name:
+                return address
+            if found < name:
+                low = middle + 1
+            else:
+                high = middle
+        raise RuntimeError(f"Unknown symbol '{symbol}'")
+
+
+    def find_source(self, address, module=None):
+        if not self._is_in(address, module):
+            raise RuntimeError(f"Unknown address '{address}'")
+        content = self._open()
+        low, high = 0, self._line_count
+        while low < high:
+            middle = (low + high) // 2
+            found, line = self.LINE.unpack_from(content,
+                                                self._line_start + middle * self.LINE.size)
+            if found == address:
+                return line
+            if found < address:
+                low = middle + 1
+            else:
+                high = middle
+        raise RuntimeError(f"Unknown address '{address}'")
+
+
+    def as_table(self):
+        lines = self.LINE.iter_unpack(self._lines())
+        labels = dict(self._symbol_at(index) for index in range(self._symbol_count))
+        labels = {address: name.decode("utf-8") for address, name in labels.items()}
+        return [(source, address, labels.get(address)) for address, source in lines]
+
+
+    def close(self):
+        if self._content is not None and self._buffer is None:
+            self._content.close()
+        self._content = None
+
+
+    def _open(self):
+        if self._content is None:
+            if self._buffer is not None:
+                self._content = self._buffer
+            else:
+                with open(self._file_name, "rb") as rx_file:
+                    self._content = mmap(rx_file.fileno(), 0, access=ACCESS_READ)
+            self._line_count, self._symbol_count = \
+                self.COUNTS.unpack_from(self._content, self._offset)
+            self._line_start = self._offset + self.COUNTS.size
+            self._symbol_start = self._line_start + self._line_count * self.LINE.size
+            self._names_start = self._symbol_start + self._symbol_count * self.SYMBOL.size
+        return self._content
+
+
+    def _lines(self):
+        content = self._open()
+        return content[self._line_start:self._symbol_start]
+
+
+    def _symbol_at(self, index):
+        content = self._open()
+        address, start, length = self.SYMBOL.unpack_from(
+            content, self._symbol_start + index * self.SYMBOL.size)
+        start += self._names_start
+        return address, content[start:start+length]
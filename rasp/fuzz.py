@@ -0,0 +1,302 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+
+import json
+
+from rasp.debug.core import Debugger
+from rasp.instructions import InstructionSet
+from rasp.machine import ListInputDevice, ListOutputDevice, RASP
+from rasp.testing import TestResult, execute
+
+
+
+class Case:
+
+    def __init__(self, seed, image, inputs):
+        self.seed = seed
+        self.image = image
+        self.inputs = inputs
+
+    def to_json(self):
+        return json.dumps({ "seed": self.seed,
+                            "image": self.image,
+                            "inputs": self.inputs })
+
+
+
+class Generator:
+
+    INVALID_OPCODES = [0, 9, 42, -1]
+
+    def __init__(self, seed, max_size=48, max_inputs=8):
+        self._random = Random(seed)
+        self._seed = seed
+        self._max_size = max_size
+        self._max_inputs = max_inputs
+        self._opcodes = InstructionSet.default().opcodes
+
+    def case(self):
+        random = self._random
+        code_size = 2 * random.randint(1, self._max_size // 2)
+        data_size = random.randint(1, 8)
+        is_valid = random.random() < 0.5
+        image = []
+        for each_address in range(0, code_size, 2):
+            image += [self._opcode(is_valid),
+                      self._operand(is_valid, code_size, data_size)]
+        image += [random.randint(-20, 20) for each in range(data_size)]
+        inputs = [random.randint(-100, 100)
+                  for each in range(random.randint(0, self._max_inputs))]
+        return Case(self._seed, image, inputs)
+
+    def _opcode(self, is_valid):
+        if not is_valid and self._random.random() < 0.1:
+            return self._random.choice(self.INVALID_OPCODES)
+        return self._random.choice(self._opcodes)
+
+    def _operand(self, is_valid, code_size, data_size):
+        random = self._random
+        if is_valid:
+            if random.random() < 0.5:
+                return 2 * random.randrange(code_size // 2)
+            return code_size + random.randrange(data_size)
+        choice = random.random()
+        if choice < 0.05:
+            return random.choice([-1, -2, 999, 1000])
+        if choice < 0.2:
+            return random.randint(-50, 50)
+        return random.randrange(code_size + data_size)
+
+
+
+class Outcome:
+
+    HALTED = "halted"
+    TIMEOUT = "timeout"
+    ERROR = "error"
+
+    FIELDS = ["status", "cycles", "outputs", "accumulator",
+              "instruction_pointer", "memory"]
+
+    def __init__(self, status, cycles, outputs, accumulator, instruction_pointer, memory):
+        self.status = status
+        self.cycles = cycles
+        self.outputs = outputs
+        self.accumulator = accumulator
+        self.instruction_pointer = instruction_pointer
+        self.memory = memory
+
+    @staticmethod
+    def of(machine, status, counter, outputs):
+        return Outcome(status,
+                       counter.cycles,
+                       list(outputs.values),
+                       machine.cpu.accumulator,
+                       machine.cpu.instruction_pointer,
+                       [machine.memory.peek(address)
+                        for address in range(machine.memory.capacity)])
+
+    def differences(self, other):
+        differences = []
+        for each in self.FIELDS:
+            mine, theirs = getattr(self, each), getattr(other, each)
+            if mine == theirs:
+                continue
+            if each == "memory":
+                addresses = [address
+                             for address, (left, right) in enumerate(zip(mine, theirs))
+                             if left != right]
+                mine = { address: mine[address] for address in addresses[:4] }
+                theirs = { address: theirs[address] for address in addresses[:4] }
+            differences.append((each, mine, theirs))
+        return differences
+
+
+
+class CycleCounter:
+
+    def __init__(self):
+        self.cycles = 0
+
+    def on_new_cpu_cycle(self, count=1, ip=0):
+        self.cycles += count
+
+
+
+def _prepare(case):
+    machine = RASP(ListInputDevice(case.inputs), ListOutputDevice())
+    machine.memory.load_image(0, case.image)
+    counter = CycleCounter()
+    machine.cpu.attach(counter)
+    return machine, counter, machine.output_device
+
+
+def run_reference(case, max_cycles):
+    machine, counter, outputs = _prepare(case)
+    status = Outcome.HALTED
+    try:
+        while not machine.is_stopped:
+            if counter.cycles >= max_cycles:
+                status = Outcome.TIMEOUT
+                break
+            machine.run_one_cycle()
+
+    except Exception:
+        status = Outcome.ERROR
+
+    return Outcome.of(machine, status, counter, outputs)
+
+
+def run_scenario(case, max_cycles):
+    machine, counter, outputs = _prepare(case)
+    cycles, status, message = execute(machine, max_cycles)
+    statuses = { TestResult.PASSED: Outcome.HALTED,
+                 TestResult.TIMEOUT: Outcome.TIMEOUT,
+                 TestResult.ERROR: Outcome.ERROR }
+    return Outcome.of(machine, statuses[status], counter, outputs)
+
+
+def run_debugger(case, max_cycles):
+    machine, counter, outputs = _prepare(case)
+    view = SilentView()
+    debugger = Debugger(machine, view)
+    status = Outcome.HALTED
+    try:
+        debugger.goto_cycle(max_cycles)
+        if view.error is not None:
+            status = Outcome.ERROR
+        elif not machine.is_stopped:
+            status = Outcome.TIMEOUT
+
+    except Exception:
+        status = Outcome.ERROR
+
+    return Outcome.of(machine, status, counter, outputs)
+
+
+
+class SilentView:
+
+    def __init__(self):
+        self.error = None
+
+    def show_cpu(self, view):
+        pass
+
+    def show_watchpoint_hit(self, kind, address, value):
+        pass
+
+    def report_error(self, error):
+        self.error = error
+
+
+
+REFERENCE = "reference"
+
+ENGINES = {
+    REFERENCE: run_reference,
+    "scenario": run_scenario,
+    "debugger": run_debugger
+}
+
+
+
+class Mismatch:
+
+    def __init__(self, case, engine, differences):
+        self.case = case
+        self.engine = engine
+        self.differences = differences
+
+
+
+def compare(case, engines, max_cycles):
+    reference, *others = engines
+    expected = ENGINES[reference](case, max_cycles)
+    for each_engine in others:
+        differences = expected.differences(ENGINES[each_engine](case, max_cycles))
+        if differences:
+            return Mismatch(case, each_engine, differences)
+    return None
+
+
+class Shrinker:
+
+    def __init__(self, engines, max_cycles, max_attempts=2000):
+        self._engines = engines
+        self._max_cycles = max_cycles
+        self._attempts = max_attempts
+
+    def shrink(self, mismatch):
+        case = mismatch.case
+        is_progressing = True
+        while is_progressing and self._attempts > 0:
+            is_progressing = False
+            for candidate in self._candidates(case):
+                found = self._check(candidate)
+                if found is not None:
+                    mismatch, case = found, candidate
+                    is_progressing = True
+                    break
+        return mismatch
+
+    def _check(self, candidate):
+        if self._attempts <= 0:
+            return None
+        self._attempts -= 1
+        return compare(candidate, self._engines, self._max_cycles)
+
+    @staticmethod
+    def _candidates(case):
+        image, inputs = case.image, case.inputs
+        for size in (len(image) // 2, len(image) - 2, len(image) - 1):
+            if 0 < size < len(image):
+                yield Case(case.seed, image[:size], inputs)
+        for size in (0, len(inputs) // 2, len(inputs) - 1):
+            if 0 <= size < len(inputs):
+                yield Case(case.seed, image, inputs[:size])
+        for index, value in enumerate(inputs):
+            for smaller in sorted({ 0, int(value / 2) }):
+                if smaller != value:
+                    yield Case(case.seed, image, inputs[:index] + [smaller] + inputs[index+1:])
+        for index, value in enumerate(image):
+            for smaller in sorted({ 0, int(value / 2) }):
+                if smaller != value:
+                    yield Case(case.seed, image[:index] + [smaller] + image[index+1:], inputs)
+
+
+
+def fuzz_one(job):
+    seed, engines, max_cycles = job
+    case = Generator(seed).case()
+    mismatch = compare(case, engines, max_cycles)
+    if mismatch is None:
+        return None
+    return Shrinker(engines, max_cycles).shrink(mismatch)
+
+
+def fuzz(seed=0, runs=1000, engines=None, max_cycles=10000, jobs=1):
+    engines = [each for each in engines or ENGINES if each != REFERENCE]
+    unknown = [each for each in engines if each not in ENGINES]
+    if unknown:
+        raise RuntimeError(f"Unknown engine '{unknown[0]}'")
+    if not engines:
+        raise RuntimeError("Fuzzing needs an engine to compare with the reference")
+    engines = [REFERENCE] + engines
+    tasks = [(seed + index, engines, max_cycles) for index in range(runs)]
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(fuzz_one, tasks, chunksize=max(1, runs // (4 * jobs))))
+    else:
+        results = [fuzz_one(each) for each in tasks]
+    return [each for each in results if each is not None]
@@ -18,12 +18,16 @@ class InstructionSet:
 
     def __init__(self, instructions):
         self._instructions = { each.CODE: each for each in instructions }
+        self._opcodes = { each.MNEMONIC: each.CODE for each in instructions }
+
+    @property
+    def opcodes(self):
+        return sorted(self._instructions)
 
     def find_opcode(self, mnemonic):
-        for code, instruction in self._instructions.items():
-            if instruction.MNEMONIC == mnemonic:
-                return instruction.CODE
-        raise RuntimeError("Unknown operation")
+        if mnemonic not in self._opcodes:
+            raise RuntimeError("Unknown operation")
+        return self._opcodes[mnemonic]
 
     def find_mnemonic(self, opcode):
         if opcode not in self._instructions:
@@ -31,12 +35,14 @@ class InstructionSet:
         return self._instructions[opcode].MNEMONIC
 
     def read_from(self, machine):
-        address = machine.cpu.instruction_pointer
-        code = machine.memory.read(address)
+        return self.read_at(machine.memory, machine.cpu.instruction_pointer)
+
+    def read_at(self, memory, address):
+        code = memory.read(address)
         if code not in self._instructions:
             return Halt()
         instruction = self._instructions[code]
-        return instruction.read_from(machine.memory, address)
+        return instruction.read_from(memory, address)
 
 
 
@@ -53,9 +59,16 @@ class Instruction:
     def cpu_cost(self):
         return 1;
 
+    @property
+    def cells(self):
+        return [self.CODE, self._address]
+
+    @property
+    def written_cells(self):
+        return ()
+
     def load_at(self, memory, address):
-        memory.write(address, self.CODE)
-        memory.write(address+1, self._address)
+        memory.load_image(address, self.cells)
 
     def __eq__(self, other):
         if not isinstance(other, Instruction):
@@ -106,6 +119,10 @@ class Read(Instruction):
     def __init__(self, address):
         super().__init__(address)
 
+    @property
+    def written_cells(self):
+        return (self._address,)
+
     def _execute(self, machine):
         value = machine.input_device.read()
         machine.memory.write(self._address, value)
@@ -144,6 +161,10 @@ class Store(Instruction):
     def __init__(self, address):
         super().__init__(address)
 
+    @property
+    def written_cells(self):
+        return (self._address,)
+
     def _execute(self, machine):
         machine.memory.write(self._address, machine.cpu.accumulator)
         machine.cpu.instruction_pointer += self.size
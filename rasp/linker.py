@@ -0,0 +1,128 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from rasp.assembler import ProgramMap
+from rasp.executable import Executable
+
+import json
+
+
+class ObjectFile:
+
+    FORMAT = "rasp-object"
+    VERSION = 1
+
+    @staticmethod
+    def read_from(file_name):
+        with open(file_name, "r") as object_file:
+            content = json.load(object_file)
+        if content.get("format") != ObjectFile.FORMAT:
+            raise RuntimeError(f"'{file_name}' is not a RASP object file")
+        if content["version"] > ObjectFile.VERSION:
+            raise RuntimeError(f"Unsupported object file version {content['version']}")
+        return ObjectFile(content["code"],
+                          [tuple(each) for each in content["data"]],
+                          content["exports"],
+                          content["imports"],
+                          content["relocations"],
+                          [tuple(each) for each in content["debug"]],
+                          content["name"])
+
+    def __init__(self, code, data, exports, imports, relocations,
+                 debug_infos=None, name=None):
+        self.code = code
+        self.data = data
+        self.exports = exports
+        self.imports = imports
+        self.relocations = relocations
+        self.debug_infos = debug_infos or []
+        self.name = name or "?"
+
+    @property
+    def data_size(self):
+        return sum(count for address, count, value in self.data)
+
+    def relocate(self, address, code_base, data_base):
+        if address < len(self.code):
+            return code_base + address
+        return data_base + address - len(self.code)
+
+    def save_as(self, file_name):
+        with open(file_name, "w") as object_file:
+            json.dump({
+                "format": self.FORMAT,
+                "version": self.VERSION,
+                "name": self.name,
+                "code": self.code,
+                "data": self.data,
+                "exports": self.exports,
+                "imports": self.imports,
+                "relocations": self.relocations,
+                "debug": self.debug_infos
+            }, object_file)
+
+
+class Linker:
+
+    def link(self, modules, debug=True):
+        placements = []
+        code_base = 0
+        data_base = sum(len(each.code) for each in modules)
+        for each_module in modules:
+            placements.append((each_module, code_base, data_base))
+            code_base += len(each_module.code)
+            data_base += each_module.data_size
+        size = data_base
+
+        exports = self._collect_exports(placements)
+
+        code = []
+        data = []
+        debug_infos = []
+        modules = []
+        for each_module, code_base, data_base in placements:
+            if any(name == each_module.name for name, *bounds in modules):
+                raise RuntimeError(f"Duplicated module '{each_module.name}'")
+            modules.append((each_module.name,
+                            code_base, code_base + len(each_module.code),
+                            data_base, data_base + each_module.data_size))
+            code += self._place_code(each_module, code_base, data_base, exports)
+            data += [(each_module.relocate(address, code_base, data_base), count, value)
+                     for address, count, value in each_module.data]
+            for source, address, label in each_module.debug_infos:
+                if label and len(exports[label]) > 1:
+                    label = f"{each_module.name}.{label}"
+                debug_infos.append((source,
+                                    each_module.relocate(address, code_base, data_base),
+                                    label))
+
+        program_map = ProgramMap.from_table(debug_infos, modules, size) if debug else None
+        return Executable(code, data, program_map)
+
+    def _collect_exports(self, placements):
+        exports = {}
+        for each_module, code_base, data_base in placements:
+            for label, address in each_module.exports.items():
+                exports.setdefault(label, []).append(
+                    each_module.relocate(address, code_base, data_base))
+        return exports
+
+    def _place_code(self, module, code_base, data_base, exports):
+        cells = list(module.code)
+        for offset in module.relocations:
+            cells[offset] = module.relocate(cells[offset], code_base, data_base)
+        for symbol, offsets in module.imports.items():
+            if symbol not in exports:
+                raise RuntimeError(f"Unresolved symbol '{symbol}' in module '{module.name}'")
+            if len(exports[symbol]) > 1:
+                raise RuntimeError(f"Ambiguous symbol '{symbol}' in module '{module.name}'")
+            for offset in offsets:
+                cells[offset] = exports[symbol][0]
+        return cells
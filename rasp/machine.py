@@ -8,31 +8,58 @@
 #
 
 
-import logging
+from array import array
+from mmap import mmap
 
-
-from rasp.instructions import InstructionSet
+from rasp.instructions import Halt, InstructionSet
 
 
 
 class Memory:
 
     def __init__(self, capacity=1000):
-        self._cells = [0 for each in range(capacity)]
+        self._cells = [0] * capacity
         self._observers = []
 
+    @property
+    def capacity(self):
+        return len(self._cells)
+
     def attach(self, profiler):
         self._observers.append(profiler)
 
+    def detach(self, profiler):
+        self._observers.remove(profiler)
+
     def load_program(self, *instructions):
-        for index, each_instruction in enumerate(instructions):
-            each_instruction.load_at(self, index*2)
+        self.load_image(0, [cell
+                            for each_instruction in instructions
+                            for cell in each_instruction.cells])
+
+    def load_image(self, start, values):
+        end = start + len(values)
+        self._reserve(end)
+        self._cells[start:end] = values
+
+    def fill(self, start, count, value):
+        end = start + count
+        is_fresh = start >= len(self._cells)
+        self._reserve(end)
+        if value != 0 or not is_fresh:
+            self._cells[start:end] = [value] * count
+
+    def _reserve(self, capacity):
+        if capacity > len(self._cells):
+            self._cells.extend([0] * (capacity - len(self._cells)))
 
     def write(self, address, value):
         self._cells[address] = value
         for each_observer in self._observers:
             each_observer.on_write(address, value)
 
+    def peek(self, address):
+        return self._cells[address]
+
     def read(self, address):
         value = self._cells[address]
         for each_observer in self._observers:
@@ -40,6 +67,68 @@ class Memory:
         return value
 
 
+class MappedMemory(Memory):
+
+    WORD = "q"
+    WORD_SIZE = 8
+
+    def __init__(self, capacity=1000, path=None):
+        if path is None:
+            from tempfile import TemporaryFile
+            self._file = TemporaryFile()
+        else:
+            self._file = open(path, "w+b")
+        self._observers = []
+        self._map = None
+        self._cells = None
+        self._map_cells(max(capacity, 1))
+
+    def _map_cells(self, capacity):
+        if self._map is not None:
+            self._cells.release()
+            self._map.close()
+        self._file.truncate(capacity * self.WORD_SIZE)
+        self._map = mmap(self._file.fileno(), capacity * self.WORD_SIZE)
+        self._cells = memoryview(self._map).cast(self.WORD)
+
+    def load_image(self, start, values):
+        end = start + len(values)
+        self._reserve(end)
+        self._cells[start:end] = array(self.WORD, values)
+
+    def fill(self, start, count, value):
+        end = start + count
+        is_fresh = start >= len(self._cells)
+        self._reserve(end)
+        if value != 0 or not is_fresh:
+            self._cells[start:end] = array(self.WORD, [value]) * count
+
+    def _reserve(self, capacity):
+        if capacity > len(self._cells):
+            self._map_cells(capacity)
+
+    def write(self, address, value):
+        try:
+            self._cells[address] = value
+        except ValueError:
+            raise OverflowError(f"Value {value} does not fit in a {8 * self.WORD_SIZE}-bit word")
+        for each_observer in self._observers:
+            each_observer.on_write(address, value)
+
+    def close(self):
+        if self._map is not None:
+            self._cells.release()
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, error, trace):
+        self.close()
+
+
 class CPU:
 
     def __init__(self, accumulator=0, instruction_pointer=0):
@@ -72,11 +161,33 @@ class OutputDevice:
         print(value)
 
 
+class ListInputDevice:
+
+    def __init__(self, values):
+        self._values = list(values)
+        self._index = 0
+
+    def read(self):
+        if self._index >= len(self._values):
+            raise RuntimeError("No more input available")
+        value = self._values[self._index]
+        self._index += 1
+        return value
+
+
+class ListOutputDevice:
+
+    def __init__(self):
+        self.values = []
+
+    def write(self, value):
+        self.values.append(value)
+
 
 class RASP:
 
-    def __init__(self, input_device=None, output_device=None):
-        self.memory = Memory()
+    def __init__(self, input_device=None, output_device=None, memory=None):
+        self.memory = memory if memory is not None else Memory()
         self.cpu = CPU()
         self.input_device = input_device or InputDevice()
         self.output_device = output_device or OutputDevice()
@@ -89,9 +200,7 @@ class RASP:
             self.run_one_cycle()
 
     def run_one_cycle(self):
-        instruction = self.instructions.read_from(self)
-        logging.debug(f"{instruction} {self.cpu}")
-        instruction.send_to(self)
+        self.instructions.read_from(self).send_to(self)
 
     @property
     def next_instruction(self):
@@ -100,11 +209,53 @@ class RASP:
     def halt(self):
         self._is_running = False
 
+    def resume(self):
+        self._is_running = True
+
     @property
     def is_stopped(self):
         return not self._is_running
 
 
+class RAM(RASP):
+
+    @staticmethod
+    def compile(image, instructions=None):
+        instructions = instructions or InstructionSet.default()
+        memory = Memory(0)
+        memory.load_image(0, list(image) + [0])
+        return tuple(instructions.read_at(memory, address)
+                     for address in range(len(image)))
+
+    def __init__(self, program, input_device=None, output_device=None, memory=None):
+        super().__init__(input_device, output_device, memory)
+        self.program = program
+        self._halt = Halt()
+
+    def run(self, max_cycles=None):
+        self._is_running = True
+        program, cpu, size = self.program, self.cpu, len(self.program)
+        cycles = 0
+        while self._is_running and cycles != max_cycles:
+            address = cpu.instruction_pointer
+            if 0 <= address < size:
+                program[address].send_to(self)
+            else:
+                self._halt.send_to(self)
+            cycles += 1
+        return cycles
+
+    def run_one_cycle(self):
+        self.next_instruction.send_to(self)
+
+    @property
+    def next_instruction(self):
+        address = self.cpu.instruction_pointer
+        if 0 <= address < len(self.program):
+            return self.program[address]
+        return self._halt
+
+
 class Profiler:
 
     def __init__(self):
@@ -112,7 +263,8 @@ class Profiler:
 
     @property
     def used_memory(self):
-        return sum(min(1, each[2])for each in self._memory.values())
+        return sum(1 for address, reads, writes, executions in self._memory.values()
+                   if reads + writes > 0)
 
     @property
     def cycle_count(self):
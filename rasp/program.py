@@ -0,0 +1,98 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from rasp.machine import ListInputDevice, ListOutputDevice, Memory, RAM, RASP
+
+
+
+class Program:
+
+    @staticmethod
+    def from_assembly(assembly_code, debug=True, optimize=False):
+        from rasp.assembly.parser import AssemblyParser
+
+        program = AssemblyParser().parse(assembly_code)
+        if optimize:
+            from rasp.assembly.optimizer import PeepholeOptimizer
+            program = PeepholeOptimizer().optimize(program)
+        return Program.assemble(program, debug)
+
+    @staticmethod
+    def assemble(assembly_program, debug=True):
+        from rasp.assembler import Assembler
+
+        executable = Assembler().build(assembly_program, debug)
+        return Program(executable.image, executable.debug_infos)
+
+    @staticmethod
+    def from_file(executable_file, with_debug_infos=True):
+        from rasp.executable import Loader
+
+        memory = Memory(0)
+        program_map = Loader().from_file(memory, executable_file, with_debug_infos)
+        return Program([memory.peek(address) for address in range(memory.capacity)],
+                       program_map)
+
+    def __init__(self, image, program_map=None):
+        self._image = tuple(image)
+        self._program_map = program_map
+        self._compiled = {}
+
+    @property
+    def image(self):
+        return self._image
+
+    @property
+    def program_map(self):
+        return self._program_map
+
+    @property
+    def size(self):
+        return len(self._image)
+
+    def compiled(self, engine, compile):
+        if engine not in self._compiled:
+            self._compiled[engine] = compile(self)
+        return self._compiled[engine]
+
+    def instantiate(self, inputs=None, input_device=None, output_device=None,
+                    memory=None, ram=False):
+        input_device = input_device or ListInputDevice(inputs or [])
+        output_device = output_device or ListOutputDevice()
+        if ram:
+            machine = RAM(self.compiled(RAM, lambda program: RAM.compile(program.image)),
+                          input_device, output_device, memory)
+        else:
+            machine = RASP(input_device, output_device, memory)
+        machine.memory.load_image(0, self._image)
+        return machine
+
+    def run(self, inputs=None, max_cycles=None, ram=False):
+        machine = self.instantiate(inputs, ram=ram)
+        if ram:
+            cycles = machine.run(max_cycles)
+            return machine.output_device.values, RunStatistics(machine, cycles)
+        cycles = 0
+        while not machine.is_stopped:
+            if max_cycles is not None and cycles >= max_cycles:
+                break
+            machine.run_one_cycle()
+            cycles += 1
+        return machine.output_device.values, RunStatistics(machine, cycles)
+
+
+
+class RunStatistics:
+
+    def __init__(self, machine, cycles):
+        self.cycles = cycles
+        self.is_halted = machine.is_stopped
+        self.accumulator = machine.cpu.accumulator
+        self.instruction_pointer = machine.cpu.instruction_pointer
@@ -0,0 +1,321 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from io import BytesIO
+from itertools import count
+from multiprocessing import Queue
+from os import remove
+from pathlib import Path
+from socketserver import StreamRequestHandler, ThreadingMixIn, UnixStreamServer
+from threading import Event as Signal, Lock, Thread
+
+import json
+import socket
+
+from rasp.executable import Loader
+from rasp.machine import ListInputDevice, Memory, RASP
+from rasp.testing import TestResult, execute
+
+
+
+class Event:
+    OUTPUT = "output"
+    RESULT = "result"
+    UNKNOWN = "unknown"
+    ERROR = "error"
+    MISSING = "missing"
+
+
+
+STATUSES = {
+    TestResult.PASSED: "halted",
+    TestResult.TIMEOUT: TestResult.TIMEOUT,
+    TestResult.ERROR: TestResult.ERROR
+}
+
+
+
+class ImageStore:
+
+    def __init__(self, capacity=64):
+        self._capacity = capacity
+        self._images = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def find(self, key):
+        with self._lock:
+            image = self._images.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._images.move_to_end(key)
+            return image
+
+    def keep(self, key, image):
+        with self._lock:
+            self._images[key] = image
+            if len(self._images) > self._capacity:
+                self._images.popitem(last=False)
+        return image
+
+    def add(self, key, content):
+        if sha256(content).hexdigest() != key:
+            raise RuntimeError(f"Executable does not match hash '{key}'")
+        return self.keep(key, self._decode(content))
+
+    @staticmethod
+    def _decode(content):
+        memory = Memory(0)
+        Loader().from_stream(memory, BytesIO(content), with_debug_infos=False)
+        return [memory.peek(address) for address in range(memory.capacity)]
+
+
+
+class Worker:
+
+    events = None
+    images = None
+
+    @staticmethod
+    def start(events, capacity):
+        Worker.events = events
+        Worker.images = ImageStore(capacity)
+
+
+
+class StreamingOutputDevice:
+
+    def __init__(self, job_id):
+        self._job_id = job_id
+
+    def write(self, value):
+        Worker.events.put((Event.OUTPUT, self._job_id, value))
+
+
+
+def run_job(job_id, key, inputs, max_cycles, image=None):
+    if image is None:
+        image = Worker.images.find(key)
+        if image is None:
+            Worker.events.put((Event.MISSING, job_id, key))
+            return
+    else:
+        Worker.images.keep(key, image)
+    machine = RASP(ListInputDevice(inputs), StreamingOutputDevice(job_id))
+    machine.memory.load_image(0, image)
+    cycles, status, message = execute(machine, max_cycles)
+    Worker.events.put((Event.RESULT, job_id, {
+        "status": STATUSES[status],
+        "cycles": cycles,
+        "accumulator": machine.cpu.accumulator,
+        "instruction_pointer": machine.cpu.instruction_pointer,
+        "message": message }))
+
+
+def _ready():
+    return True
+
+
+
+class Job:
+
+    def __init__(self, handler, identifier, key, image, inputs, max_cycles):
+        self.handler = handler
+        self.identifier = identifier
+        self.key = key
+        self.image = image
+        self.inputs = inputs
+        self.max_cycles = max_cycles
+        self.replied = Signal()
+
+
+
+class JobServer(ThreadingMixIn, UnixStreamServer):
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, workers=1, max_cycles=1000000, cache_size=64):
+        self.socket_path = socket_path
+        self.max_cycles = max_cycles
+        self.images = ImageStore(cache_size)
+        self._jobs = {}
+        self._jobs_lock = Lock()
+        self._job_ids = count()
+        self.worker_misses = 0
+        self._events = Queue()
+        self.pool = ProcessPoolExecutor(max_workers=workers,
+                                        initializer=Worker.start,
+                                        initargs=(self._events, cache_size))
+        self._warm_up(workers)
+        self._dispatcher = Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+        if Path(socket_path).exists():
+            remove(socket_path)
+        super().__init__(socket_path, JobHandler)
+
+    def _warm_up(self, workers):
+        for each in [self.pool.submit(_ready) for each in range(workers)]:
+            each.result()
+
+    def submit(self, job, image=None):
+        with self._jobs_lock:
+            job_id = next(self._job_ids)
+            self._jobs[job_id] = job
+        future = self.pool.submit(run_job, job_id, job.key, job.inputs,
+                                  job.max_cycles, image)
+        future.add_done_callback(lambda done: self._check(job_id, done))
+
+    def _check(self, job_id, future):
+        error = future.exception()
+        if error is not None:
+            job = self._take(job_id)
+            if job is not None:
+                job.handler.fail(job, error)
+
+    def _dispatch(self):
+        while True:
+            message = self._events.get()
+            if message is None:
+                break
+            event, job_id, payload = message
+            if event == Event.OUTPUT:
+                with self._jobs_lock:
+                    job = self._jobs.get(job_id)
+                if job is not None:
+                    job.handler.output(job, payload)
+                continue
+            job = self._take(job_id)
+            if job is None:
+                continue
+            if event == Event.MISSING:
+                self.worker_misses += 1
+                self.submit(job, job.image)
+            else:
+                job.handler.result(job, payload)
+
+    def _take(self, job_id):
+        with self._jobs_lock:
+            return self._jobs.pop(job_id, None)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+        self._events.put(None)
+        self._dispatcher.join()
+        if Path(self.socket_path).exists():
+            remove(self.socket_path)
+
+
+
+class JobHandler(StreamRequestHandler):
+
+    def setup(self):
+        super().setup()
+        self._lock = Lock()
+        self._pending = []
+
+    def handle(self):
+        for each_line in self.rfile:
+            if not each_line.strip():
+                continue
+            try:
+                request = json.loads(each_line)
+                self._submit(request)
+            except (ValueError, KeyError, TypeError, RuntimeError) as error:
+                self._send({ "id": None, "event": Event.ERROR, "message": str(error) })
+        for each in self._pending:
+            each.wait()
+
+    def _submit(self, request):
+        identifier = request.get("id")
+        key = request["hash"]
+        image = self.server.images.find(key)
+        if image is None:
+            if "executable" not in request:
+                self._send({ "id": identifier, "event": Event.UNKNOWN, "hash": key })
+                return
+            image = self.server.images.add(key, b64decode(request["executable"]))
+        max_cycles = min(int(request.get("max_cycles") or self.server.max_cycles),
+                         self.server.max_cycles)
+        inputs = [int(each) for each in request.get("inputs", [])]
+        job = Job(self, identifier, key, image, inputs, max_cycles)
+        self._pending.append(job.replied)
+        self.server.submit(job)
+
+    def output(self, job, value):
+        self._send({ "id": job.identifier, "event": Event.OUTPUT, "value": value })
+
+    def result(self, job, result):
+        self._send({ "id": job.identifier, "event": Event.RESULT, **result })
+        job.replied.set()
+
+    def fail(self, job, error):
+        self._send({ "id": job.identifier, "event": Event.ERROR, "message": str(error) })
+        job.replied.set()
+
+    def _send(self, *messages):
+        data = "".join(json.dumps(each) + "\n" for each in messages).encode("utf-8")
+        with self._lock:
+            try:
+                self.wfile.write(data)
+                self.wfile.flush()
+            except OSError:
+                pass
+
+
+
+class Client:
+
+    def __init__(self, socket_path):
+        self._socket_path = socket_path
+
+    def execute(self, executable_file, inputs, max_cycles=None, on_output=None):
+        content = Path(executable_file).read_bytes()
+        key = sha256(content).hexdigest()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            try:
+                connection.connect(self._socket_path)
+            except OSError as error:
+                raise ConnectionError(f"Cannot reach '{self._socket_path}'") from error
+            job = { "id": 1, "hash": key, "inputs": list(inputs), "max_cycles": max_cycles }
+            stream = connection.makefile("rwb")
+            for attempt in range(2):
+                self._send(stream, job)
+                outputs = []
+                for each_line in stream:
+                    message = json.loads(each_line)
+                    event = message["event"]
+                    if event == Event.OUTPUT:
+                        outputs.append(message["value"])
+                        if on_output:
+                            on_output(message["value"])
+                    elif event == Event.RESULT:
+                        message["outputs"] = outputs
+                        return message
+                    elif event == Event.UNKNOWN:
+                        job["executable"] = b64encode(content).decode("ascii")
+                        break
+                    else:
+                        raise RuntimeError(message["message"])
+                else:
+                    raise RuntimeError("The server closed the connection")
+            raise RuntimeError(f"The server does not accept '{executable_file}'")
+
+    @staticmethod
+    def _send(stream, job):
+        stream.write((json.dumps(job) + "\n").encode("utf-8"))
+        stream.flush()
@@ -0,0 +1,278 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from pathlib import Path
+from xml.etree import ElementTree
+
+import json
+import time
+
+from rasp import About
+from rasp.assembly.parser import AssemblyParser
+from rasp.assembler import Assembler
+from rasp.executable import BinaryFormat
+from rasp.machine import ListInputDevice, ListOutputDevice, RASP
+
+
+
+class Scenario:
+
+    def __init__(self, name, program, tests, source=None, offset=0):
+        self.name = name
+        self.program = program
+        self.tests = tests
+        self.source = source
+        self.offset = offset
+
+    @property
+    def key(self):
+        version = f"{About.VERSION}/{BinaryFormat.VERSION}\n"
+        return sha256((version + self.program).encode("utf-8")).hexdigest()
+
+
+
+class ScenarioTest:
+
+    def __init__(self, name, inputs, outputs):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+
+
+
+class ScenarioLibrary:
+
+    SCENARIO = "scenario"
+    NAME = "name"
+    PROGRAM = "program"
+    TESTS = "tests"
+    INPUTS = "inputs"
+    OUTPUTS = "outputs"
+
+    def __init__(self, directory):
+        self._home = Path(directory)
+
+    def all(self):
+        if not self._home.is_dir():
+            raise FileNotFoundError(f"No such directory '{self._home}'")
+        return [self._parse(each_file)
+                for each_file in sorted(self._home.iterdir())
+                if each_file.suffix in [".yaml", ".yml"]]
+
+    def _parse(self, yaml_file):
+        from yaml import safe_load
+
+        data = safe_load(yaml_file.read_text())[self.SCENARIO]
+        tests = [ScenarioTest(str(each[self.NAME]),
+                              [int(value) for value in each.get(self.INPUTS) or []],
+                              [int(value) for value in each.get(self.OUTPUTS) or []])
+                 for each in data.get(self.TESTS) or []]
+        return Scenario(str(data[self.NAME]).strip(), data[self.PROGRAM], tests,
+                        str(yaml_file), self._find_program(yaml_file))
+
+    def _find_program(self, yaml_file):
+        for number, text in enumerate(yaml_file.read_text().splitlines(), 1):
+            if text.strip().startswith(self.PROGRAM + ":"):
+                return number
+        return 0
+
+
+
+class ImageCache:
+
+    def __init__(self, directory=None, assembler=None):
+        self._directory = Path(directory) if directory else None
+        self._assembler = assembler or Assembler()
+        self._images = {}
+        self.hits = 0
+        self.misses = 0
+
+    def image_of(self, scenario):
+        key = scenario.key
+        if key in self._images:
+            self.hits += 1
+            return self._images[key]
+        image = self._load(key)
+        if image is None:
+            self.misses += 1
+            program = AssemblyParser().parse(scenario.program)
+            image = self._assembler.build(program, False).image
+            self._save(key, image)
+        else:
+            self.hits += 1
+        self._images[key] = image
+        return image
+
+    def _load(self, key):
+        if self._directory is None:
+            return None
+        cached = self._directory / f"{key}.json"
+        if not cached.exists():
+            return None
+        return json.loads(cached.read_text())
+
+    def _save(self, key, image):
+        if self._directory is None:
+            return
+        self._directory.mkdir(parents=True, exist_ok=True)
+        (self._directory / f"{key}.json").write_text(json.dumps(image))
+
+
+
+class TestResult:
+
+    PASSED = "passed"
+    FAILED = "failed"
+    ERROR = "error"
+    TIMEOUT = "timeout"
+
+    def __init__(self, scenario, name, status, cycles, outputs, message=None, duration=0,
+                 recorder=None):
+        self.scenario = scenario
+        self.name = name
+        self.status = status
+        self.cycles = cycles
+        self.outputs = outputs
+        self.message = message
+        self.duration = duration
+        self.recorder = recorder
+
+    @property
+    def is_success(self):
+        return self.status == self.PASSED
+
+
+
+def execute(machine, max_cycles=None):
+    instructions = machine.instructions
+    cycles = 0
+    try:
+        while not machine.is_stopped:
+            if max_cycles is not None and cycles >= max_cycles:
+                return cycles, TestResult.TIMEOUT, f"No halt within {max_cycles} cycles"
+            instructions.read_from(machine).send_to(machine)
+            cycles += 1
+
+    except Exception as error:
+        return cycles, TestResult.ERROR, str(error)
+
+    return cycles, TestResult.PASSED, None
+
+
+
+def run_test(job):
+    scenario, name, image, inputs, expected, max_cycles, with_coverage = job
+    start = time.perf_counter()
+    machine = RASP(ListInputDevice(inputs), ListOutputDevice())
+    machine.memory.load_image(0, image)
+    recorder = None
+    if with_coverage:
+        from rasp.coverage import CoverageRecorder
+        recorder = CoverageRecorder(machine)
+        machine.cpu.attach(recorder)
+    cycles, status, message = execute(machine, max_cycles)
+    outputs = machine.output_device.values
+    if status == TestResult.PASSED and outputs != expected:
+        status = TestResult.FAILED
+        message = f"Expected {expected}, but found {outputs}"
+    return TestResult(scenario, name, status, cycles, outputs, message,
+                      time.perf_counter() - start, recorder)
+
+
+
+class TestRunner:
+
+    def __init__(self, cache=None, jobs=1, max_cycles=None, coverage=None):
+        self._cache = cache or ImageCache()
+        self._jobs = jobs
+        self._max_cycles = max_cycles
+        self._coverage = coverage
+
+    def run(self, scenarios):
+        jobs = []
+        runs = []
+        results = []
+        for each_scenario in scenarios:
+            try:
+                image = self._cache.image_of(each_scenario)
+                program_map = self._program_map_of(each_scenario)
+            except Exception as error:
+                results += [TestResult(each_scenario.name, each_test.name,
+                                       TestResult.ERROR, 0, [],
+                                       f"Invalid program: {error}")
+                            for each_test in each_scenario.tests]
+                continue
+            for each_test in each_scenario.tests:
+                jobs.append((each_scenario.name, each_test.name, image,
+                             each_test.inputs, each_test.outputs, self._max_cycles,
+                             self._coverage is not None))
+                runs.append((each_scenario, image, program_map))
+        if self._jobs > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=self._jobs) as pool:
+                outcomes = list(pool.map(run_test, jobs, chunksize=max(1, len(jobs) // (4 * self._jobs))))
+        else:
+            outcomes = [run_test(each) for each in jobs]
+        if self._coverage is not None:
+            for (scenario, image, program_map), outcome in zip(runs, outcomes):
+                source = str(Path(scenario.source).resolve()) if scenario.source else scenario.name
+                self._coverage.add_run(source, outcome.recorder, program_map, image,
+                                       scenario.offset)
+                outcome.recorder = None
+        return results + outcomes
+
+    def _program_map_of(self, scenario):
+        if self._coverage is None:
+            return None
+        program = AssemblyParser().parse(scenario.program)
+        return Assembler().build(program).debug_infos
+
+
+
+class JUnitReport:
+
+    def __init__(self, results):
+        self._results = results
+
+    def save_as(self, file_name):
+        ElementTree.ElementTree(self.as_xml()).write(file_name,
+                                                     encoding="utf-8",
+                                                     xml_declaration=True)
+
+    def as_xml(self):
+        suites = ElementTree.Element("testsuites")
+        by_scenario = {}
+        for each in self._results:
+            by_scenario.setdefault(each.scenario, []).append(each)
+        for scenario, results in by_scenario.items():
+            suite = ElementTree.SubElement(suites, "testsuite", {
+                "name": scenario,
+                "tests": str(len(results)),
+                "failures": str(sum(1 for each in results
+                                    if each.status in (TestResult.FAILED, TestResult.TIMEOUT))),
+                "errors": str(sum(1 for each in results if each.status == TestResult.ERROR)),
+                "time": f"{sum(each.duration for each in results):.6f}"
+            })
+            for each in results:
+                case = ElementTree.SubElement(suite, "testcase", {
+                    "classname": scenario,
+                    "name": each.name,
+                    "time": f"{each.duration:.6f}"
+                })
+                properties = ElementTree.SubElement(case, "properties")
+                ElementTree.SubElement(properties, "property",
+                                       { "name": "cycles", "value": str(each.cycles) })
+                if each.status in (TestResult.FAILED, TestResult.TIMEOUT):
+                    ElementTree.SubElement(case, "failure",
+                                           { "type": each.status, "message": each.message })
+                elif each.status == TestResult.ERROR:
+                    ElementTree.SubElement(case, "error", { "message": each.message })
+        return suites
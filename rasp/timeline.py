@@ -0,0 +1,159 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+import json
+
+
+
+class Timeline:
+
+    ENTRY = "<entry>"
+
+    PROCESS = 1
+    REGIONS = 1
+    DEVICES = 2
+
+    def __init__(self, destination, machine, program_map=None, cells=None, bucket=1000):
+        if bucket < 1:
+            raise RuntimeError(f"Invalid bucket size {bucket}")
+        self._destination = destination
+        self._machine = machine
+        self._bucket = bucket
+        self._cells = cells or {}
+        self._names, self._regions = self._find_regions(machine.memory.capacity,
+                                                        program_map)
+        self._cycle = 0
+        self._bucket_end = bucket
+        self._bucket_start = 0
+        self._counts = {}
+        self._io = {}
+        self._span = None
+        self._counters = {}
+        self._is_first = True
+        self._open()
+
+    @classmethod
+    def _find_regions(cls, capacity, program_map):
+        names = [cls.ENTRY]
+        regions = [0] * capacity
+        if program_map is None:
+            return names, regions
+        labels = sorted((address, symbol)
+                        for line, address, symbol in program_map.as_table()
+                        if symbol)
+        for index, (address, symbol) in enumerate(labels):
+            end = labels[index + 1][0] if index + 1 < len(labels) else capacity
+            names.append(symbol)
+            for each_address in range(address, min(end, capacity)):
+                regions[each_address] = len(names) - 1
+        return names, regions
+
+    def attach(self):
+        machine = self._machine
+        machine.cpu.attach(self)
+        machine.input_device = TimelineInputDevice(machine.input_device, self)
+        machine.output_device = TimelineOutputDevice(machine.output_device, self)
+
+    def on_new_cpu_cycle(self, count=1, ip=0):
+        region = self._regions[ip] if ip < len(self._regions) else 0
+        counts = self._counts
+        counts[region] = counts.get(region, 0) + count
+        self._cycle += count
+        if self._cycle >= self._bucket_end:
+            self._flush()
+
+    def on_input(self, value):
+        self._on_io("read", value)
+
+    def on_output(self, value):
+        self._on_io("print", value)
+
+    def _on_io(self, kind, value):
+        count, last = self._io.get(kind, (0, None))
+        self._io[kind] = (count + 1, value)
+
+    def _flush(self):
+        if self._counts:
+            region = max(self._counts, key=self._counts.get)
+            if self._span is None or self._span[0] != region:
+                self._close_span()
+                self._span = (region, self._bucket_start)
+        self._emit_counter("ACC", self._machine.cpu.accumulator)
+        for name, address in self._cells.items():
+            self._emit_counter(name, self._machine.memory.peek(address))
+        for kind, (count, value) in sorted(self._io.items()):
+            self._emit({ "name": kind, "ph": "i", "s": "t",
+                         "ts": self._cycle, "pid": self.PROCESS, "tid": self.DEVICES,
+                         "args": { "count": count, "last": value } })
+        self._counts = {}
+        self._io = {}
+        self._bucket_start = self._cycle
+        self._bucket_end = self._cycle + self._bucket
+
+    def _close_span(self):
+        if self._span is not None:
+            region, start = self._span
+            self._emit({ "name": self._names[region], "ph": "X",
+                         "ts": start, "dur": self._bucket_start - start,
+                         "pid": self.PROCESS, "tid": self.REGIONS })
+
+    def _emit_counter(self, name, value):
+        if self._counters.get(name) == value:
+            return
+        self._counters[name] = value
+        self._emit({ "name": name, "ph": "C", "ts": self._cycle,
+                     "pid": self.PROCESS, "args": { "value": value } })
+
+    def _open(self):
+        self._destination.write('{"traceEvents": [\n')
+        self._emit({ "name": "process_name", "ph": "M", "pid": self.PROCESS,
+                     "args": { "name": "RASP" } })
+        self._emit({ "name": "thread_name", "ph": "M", "pid": self.PROCESS,
+                     "tid": self.REGIONS, "args": { "name": "Labels" } })
+        self._emit({ "name": "thread_name", "ph": "M", "pid": self.PROCESS,
+                     "tid": self.DEVICES, "args": { "name": "I/O" } })
+
+    def close(self):
+        if self._counts or self._io:
+            self._flush()
+        self._close_span()
+        self._span = None
+        self._destination.write("\n]}\n")
+
+    def _emit(self, event):
+        if not self._is_first:
+            self._destination.write(",\n")
+        self._is_first = False
+        self._destination.write(json.dumps(event))
+
+
+
+class TimelineInputDevice:
+
+    def __init__(self, device, timeline):
+        self._device = device
+        self._timeline = timeline
+
+    def read(self):
+        value = self._device.read()
+        self._timeline.on_input(value)
+        return value
+
+
+
+class TimelineOutputDevice:
+
+    def __init__(self, device, timeline):
+        self._device = device
+        self._timeline = timeline
+
+    def write(self, value):
+        self._device.write(value)
+        self._timeline.on_output(value)
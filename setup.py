@@ -44,6 +44,9 @@ setup(
               "pytest==6.2.4",
               "coverage==5.5",
               "pyyaml==5.4.1",
+          ],
+          "test": [
+              "pyyaml==5.4.1",
           ]
       },
     entry_points={
@@ -9,12 +9,13 @@
 
 
 
+from os import environ
 from pathlib import Path
 
-from rasp.assembly.parser import AssemblyParser
-from rasp.assembler import Assembler
-from rasp.executable import Loader
-from rasp.machine import RASP
+from rasp.coverage import Coverage, CoverageRecorder
+from rasp.machine import Profiler
+from rasp.program import Program
+from rasp.testing import ScenarioLibrary
 
 from tests.fakes import FakeInputDevice, FakeOutputDevice
 
@@ -24,25 +25,31 @@ from unittest import TestCase, TestSuite, main
 
 class Scenario:
 
-    def __init__(self, name, program, tests, is_skipped=False):
+    def __init__(self, name, program, tests, is_skipped=False, source=None, offset=0):
         self.name = name
-        self._binary_code = self._compile(program)
+        self._program = Program.from_assembly(program)
+        self._optimized_program = Program.from_assembly(program, optimize=True)
         self._tests = tests
+        self._source = source or name
+        self._offset = offset
         self.is_skipped = is_skipped
 
 
     def prepare_run(self):
         runners = []
         for each_test in self._tests:
-            runner = each_test.prepare_run(self._binary_code)
+            runner = each_test.prepare_run(self._program, self._record_coverage)
             runners.append((each_test.name, runner))
+            runner = each_test.prepare_optimized_run(self.name,
+                                                     self._program,
+                                                     self._optimized_program)
+            runners.append((each_test.name + " (optimized)", runner))
+            runner = each_test.prepare_ram_run(self._program)
+            runners.append((each_test.name + " (RAM)", runner))
         return runners
 
-    @staticmethod
-    def _compile(assembly_code):
-        program = AssemblyParser().parse(assembly_code)
-        binary = Assembler().assemble(program)
-        return " ".join(str(each) for each in binary)
+    def _record_coverage(self, recorder, image):
+        COVERAGE.add_run(self._source, recorder, self._program.program_map, image, self._offset)
 
 
 
@@ -53,61 +60,57 @@ class Test:
         self._expected_outputs = expected_outputs
         self.name = name
 
-    def prepare_run(self, binary_code):
+    def prepare_run(self, program, on_coverage=None):
         def runner(this):
-            machine = RASP(input_device=FakeInputDevice(self._inputs),
-                       output_device=FakeOutputDevice())
+            outputs, cycles = self._run(program, on_coverage)
+            this.assertEqual(self._expected_outputs, outputs)
+        return runner
 
-            Loader().from_text(machine.memory, binary_code)
-            machine.run()
-            this.assertEqual(self._expected_outputs, machine.output_device.values)
+    def prepare_optimized_run(self, scenario, program, optimized_program):
+        def runner(this):
+            outputs, cycles = self._run(program)
+            optimized_outputs, optimized_cycles = self._run(optimized_program)
+            this.assertEqual(outputs, optimized_outputs)
+            this.assertLessEqual(optimized_cycles, cycles)
+            OPTIMIZATIONS.append((scenario, self.name, cycles, optimized_cycles))
         return runner
 
+    def prepare_ram_run(self, program):
+        def runner(this):
+            outputs, cycles = self._run(program)
+            ram_outputs, ram_cycles = self._run(program, ram=True)
+            this.assertEqual(outputs, ram_outputs)
+            this.assertEqual(cycles, ram_cycles)
+        return runner
 
-class YAMLKeys:
-    SCENARIO = "scenario"
-    INPUTS = "inputs"
-    OUTPUTS = "outputs"
-    NAME = "name"
-    DESCRIPTION = "description"
-    TESTS = "tests"
-    PROGRAM = "program"
+    def _run(self, program, on_coverage=None, ram=False):
+        machine = program.instantiate(input_device=FakeInputDevice(self._inputs),
+                                      output_device=FakeOutputDevice(),
+                                      ram=ram)
+        profiler = Profiler()
+        machine.cpu.attach(profiler)
+        if on_coverage:
+            image = list(program.image)
+            recorder = CoverageRecorder(machine)
+            machine.cpu.attach(recorder)
+        machine.run()
+        if on_coverage:
+            on_coverage(recorder, image)
+        return machine.output_device.values, profiler.cycle_count
 
 
 class Library:
 
     def __init__(self, directory):
-        self._home = Path(directory)
+        self._scenarios = ScenarioLibrary(directory)
 
     def all(self):
-        scenarios = []
-        for each_file in self._find_all_scenarios():
-            each_data = self._parse(each_file)
-            each_scenario = self._build(each_data)
-            scenarios.append(each_scenario)
-        return scenarios
-
-    def _find_all_scenarios(self):
-        yaml_files = []
-        for any_file in self._home.iterdir():
-            if any_file.suffix in [".yaml", ".yml"]:
-                yaml_files.append(any_file)
-        return yaml_files
-
-    def _parse(self, yaml_file):
-        from yaml import safe_load
-        return safe_load(yaml_file.read_text())
-
-    def _build(self, dictionary):
-        tests = []
-        for each_test in dictionary[YAMLKeys.SCENARIO][YAMLKeys.TESTS]:
-            name = each_test[YAMLKeys.NAME]
-            tests.append(Test(name,
-                              list(map(int, each_test[YAMLKeys.INPUTS])),
-                              list(map(int, each_test[YAMLKeys.OUTPUTS]))))
-        return Scenario(dictionary[YAMLKeys.SCENARIO][YAMLKeys.NAME],
-                        dictionary[YAMLKeys.SCENARIO][YAMLKeys.PROGRAM],
-                        tests)
+        return [Scenario(each.name,
+                         each.program,
+                         [Test(test.name, test.inputs, test.outputs) for test in each.tests],
+                         source=str(Path(each.source).resolve()),
+                         offset=each.offset)
+                for each in self._scenarios.all()]
 
 
 class Generator:
@@ -131,6 +134,24 @@ class Generator:
 
 
 
+OPTIMIZATIONS = []
+
+COVERAGE = Coverage()
+
+
+def tearDownModule():
+    if environ.get("RASP_COVERAGE"):
+        coverage_file = environ["RASP_COVERAGE"]
+        COVERAGE.add_to(coverage_file)
+    if not OPTIMIZATIONS:
+        return
+    print("\nCycles saved by the peephole optimizer:")
+    for scenario, test, cycles, optimized_cycles in sorted(OPTIMIZATIONS):
+        saved = cycles - optimized_cycles
+        print(f" - {scenario} / {test}: {cycles} -> {optimized_cycles} "
+              f"({saved} saved, {100 * saved / cycles:.1f}%)")
+
+
 def load_tests(loader, tests, pattern):
     repository = Library("tests/acceptance")
     generate = Generator(repository)
@@ -8,8 +8,10 @@
 #
 
 
+from rasp.debug.breakpoints import Condition, Operand
 from rasp.debug.controller import Break, DebugController, Quit, SetAccumulator, SetMemory, \
-    SetInstructionPointer, ShowCPU, ShowMemory, ShowSource, Step
+    SetInstructionPointer, ShowCPU, ShowMemory, ShowSource, Step, Trace, Watch, WatchSymbol, \
+    ClearWatch, StepBack, ReverseContinue, GotoCycle, ShowChanges
 
 from unittest import TestCase
 
@@ -22,6 +24,13 @@ class CommandParserTest(TestCase):
         command = DebugController._parse_command(text)
         self.assertEqual(expectation, command)
 
+    def test_grammar_is_built_once(self):
+        self.assertIs(DebugController._grammar(), DebugController._grammar())
+
+    def test_reject_trailing_text(self):
+        with self.assertRaises(Exception):
+            DebugController._parse_command("run now")
+
     def test_set_ip(self):
         self.verify(SetInstructionPointer(25),
                     "set ip 25")
@@ -38,9 +47,52 @@ class CommandParserTest(TestCase):
         self.verify(Break(24),
                     "break at address 24")
 
+    def test_break_at_line_if(self):
+        self.verify(Break(14, True, Condition(Operand.accumulator(), "<", Operand.constant(0))),
+                    "break at line 14 if acc < 0")
+
+    def test_break_at_symbol_if(self):
+        self.verify(Break("loop", condition=Condition(Operand.memory("counter"), "==",
+                                                      Operand.constant(500))),
+                    "break at loop if memory[counter] == 500")
+
+    def test_break_after_hits(self):
+        self.verify(Break(20, ignore_count=1000),
+                    "break at 20 after 1000 hits")
+
     def test_step(self):
         self.verify(Step(), "step")
 
+    def test_step_back(self):
+        self.verify(StepBack(), "step back")
+
+    def test_step_back_with_count(self):
+        self.verify(StepBack(5), "step back 5")
+
+    def test_reverse_continue(self):
+        self.verify(ReverseContinue(), "reverse continue")
+
+    def test_goto_cycle(self):
+        self.verify(GotoCycle(1000), "goto cycle 1000")
+
+    def test_trace_on(self):
+        self.verify(Trace(True), "trace on")
+
+    def test_trace_off(self):
+        self.verify(Trace(False), "trace off")
+
+    def test_watch(self):
+        self.verify(Watch(34), "watch 34")
+
+    def test_watch_range(self):
+        self.verify(Watch(30, 40, "read"), "watch read 30 40")
+
+    def test_watch_symbol(self):
+        self.verify(WatchSymbol("counter", "access"), "watch access counter")
+
+    def test_clear_watch(self):
+        self.verify(ClearWatch(34), "clear watch 34")
+
     def test_quit(self):
         self.verify(Quit(), "quit")
 
@@ -48,6 +100,15 @@ class CommandParserTest(TestCase):
         self.verify(ShowMemory(10, 30),
                     "show memory 10 30")
 
+    def test_show_memory_page(self):
+        self.verify(ShowMemory(10), "show memory 10")
+
+    def test_show_next_memory_page(self):
+        self.verify(ShowMemory(), "show memory")
+
+    def test_show_changes(self):
+        self.verify(ShowChanges(), "show changes")
+
     def test_show_cpu(self):
         self.verify(ShowCPU(), "show cpu")
 
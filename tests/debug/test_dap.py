@@ -0,0 +1,250 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from base64 import b64decode
+from io import BytesIO
+
+import struct
+
+from rasp.assembler import ProgramMap
+from rasp.debug.core import Debugger
+from rasp.debug.dap import AdapterView, Connection, DebugAdapter
+from rasp.instructions import Add, Halt, Load, Print, Read, Store
+from rasp.machine import RASP
+
+from unittest import TestCase
+
+
+
+class ScriptedClient:
+
+    def __init__(self):
+        self._requests = BytesIO()
+        self._connection = Connection(None, self._requests)
+
+    def request(self, command, **arguments):
+        self._connection.send({
+            "type": "request",
+            "command": command,
+            "arguments": arguments
+        })
+        return self
+
+    def run(self, adapter):
+        replies = BytesIO()
+        adapter.serve(BytesIO(self._requests.getvalue()), replies)
+        replies.seek(0)
+        connection = Connection(replies, None)
+        messages = []
+        while True:
+            message = connection.receive()
+            if message is None:
+                break
+            messages.append(message)
+        return messages
+
+
+
+class DebugAdapterTest(TestCase):
+
+    def setUp(self):
+        debug_infos = ProgramMap.from_table([
+            (4, 0, "start"),
+            (5, 2, None),
+            (6, 4, None),
+            (7, 6, None),
+            (8, 8, None),
+            (9, 10, None),
+            (10, 12, None),
+            (11, 14, None),
+            (2, 16, "value")
+        ])
+        self.view = AdapterView()
+        self.machine = RASP(input_device=self.view, output_device=self.view)
+        self.machine.memory.load_program(
+            Read(16),
+            Load(0),
+            Add(16),
+            Read(16),
+            Add(16),
+            Store(16),
+            Print(16),
+            Halt()
+        )
+        debugger = Debugger(self.machine, self.view, debug_infos)
+        self.adapter = DebugAdapter(debugger, self.machine, self.view,
+                                    debug_infos, "/tmp/test.asm")
+        self.client = ScriptedClient() \
+            .request("initialize", adapterID="rasp") \
+            .request("launch", inputs=[20, 30])
+
+    def responses(self, messages, command):
+        return [each for each in messages
+                if each["type"] == "response" and each["command"] == command]
+
+    def events(self, messages, event):
+        return [each for each in messages
+                if each["type"] == "event" and each["event"] == event]
+
+    def test_initialize(self):
+        messages = self.client.request("disconnect").run(self.adapter)
+        initialize = self.responses(messages, "initialize")[0]
+        self.assertTrue(initialize["body"]["supportsReadMemoryRequest"])
+        self.assertEqual(1, len(self.events(messages, "initialized")))
+
+    def test_breakpoint_and_continue(self):
+        messages = self.client \
+            .request("setBreakpoints", source={"path": "/tmp/test.asm"},
+                     breakpoints=[{"line": 8}, {"line": 3}]) \
+            .request("configurationDone") \
+            .request("continue", threadId=1) \
+            .request("stackTrace", threadId=1) \
+            .request("disconnect") \
+            .run(self.adapter)
+        breakpoints = self.responses(messages, "setBreakpoints")[0]["body"]["breakpoints"]
+        self.assertEqual([True, False], [each["verified"] for each in breakpoints])
+        stopped = self.events(messages, "stopped")
+        self.assertEqual(["entry", "breakpoint"], [each["body"]["reason"] for each in stopped])
+        frame = self.responses(messages, "stackTrace")[0]["body"]["stackFrames"][0]
+        self.assertEqual(8, frame["line"])
+        self.assertEqual("/tmp/test.asm", frame["source"]["path"])
+
+    def test_breakpoint_in_another_module(self):
+        debug_infos = ProgramMap.from_table([(4, 0, "start"), (5, 2, None), (6, 4, None),
+                                             (7, 6, None), (8, 8, None),
+                                             (4, 10, "twice"), (5, 12, None), (6, 14, None),
+                                             (2, 16, "value")],
+                                            [("test", 0, 10, 16, 17), ("lib", 10, 16, 17, 17)])
+        debugger = Debugger(self.machine, self.view, debug_infos)
+        adapter = DebugAdapter(debugger, self.machine, self.view, debug_infos, "/tmp/test.asm")
+        messages = self.client \
+            .request("setBreakpoints", source={"path": "/tmp/lib.asm"},
+                     breakpoints=[{"line": 5}]) \
+            .request("continue", threadId=1) \
+            .request("stackTrace", threadId=1) \
+            .request("disconnect") \
+            .run(adapter)
+        self.assertEqual(12, self.machine.cpu.instruction_pointer)
+        frame = self.responses(messages, "stackTrace")[0]["body"]["stackFrames"][0]
+        self.assertEqual(5, frame["line"])
+        self.assertEqual("/tmp/lib.asm", frame["source"]["path"])
+
+    def test_breakpoints_in_several_modules(self):
+        debug_infos = ProgramMap.from_table([(4, 0, "start"), (5, 2, None), (6, 4, None),
+                                             (7, 6, None), (8, 8, None),
+                                             (4, 10, "twice"), (5, 12, None), (6, 14, None),
+                                             (2, 16, "value")],
+                                            [("test", 0, 10, 16, 17), ("lib", 10, 16, 17, 17)])
+        debugger = Debugger(self.machine, self.view, debug_infos)
+        adapter = DebugAdapter(debugger, self.machine, self.view, debug_infos, "/tmp/test.asm")
+        messages = self.client \
+            .request("setBreakpoints", source={"path": "/tmp/test.asm"},
+                     breakpoints=[{"line": 5}]) \
+            .request("setBreakpoints", source={"path": "/tmp/lib.asm"},
+                     breakpoints=[{"line": 5}]) \
+            .request("continue", threadId=1) \
+            .request("stackTrace", threadId=1) \
+            .request("continue", threadId=1) \
+            .request("stackTrace", threadId=1) \
+            .request("disconnect") \
+            .run(adapter)
+        frames = [each["body"]["stackFrames"][0]
+                  for each in self.responses(messages, "stackTrace")]
+        self.assertEqual([("/tmp/test.asm", 5), ("/tmp/lib.asm", 5)],
+                         [(each["source"]["path"], each["line"]) for each in frames])
+
+    def test_conditional_breakpoint(self):
+        messages = self.client \
+            .request("setBreakpoints", source={"path": "/tmp/test.asm"},
+                     breakpoints=[{"line": 9, "condition": "acc > 40"}]) \
+            .request("continue", threadId=1) \
+            .request("disconnect") \
+            .run(self.adapter)
+        self.assertEqual(1, len(self.events(messages, "stopped")))
+        self.assertEqual(10, self.machine.cpu.instruction_pointer)
+
+    def test_step_and_variables(self):
+        messages = self.client \
+            .request("next", threadId=1) \
+            .request("scopes", frameId=0) \
+            .request("variables", variablesReference=DebugAdapter.REGISTERS) \
+            .request("variables", variablesReference=DebugAdapter.SYMBOLS) \
+            .request("disconnect") \
+            .run(self.adapter)
+        registers, symbols = [each["body"]["variables"]
+                              for each in self.responses(messages, "variables")]
+        self.assertEqual({"ACC": "0", "IP": "2"},
+                         {each["name"]: each["value"] for each in registers})
+        self.assertEqual({"start": "2", "value": "20"},
+                         {each["name"]: each["value"] for each in symbols})
+
+    def test_run_to_completion(self):
+        messages = self.client \
+            .request("continue", threadId=1) \
+            .request("disconnect") \
+            .run(self.adapter)
+        outputs = self.events(messages, "output")
+        self.assertEqual(["50\n"], [each["body"]["output"] for each in outputs])
+        self.assertEqual(1, len(self.events(messages, "terminated")))
+
+    def test_read_memory_in_one_request(self):
+        self.machine.memory.load_image(16, [-1, 7])
+        messages = self.client \
+            .request("readMemory", memoryReference="0", offset=0, count=18 * 8) \
+            .request("disconnect") \
+            .run(self.adapter)
+        body = self.responses(messages, "readMemory")[0]["body"]
+        cells = struct.unpack("<18q", b64decode(body["data"]))
+        self.assertEqual((2, 16, 8, 0), cells[:4])
+        self.assertEqual((-1, 7), cells[16:])
+        self.assertEqual(0, body["unreadableBytes"])
+
+    def test_read_memory_beyond_capacity(self):
+        capacity = self.machine.memory.capacity
+        messages = self.client \
+            .request("readMemory", memoryReference=str(capacity - 1), count=16) \
+            .request("disconnect") \
+            .run(self.adapter)
+        body = self.responses(messages, "readMemory")[0]["body"]
+        self.assertEqual(8, len(b64decode(body["data"])))
+        self.assertEqual(8, body["unreadableBytes"])
+
+    def test_read_memory_with_wide_values(self):
+        self.machine.memory.load_image(16, [-2 ** 40, 2 ** 40, 2 ** 64, 3])
+        messages = self.client \
+            .request("readMemory", memoryReference="16", count=4 * 8) \
+            .request("disconnect") \
+            .run(self.adapter)
+        body = self.responses(messages, "readMemory")[0]["body"]
+        cells = struct.unpack("<2q", b64decode(body["data"]))
+        self.assertEqual((-2 ** 40, 2 ** 40), cells)
+        self.assertEqual(16, body["unreadableBytes"])
+
+    def test_run_out_of_inputs(self):
+        messages = ScriptedClient() \
+            .request("initialize", adapterID="rasp") \
+            .request("launch", inputs=[20]) \
+            .request("continue", threadId=1) \
+            .request("disconnect") \
+            .run(self.adapter)
+        self.assertEqual(1, len(self.responses(messages, "continue")))
+        self.assertTrue(self.responses(messages, "continue")[0]["success"])
+        stopped = self.events(messages, "stopped")
+        self.assertEqual(["exception"], [each["body"]["reason"] for each in stopped])
+        errors = [each["body"]["output"] for each in self.events(messages, "output")
+                  if each["body"]["category"] == "stderr"]
+        self.assertEqual(["Error: No more input available.\n"], errors)
+
+    def test_unsupported_request(self):
+        messages = self.client \
+            .request("evaluate", expression="acc") \
+            .request("disconnect") \
+            .run(self.adapter)
+        self.assertFalse(self.responses(messages, "evaluate")[0]["success"])
@@ -12,12 +12,13 @@
 from rasp.assembler import ProgramMap
 from rasp.debug.controller import Break, Quit, SetAccumulator, SetMemory, \
     SetInstructionPointer, ShowCPU, ShowMemory, ShowSource, Step
+from rasp.debug.breakpoints import Condition, Operand
 from rasp.debug.core import Debugger
-from rasp.instructions import Add, Halt, Load, Print, Read, Store
-from rasp.machine import RASP
+from rasp.instructions import Add, Halt, JumpIfPositive, Load, Print, Read, Store, Subtract
+from rasp.machine import Profiler, RASP
 
 
-from tests.fakes import FakeInputDevice
+from tests.fakes import FakeInputDevice, FakeOutputDevice
 
 from unittest import TestCase
 from unittest.mock import MagicMock
@@ -40,6 +41,19 @@ class DebuggerTest(TestCase):
         self.cli = MagicMock()
         self.debugger = Debugger(self.machine, self.cli)
 
+    def test_watch_symbol_without_debug_infos(self):
+        self.debugger.watch_symbol("value")
+        self.cli.report_error.assert_called_once()
+
+    def test_watch_the_whole_last_symbol(self):
+        program_map = ProgramMap.from_table([(1, 0, "start"), (2, 2, None),
+                                             (3, 10, "value"), (4, 11, "buffer")],
+                                            size=15)
+        debugger = Debugger(self.machine, self.cli, program_map)
+        debugger.watch_symbol("buffer")
+        debugger.show_watchpoints()
+        self.cli.show_watchpoints.assert_called_once_with([("write", 11, 14)])
+
     def test_set_accumulator(self):
         self.debugger.set_accumulator(2)
         self.assertEqual(2, self.machine.cpu.accumulator)
@@ -61,12 +75,35 @@ class DebuggerTest(TestCase):
         self.debugger.run()
         self.assertEqual(10, self.machine.cpu.instruction_pointer)
 
+    def test_show_cpu_beyond_memory(self):
+        self.debugger.set_instruction_pointer(self.machine.memory.capacity)
+        self.debugger.show_cpu()
+        self.cli.show_cpu.assert_called_with((0, self.machine.memory.capacity,
+                                              "out of memory", 0))
+
     def test_run_from_breakpoint(self):
         self.debugger.set_breakpoint(0)
         self.debugger.set_breakpoint(4)
         self.debugger.run()
         self.assertEqual(4, self.machine.cpu.instruction_pointer)
 
+    def test_run_does_not_echo_instructions(self):
+        self.debugger.run()
+        self.cli.show_instruction.assert_not_called()
+        self.cli.show_cpu.assert_called_once()
+
+    def test_run_with_trace(self):
+        self.debugger.set_trace(True)
+        self.debugger.set_breakpoint(4)
+        self.debugger.run()
+        self.assertEqual(2, self.cli.show_instruction.call_count)
+        self.assertEqual(4, self.machine.cpu.instruction_pointer)
+
+    def test_step_refreshes_once(self):
+        self.debugger.step(3)
+        self.assertEqual(6, self.machine.cpu.instruction_pointer)
+        self.cli.show_cpu.assert_called_once()
+
     def test_view_memory(self):
         self.debugger.show_memory(2, 4)
 
@@ -103,6 +140,35 @@ class DebuggerTest(TestCase):
         ]
         self.cli.show_memory.assert_called_once_with(expected)
 
+    def test_view_memory_does_not_notify_observers(self):
+        profiler = Profiler()
+        self.machine.memory.attach(profiler)
+        self.debugger.show_memory(0, 200)
+        self.assertEqual([], profiler.memory_coverage)
+
+    def test_view_memory_page(self):
+        self.debugger.show_memory(0, 199)
+        rows, remaining = self.cli.show_memory_dump.call_args[0]
+        self.assertEqual(Debugger.PAGE_SIZE // Debugger.ROW_SIZE, len(rows))
+        self.assertEqual((0, [8, 2, 8, 3, 8, 4, 8, 5]), rows[0])
+        self.assertEqual(200 - Debugger.PAGE_SIZE, remaining)
+
+    def test_view_next_memory_page(self):
+        self.debugger.show_memory(0, 199)
+        self.debugger.show_memory()
+        rows, remaining = self.cli.show_memory_dump.call_args[0]
+        self.assertEqual(Debugger.PAGE_SIZE, rows[0][0])
+        self.assertEqual(0, remaining)
+        self.debugger.show_memory()
+        self.cli.report_error.assert_called_once()
+
+    def test_view_memory_page_stops_at_capacity(self):
+        capacity = self.machine.memory.capacity
+        self.debugger.show_memory(capacity - 20)
+        rows, remaining = self.cli.show_memory_dump.call_args[0]
+        self.assertEqual(20, sum(len(values) for start, values in rows))
+        self.assertEqual(0, remaining)
+
     def test_view_breakpoints(self):
         self.debugger.set_breakpoint(3)
         self.debugger.set_breakpoint(6)
@@ -110,8 +176,8 @@ class DebuggerTest(TestCase):
         self.debugger.show_breakpoints()
 
         expected = [
-            (3, False, 3, 'add'),
-            (6, False, 8, 'load')
+            (3, False, 3, 'add', ""),
+            (6, False, 8, 'load', "")
         ]
         self.cli.show_breakpoints.assert_called_once_with(expected)
 
@@ -123,12 +189,99 @@ class DebuggerTest(TestCase):
 
         self.debugger.show_breakpoints()
         self.cli.show_breakpoints.assert_called_once_with([
-            (6, False, 8, 'load')
+            (6, False, 8, 'load', "")
         ])
 
 
 
 
+class ConditionalBreakpointTest(TestCase):
+
+    def setUp(self):
+        self.machine = RASP()
+        self.machine.memory.load_program(
+            Load(0),
+            Add(20),
+            Subtract(21),
+            Store(20),
+            JumpIfPositive(0),
+            Halt()
+        )
+        self.machine.memory.load_image(20, [10, 1])
+        self.cli = MagicMock()
+        program_map = ProgramMap.from_table([
+            (1, 0, "loop"),
+            (6, 20, "counter")
+        ])
+        self.debugger = Debugger(self.machine, self.cli, program_map)
+
+    def test_break_if_memory_equals(self):
+        condition = Condition(Operand.memory("counter"), "==", Operand.constant(5))
+        self.debugger.set_breakpoint_at_symbol("loop", condition)
+        self.debugger.run()
+        self.assertEqual(0, self.machine.cpu.instruction_pointer)
+        self.assertEqual(5, self.machine.memory.peek(20))
+
+    def test_break_if_accumulator_is_negative(self):
+        condition = Condition(Operand.accumulator(), "<", Operand.constant(0))
+        self.debugger.set_breakpoint(8, condition)
+        self.debugger.run()
+        self.assertEqual(8, self.machine.cpu.instruction_pointer)
+        self.assertEqual(-1, self.machine.cpu.accumulator)
+
+    def test_break_after_hits(self):
+        self.debugger.set_breakpoint(4, ignore_count=3)
+        self.debugger.run()
+        self.assertEqual(7, self.machine.cpu.accumulator)
+        self.debugger.run()
+        self.assertEqual(6, self.machine.cpu.accumulator)
+
+    def test_break_with_condition_and_hits(self):
+        condition = Condition(Operand.accumulator(), "<", Operand.constant(5))
+        self.debugger.set_breakpoint(8, condition, 2)
+        self.debugger.run()
+        self.assertEqual(2, self.machine.cpu.accumulator)
+
+    def test_step_honours_conditions(self):
+        condition = Condition(Operand.accumulator(), "<", Operand.constant(0))
+        self.debugger.set_breakpoint(8, condition)
+        self.debugger.step(10)
+        self.assertEqual(0, self.machine.cpu.instruction_pointer)
+
+    def test_reverse_continue_honours_conditions(self):
+        condition = Condition(Operand.memory(20), "==", Operand.constant(7))
+        self.debugger.set_breakpoint(0, condition)
+        self.debugger.run()
+        self.debugger.run()
+        self.debugger.reverse_continue()
+        self.assertEqual(0, self.machine.cpu.instruction_pointer)
+        self.assertEqual(7, self.machine.memory.peek(20))
+
+    def test_unknown_symbol_in_condition(self):
+        condition = Condition(Operand.memory("missing"), "==", Operand.constant(7))
+        self.debugger.set_breakpoint(0, condition)
+        self.cli.report_error.assert_called_once()
+        self.debugger.run()
+        self.assertTrue(self.machine.is_stopped)
+
+    def test_break_at_an_invalid_line(self):
+        debugger = Debugger(self.machine, self.cli, self.debugger._map,
+                            "load 0\n" * 6)
+        debugger.set_breakpoint_at_line(42)
+        self.cli.report_error.assert_called_once()
+        debugger.run()
+        self.assertTrue(self.machine.is_stopped)
+
+    def test_show_conditional_breakpoint(self):
+        condition = Condition(Operand.accumulator(), "<", Operand.constant(0))
+        self.debugger.set_breakpoint(8, condition, 2)
+        self.debugger.show_breakpoints()
+        self.cli.show_breakpoints.assert_called_once_with([
+            (8, False, 6, 'jump', "if acc < 0 after 2 hits (0 so far)")
+        ])
+
+
+
 class WithSourceCode(TestCase):
 
 
@@ -167,7 +320,9 @@ class WithSourceCode(TestCase):
             Halt()
         ]
 
-        self.machine = RASP(input_device=FakeInputDevice([20, 30]))
+        self.output = FakeOutputDevice()
+        self.machine = RASP(input_device=FakeInputDevice([20, 30, 40]),
+                            output_device=self.output)
         self.machine.memory.load_program(*self.instructions)
         self.cli = MagicMock()
         self.debugger = Debugger(self.machine, self.cli, debug_infos, program)
@@ -191,9 +346,106 @@ class WithSourceCode(TestCase):
 
         self.debugger.show_breakpoints()
         self.cli.show_breakpoints.assert_called_once_with([
-            (4, False, 3, 'add')
+            (4, False, 3, 'add', "")
         ])
 
+    def test_run_until_write(self):
+        self.debugger.watch(16)
+        self.debugger.run()
+        self.assertEqual(2, self.machine.cpu.instruction_pointer)
+        self.cli.show_watchpoint_hit.assert_called_once_with("write", 16, 20)
+
+    def test_run_until_read(self):
+        self.debugger.watch(16, kind="read")
+        self.debugger.run()
+        self.assertEqual(6, self.machine.cpu.instruction_pointer)
+
+    def test_watch_symbol(self):
+        self.debugger.watch_symbol("value", "access")
+        self.debugger.run()
+        self.assertEqual(2, self.machine.cpu.instruction_pointer)
+
+    def test_clear_watchpoint(self):
+        self.debugger.watch(16)
+        self.debugger.clear_watchpoint(16)
+        self.debugger.run()
+        self.assertTrue(self.machine.is_stopped)
+
+    def test_show_watchpoints(self):
+        self.debugger.watch(10, 12, "read")
+        self.debugger.show_watchpoints()
+        self.cli.show_watchpoints.assert_called_once_with([("read", 10, 12)])
+
+    def test_show_changes(self):
+        self.debugger.run()
+        self.debugger.show_changes()
+        self.cli.show_changes.assert_called_once_with([(16, 0, 50)])
+
+    def test_show_changes_since_last_stop(self):
+        self.debugger.step(3)
+        self.debugger.step()
+        self.debugger.show_changes()
+        self.cli.show_changes.assert_called_once_with([(16, 20, 30)])
+
+    def test_show_changes_after_step_back(self):
+        self.debugger.run()
+        self.debugger.step_back(3)
+        self.debugger.show_changes()
+        self.cli.show_changes.assert_called_once_with([(16, 50, 30)])
+
+    def test_step_back(self):
+        self.debugger.step(4)
+        self.debugger.step_back(2)
+        self.assertEqual(4, self.machine.cpu.instruction_pointer)
+        self.assertEqual(0, self.machine.cpu.accumulator)
+        self.assertEqual(20, self.machine.memory.peek(16))
+
+    def test_step_back_beyond_history(self):
+        self.debugger.step(1)
+        self.debugger.step_back(3)
+        self.assertEqual(0, self.machine.cpu.instruction_pointer)
+        self.cli.report_error.assert_called_once()
+
+    def test_step_back_after_halt(self):
+        self.debugger.run()
+        self.debugger.step_back()
+        self.assertFalse(self.machine.is_stopped)
+        self.assertEqual(14, self.machine.cpu.instruction_pointer)
+
+    def test_reverse_continue_to_breakpoint(self):
+        self.debugger.set_breakpoint(4)
+        self.debugger.run()
+        self.debugger.run()
+        self.debugger.reverse_continue()
+        self.assertEqual(4, self.machine.cpu.instruction_pointer)
+        self.assertEqual(0, self.machine.cpu.accumulator)
+
+    def test_reverse_continue_to_write(self):
+        self.debugger.run()
+        self.debugger.watch(16)
+        self.debugger.reverse_continue()
+        self.assertEqual(10, self.machine.cpu.instruction_pointer)
+        self.cli.show_watchpoint_hit.assert_called_once_with("write", 16, 30)
+
+    def test_goto_cycle_replays_inputs(self):
+        self.debugger.run()
+        self.debugger.goto_cycle(1)
+        self.assertEqual(20, self.machine.memory.peek(16))
+        self.debugger.goto_cycle(8)
+        self.assertEqual(50, self.machine.memory.peek(16))
+        self.assertEqual([50], self.output.values)
+
+    def test_goto_cycle_forward(self):
+        self.debugger.goto_cycle(3)
+        self.assertEqual(6, self.machine.cpu.instruction_pointer)
+
+    def test_history_is_capped(self):
+        debugger = Debugger(self.machine, self.cli, history_size=6)
+        debugger.run()
+        debugger.goto_cycle(0)
+        self.assertTrue(self.machine.is_stopped)
+        self.cli.report_error.assert_called_once()
+
     def test_view_source(self):
         self.debugger.show_source(1, 10)
 
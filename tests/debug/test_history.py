@@ -0,0 +1,83 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from rasp.debug.history import History
+from rasp.instructions import Add, Halt, JumpIfPositive, Load, Store
+from rasp.machine import RASP
+
+from unittest import TestCase
+
+
+
+class HistoryTest(TestCase):
+
+    def setUp(self):
+        self.machine = RASP()
+        self.machine.memory.load_program(
+            Load(0),
+            Add(20),
+            Store(20),
+            Load(1),
+            JumpIfPositive(2),
+            Halt()
+        )
+
+    def run_cycles(self, history, count):
+        for each in range(count):
+            instruction = self.machine.instructions.read_from(self.machine)
+            history.record(instruction)
+            instruction.send_to(self.machine)
+
+    def test_undo_restores_registers_and_memory(self):
+        history = History(self.machine)
+        self.run_cycles(history, 4)
+        history.undo()
+        history.undo()
+        self.assertEqual(2, history.cycle)
+        self.assertEqual(4, self.machine.cpu.instruction_pointer)
+        self.assertEqual(0, self.machine.memory.peek(20))
+
+    def test_record_a_write_outside_memory(self):
+        history = History(self.machine)
+        history.record(Store(self.machine.memory.capacity))
+        self.assertEqual(1, history.cycle)
+        self.assertEqual({}, history.changes)
+
+    def test_undo_beyond_first_cycle(self):
+        history = History(self.machine)
+        with self.assertRaises(RuntimeError):
+            history.undo()
+
+    def test_rewind_from_checkpoint(self):
+        history = History(self.machine, interval=5)
+        self.run_cycles(history, 50)
+        value = self.machine.memory.peek(20)
+        history.rewind_to(10)
+        self.run_cycles(history, 40)
+        self.assertEqual(value, self.machine.memory.peek(20))
+
+    def test_rewind_uses_checkpoint(self):
+        history = History(self.machine, interval=5)
+        self.run_cycles(history, 50)
+        self.assertEqual(10, history.rewind_to(11))
+
+    def test_eviction(self):
+        history = History(self.machine, limit=100, interval=1000)
+        self.run_cycles(history, 100)
+        self.assertLessEqual(history.size, 100)
+        self.assertGreater(history.first_cycle, 0)
+        with self.assertRaises(RuntimeError):
+            history.rewind_to(0)
+
+    def test_disabled(self):
+        history = History(self.machine, limit=0)
+        self.run_cycles(history, 10)
+        self.assertEqual(10, history.first_cycle)
+        self.assertEqual(0, history.size)
@@ -0,0 +1,74 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from rasp.debug.controller import DebugController
+from rasp.debug.core import Debugger
+from rasp.debug.script import ScriptView
+from rasp.instructions import Add, Halt, Load, Print, Read, Store
+from rasp.machine import RASP
+
+from unittest import TestCase
+
+
+
+class ScriptTest(TestCase):
+
+    def setUp(self):
+        self.view = ScriptView([20, 30])
+        machine = RASP(input_device=self.view, output_device=self.view)
+        machine.memory.load_program(
+            Read(16),
+            Load(0),
+            Add(16),
+            Read(16),
+            Add(16),
+            Store(16),
+            Print(16),
+            Halt()
+        )
+        self.controller = DebugController(Debugger(machine, self.view), self.view)
+
+    def test_one_record_per_command(self):
+        self.controller.run_script(["break at address 4", "", "# comment", "run"])
+        self.assertEqual(["break at address 4", "run"],
+                         [each["command"] for each in self.view.records])
+
+    def test_run_reports_cpu_and_io(self):
+        self.controller.run_script(["run"])
+        results = self.view.records[0]["results"]
+        self.assertEqual(["input", "input", "output", "cpu"],
+                         [each["type"] for each in results])
+        self.assertEqual(50, results[2]["value"])
+        self.assertEqual(8, results[3]["cycle"])
+
+    def test_show_memory(self):
+        self.controller.run_script(["show memory 16 17"])
+        cells = self.view.records[0]["results"][0]["cells"]
+        self.assertEqual([16, 17], [each["address"] for each in cells])
+
+    def test_invalid_command(self):
+        self.controller.run_script(["jump somewhere", "show cpu"])
+        self.assertEqual("error", self.view.records[0]["results"][0]["type"])
+        self.assertEqual("cpu", self.view.records[1]["results"][0]["type"])
+
+    def test_failing_command(self):
+        self.controller.run_script(["clear address 12"])
+        self.assertEqual("error", self.view.records[0]["results"][0]["type"])
+
+    def test_missing_input(self):
+        self.view = ScriptView()
+        machine = RASP(input_device=self.view, output_device=self.view)
+        machine.memory.load_program(Read(16), Halt())
+        DebugController(Debugger(machine, self.view), self.view).run_script(["run"])
+        self.assertEqual("error", self.view.records[0]["results"][0]["type"])
+
+    def test_quit(self):
+        self.controller.run_script(["show cpu", "quit", "show cpu"])
+        self.assertEqual(2, len(self.view.records))
@@ -0,0 +1,76 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from rasp.debug.watchpoints import Watchpoint, WatchpointIndex
+
+from unittest import TestCase
+
+
+
+class WatchpointIndexTest(TestCase):
+
+    def setUp(self):
+        self.index = WatchpointIndex()
+
+    def test_find_in_overlapping_ranges(self):
+        wide = Watchpoint(10, 20, Watchpoint.WRITE)
+        narrow = Watchpoint(15, 16, Watchpoint.READ)
+        self.index.add(wide)
+        self.index.add(narrow)
+
+        self.assertEqual([wide], self.index.find(12))
+        self.assertEqual([wide, narrow], self.index.find(15))
+        self.assertEqual([narrow], self.index.find(16, Watchpoint.READ))
+        self.assertEqual([], self.index.find(21))
+        self.assertEqual([], self.index.find(9))
+
+    def test_write_hit(self):
+        self.index.add(Watchpoint(10, 20, Watchpoint.WRITE))
+
+        self.index.on_read(12, 3)
+        self.assertIsNone(self.index.hit)
+
+        self.index.on_write(12, 3)
+        self.assertEqual(("write", 12, 3), self.index.hit)
+
+    def test_access_hit(self):
+        self.index.add(Watchpoint(5, kind=Watchpoint.ACCESS))
+
+        self.index.on_read(5, 7)
+
+        self.assertEqual(("read", 5, 7), self.index.hit)
+
+    def test_gap_between_ranges(self):
+        self.index.add(Watchpoint(0, 4))
+        self.index.add(Watchpoint(10, 14))
+
+        self.index.on_write(7, 1)
+
+        self.assertIsNone(self.index.hit)
+
+    def test_remove(self):
+        self.index.add(Watchpoint(0, 4))
+        self.index.add(Watchpoint(10, 14))
+
+        self.index.remove_at(3)
+
+        self.assertEqual([Watchpoint(10, 14)], list(self.index))
+        self.assertEqual([], self.index.find(3))
+
+    def test_many_watchpoints(self):
+        for start in range(0, 10000, 10):
+            self.index.add(Watchpoint(start, start + 4))
+
+        self.assertEqual([Watchpoint(5000, 5004)], self.index.find(5002))
+        self.assertEqual([], self.index.find(5007))
+
+    def test_invalid_range(self):
+        with self.assertRaises(RuntimeError):
+            Watchpoint(10, 5)
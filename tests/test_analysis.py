@@ -0,0 +1,128 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from rasp.analysis import ControlFlowGraph
+from rasp.assembly.parser import AssemblyParser
+from rasp.instructions import Add, Halt, JumpIfPositive, Load, Print, Read, Store
+from rasp.machine import Memory
+
+from unittest import TestCase
+
+
+
+class ControlFlowGraphTest(TestCase):
+
+    MULTIPLICATION = ("segment: data\n"
+                      "    left    1 0\n"
+                      "    right   1 0\n"
+                      "    counter 1 0\n"
+                      "    result  1 0\n"
+                      "segment: code\n"
+                      "           read left\n"
+                      "           read right\n"
+                      "    loop:  load 0\n"
+                      "           add counter\n"
+                      "           subtract right\n"
+                      "           jump done\n"
+                      "           load 0\n"
+                      "           add result\n"
+                      "           add left\n"
+                      "           store result\n"
+                      "           load 1\n"
+                      "           add counter\n"
+                      "           store counter\n"
+                      "           load 0\n"
+                      "           jump loop\n"
+                      "    done:  print result\n"
+                      "           halt 0\n")
+
+    NESTED = ("segment: data\n"
+              "    x 1 0\n"
+              "segment: code\n"
+              "    outer: load 0\n"
+              "           add x\n"
+              "    inner: jump inner_end\n"
+              "           load 0\n"
+              "           jump inner\n"
+              "inner_end: load -1\n"
+              "           add x\n"
+              "           jump outer\n"
+              "           halt 0\n")
+
+    def graph_of(self, source):
+        return ControlFlowGraph.from_program(AssemblyParser().parse(source))
+
+    def test_basic_blocks(self):
+        graph = self.graph_of(self.MULTIPLICATION)
+
+        self.assertEqual([0, 4, 12, 30], sorted(graph.blocks))
+        self.assertEqual(17, graph.instruction_count)
+
+    def test_edges_use_known_accumulator(self):
+        graph = self.graph_of(self.MULTIPLICATION)
+
+        self.assertEqual(sorted([(0, 4, "fallthrough"),
+                                 (4, 30, "taken"),
+                                 (4, 12, "fallthrough"),
+                                 (12, 4, "taken")]),
+                         sorted(graph.edges))
+
+    def test_loops(self):
+        graph = self.graph_of(self.MULTIPLICATION)
+
+        loops = graph.loops()
+
+        self.assertEqual(1, len(loops))
+        self.assertEqual(4, loops[0].header)
+        self.assertEqual({4, 12}, loops[0].body)
+        self.assertEqual(1, graph.loop_depth(14))
+        self.assertEqual(0, graph.loop_depth(30))
+
+    def test_nested_loops(self):
+        graph = self.graph_of(self.NESTED)
+
+        depths = { each.header: each.depth for each in graph.loops() }
+
+        self.assertEqual({0: 1, 4: 2}, depths)
+
+    def test_reaching_definitions(self):
+        graph = self.graph_of(self.MULTIPLICATION)
+
+        self.assertEqual({0, 2, 18, 24}, graph.reaching_definitions(4))
+        self.assertEqual(set(), graph.reaching_definitions(0))
+
+    def test_liveness(self):
+        graph = self.graph_of(self.MULTIPLICATION)
+
+        self.assertEqual({36, 37}, graph.live_in(0))
+        self.assertEqual({34, 35, 36, 37}, graph.live_in(4))
+        self.assertEqual({37}, graph.live_in(30))
+
+    def test_self_modifying_writes(self):
+        memory = Memory()
+        memory.load_program(Read(10), Load(7), Store(4), Halt(), Print(10), Halt())
+
+        graph = ControlFlowGraph.from_memory(memory)
+
+        self.assertEqual([(4, 4)], graph.self_modifying_writes())
+
+    def test_unknown_opcodes_halt(self):
+        graph = ControlFlowGraph([8, 1, 99, 0, 7, 0])
+
+        self.assertEqual([0], sorted(graph.blocks))
+        self.assertEqual([], graph.edges)
+
+    def test_dot_output(self):
+        graph = self.graph_of(self.MULTIPLICATION)
+
+        dot = graph.to_dot()
+
+        self.assertTrue(dot.startswith("digraph cfg {"))
+        self.assertIn("b12 -> b4", dot)
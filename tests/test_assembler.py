@@ -11,10 +11,13 @@
 
 from rasp.assembly.ast import AssemblyProgram, Declaration, Operation
 
-from rasp.assembly.parser import AssemblyParser
+from rasp.assembly.parser import AssemblyFile, AssemblyParser
 from rasp.assembler import Assembler
 from rasp.instructions import Add, Halt, Load, Print, Read, Store
 
+from pathlib import Path
+from pyparsing import ParseException
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
 
@@ -130,6 +133,125 @@ class AssemblyCodeParsingTests(TestCase):
 
 
 
+    def test_halt_without_operand(self):
+        parser = AssemblyParser()
+
+        program = parser.parse("segment: code\n"
+                               "   load 0\n"
+                               "   halt\n")
+
+        expected = AssemblyProgram(
+            data=[],
+            code=[
+                Operation("load", 0),
+                Operation("halt", 0)
+            ]
+        )
+        self.assertEqual(expected, program)
+
+
+
+class StatementParsingTests(TestCase):
+
+    SOURCE = ("segment: data\n"
+              "   variable 1 123\n"
+              "   another 2 -4 ; a comment\n"
+              "\n"
+              ";; Here comes the code segment\n"
+              "segment: code\n"
+              "          load  variable ;; load variable\n"
+              "   start: add   -25\n"
+              "          halt\n")
+
+    def test_same_statements_as_the_program(self):
+        parser = AssemblyParser()
+
+        statements = list(parser.parse_statements(self.SOURCE))
+
+        program = parser.parse(self.SOURCE)
+        self.assertEqual(program.data + program.code, statements)
+        self.assertEqual([2, 3, 7, 8, 9], [each.location for each in statements])
+
+    def test_label_on_its_own_line(self):
+        source = ("segment: code\n"
+                  "   loop:\n"
+                  "          load 0\n"
+                  "          jump loop\n")
+
+        statements = list(AssemblyParser().parse_statements(source))
+
+        self.assertEqual("loop", statements[0].label)
+        self.assertEqual([2, 4], [each.location for each in statements])
+
+    def test_several_statements_per_line(self):
+        source = ("segment: data\n"
+                  "   x 1 0   y 1 5\n"
+                  "segment: code\n"
+                  "   load 0 halt 0\n"
+                  "   add x store x halt\n")
+
+        statements = list(AssemblyParser().parse_statements(source))
+
+        self.assertEqual([2, 2, 4, 4, 5, 5, 5], [each.location for each in statements])
+
+    def test_halt_before_a_label(self):
+        source = ("segment: code\n"
+                  "          halt\n"
+                  "   next:  load 1\n")
+
+        statements = list(AssemblyParser().parse_statements(source))
+
+        self.assertEqual([Operation("halt", 0), Operation("load", 1, "next")],
+                         statements)
+
+    def test_invalid_statement(self):
+        parser = AssemblyParser()
+
+        with self.assertRaises(ParseException):
+            list(parser.parse_statements("segment: code\n   load"))
+
+    def test_declaration_in_code_segment(self):
+        parser = AssemblyParser()
+
+        with self.assertRaises(ParseException):
+            list(parser.parse_statements("segment: code\n   value 1 0"))
+
+    def test_data_segment_after_code_segment(self):
+        parser = AssemblyParser()
+
+        with self.assertRaises(ParseException):
+            parser.parse("segment: code\n load 0\nsegment: data\n x 1 0\n")
+
+    def test_repeated_code_segment(self):
+        parser = AssemblyParser()
+
+        with self.assertRaises(ParseException):
+            parser.parse("segment: code\n load 0\nsegment: code\n halt\n")
+
+    def test_read_file(self):
+        with TemporaryDirectory() as directory:
+            source = Path(directory) / "program.asm"
+            source.write_text(self.SOURCE)
+
+            statements = list(AssemblyFile(source).statements())
+
+        program = AssemblyParser().parse(self.SOURCE)
+        self.assertEqual(list(program.statements()), statements)
+
+
+
+class CountingProgram:
+
+    def __init__(self, program):
+        self._program = program
+        self.passes = 0
+
+    def statements(self):
+        self.passes += 1
+        return self._program.statements()
+
+
+
 class AssemblerTests(TestCase):
 
     def setUp(self):
@@ -159,6 +281,70 @@ class AssemblerTests(TestCase):
         self.assertEqual(expected, layout)
 
 
+    def test_data_segment_as_runs(self):
+        program = AssemblyProgram(
+            data=[
+                Declaration("counter", 1, 0),
+                Declaration("buffer", 1000000, 0),
+                Declaration("limit", 2, 5)
+            ],
+            code=[
+                Operation("add", "counter")
+            ]
+        )
+
+        executable = self.assembler.build(program)
+
+        self.assertEqual([(2, 1000001, 0), (1000003, 2, 5)], executable.data)
+        self.assertEqual(1000005, executable.size)
+
+    def test_stream_matches_build(self):
+        program = AssemblyProgram(
+            data=[
+                Declaration("counter", 1, 0, location=2),
+                Declaration("buffer", 3, 7, location=3)
+            ],
+            code=[
+                Operation("add", "buffer", label="start", location=5),
+                Operation("jump", "start", location=6)
+            ]
+        )
+
+        layout = list(self.assembler.stream(program))
+
+        self.assertEqual(self.assembler.build(program).as_layout(), layout)
+
+    def test_stream_reads_the_program_twice(self):
+        program = CountingProgram(AssemblyProgram(
+            data=[Declaration("counter", 1, 0, location=2)],
+            code=[Operation("add", "counter", label="start", location=4),
+                  Operation("jump", "start", location=5)]))
+
+        list(self.assembler.stream(program))
+
+        self.assertEqual(2, program.passes)
+
+    def test_stream_reports_unknown_symbols_before_emitting(self):
+        program = AssemblyProgram(
+            data=[],
+            code=[Operation("load", 0), Operation("jump", "nowhere")])
+
+        with self.assertRaises(RuntimeError):
+            self.assembler.stream(program)
+
+    def test_duplicated_label(self):
+        program = AssemblyProgram(
+            data=[
+                Declaration("start", 1, 0)
+            ],
+            code=[
+                Operation("add", "start", label="start")
+            ]
+        )
+
+        with self.assertRaises(RuntimeError):
+            self.assembler.assemble(program)
+
     def test_using_undeclared_variable(self):
         program = AssemblyProgram(
             data=[
@@ -0,0 +1,147 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rasp.assembler import ProgramMap
+from rasp.coverage import Coverage, CoverageRecorder
+from rasp.instructions import Add, Halt, JumpIfPositive, Load, Print, Read, Store, Subtract
+from rasp.machine import RASP
+
+from tests.fakes import FakeInputDevice, FakeOutputDevice
+
+from unittest import TestCase
+
+
+
+def add_one_hit(lcov_file):
+    coverage = Coverage.read_from(StringIO(f"SF:{CoverageTest.SOURCE}\nDA:1,1\n"))
+    coverage.add_to(lcov_file)
+
+
+
+class CoverageTest(TestCase):
+
+    SOURCE = "countdown.asm"
+
+    def setUp(self):
+        self.program_map = ProgramMap.from_table([
+            (1, 0, "start"),
+            (2, 2, "loop"),
+            (3, 4, None),
+            (4, 6, None),
+            (5, 8, None),
+            (6, 10, None),
+            (7, 12, None),
+            (8, 14, None),
+            (9, 16, None),
+            (10, 18, None),
+            (11, 20, "counter"),
+            (12, 21, "one")
+        ])
+
+    def run_with(self, value):
+        machine = RASP(FakeInputDevice([value]), FakeOutputDevice())
+        machine.memory.load_program(
+            Read(20),            # 1
+            Load(0),             # 2
+            Add(20),             # 3
+            Subtract(21),        # 4
+            Store(20),           # 5
+            JumpIfPositive(2),   # 6
+            Print(20),           # 7
+            Halt(),              # 8
+            Print(21),           # 9, never executed
+            Halt()               # 10, never executed
+        )
+        machine.memory.load_image(20, [0, 1])
+        image = [machine.memory.peek(address) for address in range(machine.memory.capacity)]
+        recorder = CoverageRecorder(machine)
+        machine.cpu.attach(recorder)
+        machine.run()
+        coverage = Coverage()
+        coverage.add_run(self.SOURCE, recorder, self.program_map, image)
+        return recorder, coverage
+
+    def test_recorder_counts_branches(self):
+        recorder, coverage = self.run_with(2)
+        self.assertEqual({10: [2, 1]}, recorder.branches)
+        self.assertEqual(3, recorder.hits[2])
+
+    def test_jump_to_the_next_instruction_is_taken(self):
+        machine = RASP(FakeInputDevice([]), FakeOutputDevice())
+        machine.memory.load_program(
+            Load(1),
+            JumpIfPositive(4),
+            Halt())
+        recorder = CoverageRecorder(machine)
+        machine.cpu.attach(recorder)
+        machine.run()
+        self.assertEqual({2: [1, 0]}, recorder.branches)
+
+    def test_lines(self):
+        recorder, coverage = self.run_with(2)
+        self.assertEqual({1: 1, 2: 3, 3: 3, 4: 3, 5: 3, 6: 3, 7: 1, 8: 1},
+                         coverage.lines(self.SOURCE))
+
+    def test_branches(self):
+        recorder, coverage = self.run_with(0)
+        self.assertEqual({(6, Coverage.TAKEN): 0, (6, Coverage.FALLTHROUGH): 1},
+                         coverage.branches(self.SOURCE))
+
+    def test_merge_runs(self):
+        first = self.run_with(0)[1]
+        second = self.run_with(3)[1]
+        first.merge(second)
+        self.assertEqual(1 + 4, first.lines(self.SOURCE)[2])
+        self.assertEqual({(6, Coverage.TAKEN): 3, (6, Coverage.FALLTHROUGH): 2},
+                         first.branches(self.SOURCE))
+
+    def test_lcov_format(self):
+        coverage = self.run_with(0)[1]
+        output = StringIO()
+        coverage.write_to(output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(["TN:", f"SF:{self.SOURCE}", "BRDA:6,0,0,0", "BRDA:6,0,1,1",
+                          "BRF:2", "BRH:1"], lines[:6])
+        self.assertIn("DA:2,1", lines)
+        self.assertEqual(["LF:8", "LH:8", "end_of_record"], lines[-3:])
+
+    def test_save_and_load(self):
+        coverage = self.run_with(3)[1]
+        with TemporaryDirectory() as directory:
+            lcov_file = Path(directory) / "coverage.info"
+            coverage.save_as(lcov_file)
+            loaded = Coverage.load(lcov_file)
+        self.assertEqual(coverage.lines(self.SOURCE), loaded.lines(self.SOURCE))
+        self.assertEqual(coverage.branches(self.SOURCE), loaded.branches(self.SOURCE))
+
+    def test_add_to_a_file(self):
+        coverage = self.run_with(3)[1]
+        with TemporaryDirectory() as directory:
+            lcov_file = Path(directory) / "coverage.info"
+            coverage.add_to(lcov_file)
+            coverage.add_to(lcov_file)
+            loaded = Coverage.load(lcov_file)
+        self.assertEqual(2 * coverage.lines(self.SOURCE)[2], loaded.lines(self.SOURCE)[2])
+
+    def test_concurrent_additions_keep_every_run(self):
+        with TemporaryDirectory() as directory:
+            lcov_file = str(Path(directory) / "coverage.info")
+            with ProcessPoolExecutor(max_workers=4) as pool:
+                list(pool.map(add_one_hit, [lcov_file] * 16))
+            loaded = Coverage.load(lcov_file)
+        self.assertEqual({1: 16}, loaded.lines(self.SOURCE))
+
+    def test_load_missing_file(self):
+        self.assertEqual([], Coverage.load("not_there.info").sources)
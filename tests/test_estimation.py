@@ -0,0 +1,164 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from pathlib import Path
+
+from rasp.assembler import Assembler
+from rasp.assembly.parser import AssemblyParser
+from rasp.estimation import CycleEstimator, Polynomial
+from rasp.executable import Loader
+from rasp.machine import RASP, Profiler
+
+from tests.fakes import FakeInputDevice, FakeOutputDevice
+
+from unittest import TestCase
+
+
+
+class PolynomialTest(TestCase):
+
+    def test_arithmetic(self):
+        n = Polynomial.symbol("n")
+        m = Polynomial.symbol("m")
+
+        result = (n + Polynomial.constant(1)) * Polynomial.constant(4) + n * m
+
+        self.assertEqual("4 + 4*n + m*n", str(result))
+
+    def test_negative_terms(self):
+        result = Polynomial.constant(-1) - Polynomial.symbol("limit")
+
+        self.assertEqual("-1 - limit", str(result))
+
+    def test_substitute(self):
+        n = Polynomial.symbol("n")
+
+        result = (n * n).substitute({"n": Polynomial.constant(3)})
+
+        self.assertEqual(Polynomial.constant(9), result)
+
+    def test_bounds(self):
+        left = Polynomial({(): 3, ("n",): 1})
+        right = Polynomial({(): 1, ("n",): 2})
+
+        self.assertEqual("1 + n", str(left.lowest(right)))
+        self.assertEqual("3 + 2*n", str(left.highest(right)))
+
+
+
+class CycleEstimatorTest(TestCase):
+
+    COUNTDOWN = ("segment: data\n"
+                 "    n 1 0\n"
+                 "segment: code\n"
+                 "          read n\n"
+                 "    loop: load -1\n"
+                 "          add n\n"
+                 "          store n\n"
+                 "          jump loop\n"
+                 "          halt\n")
+
+    def estimate(self, source):
+        program = AssemblyParser().parse(source)
+        return CycleEstimator.from_program(program).estimate()
+
+    def estimate_sample(self, path):
+        return self.estimate(Path(path).read_text())
+
+    def run_program(self, source, inputs):
+        program = AssemblyParser().parse(source)
+        machine = RASP(input_device=FakeInputDevice(inputs),
+                       output_device=FakeOutputDevice())
+        profiler = Profiler()
+        machine.cpu.attach(profiler)
+        Loader().from_text(machine.memory,
+                           " ".join(str(each) for each in Assembler().assemble(program)))
+        machine.run()
+        return profiler.cycle_count
+
+    def test_program_without_input(self):
+        estimate = self.estimate_sample("samples/multiplication.asm")
+
+        self.assertEqual(Polynomial.constant(71), estimate.best)
+        self.assertEqual(Polynomial.constant(71), estimate.worst)
+        self.assertEqual([], estimate.reasons)
+
+    def test_counting_loop(self):
+        estimate = self.estimate(self.COUNTDOWN)
+
+        self.assertEqual(["n"], estimate.inputs)
+        self.assertEqual("6 + 4*n1", str(estimate.best))
+        self.assertEqual("max(0, n)", str(estimate.definitions["n1"]))
+        for value in (-4, 0, 3):
+            self.assertEqual(6 + 4 * max(0, value),
+                             self.run_program(self.COUNTDOWN, [value]))
+
+    def test_induction_across_loops(self):
+        estimate = self.estimate_sample("samples/sum_of_even_integers/2_with_formula.asm")
+
+        self.assertEqual("13 + 24*n1", str(estimate.best))
+        self.assertEqual(estimate.best, estimate.worst)
+        self.assertEqual(["n1", "n1"], [str(each.iterations) for each in estimate.loops])
+        self.assertEqual("ceil(max(0, limit) / 2)", str(estimate.definitions["n1"]))
+
+    def test_nested_loops_bracket_actual_cycles(self):
+        source = Path("samples/sum_of_even_integers/1_with_loop.asm").read_text()
+        estimate = self.estimate(source)
+
+        self.assertEqual("7 + 18*n1", str(estimate.best))
+        self.assertEqual("7 + 22*n1 + 8*m1*n1", str(estimate.worst))
+        self.assertEqual("ceil(i1 / 2)", str(estimate.definitions["n2"]))
+        self.assertEqual(["i1"], estimate.indexes)
+        for limit in (0, 4, 9):
+            n1 = limit + 1
+            m1 = -(-n1 // 2)
+            cycles = self.run_program(source, [limit])
+            self.assertLessEqual(7 + 18 * n1, cycles)
+            self.assertLessEqual(cycles, 7 + 22 * n1 + 8 * m1 * n1)
+
+    def test_unknown_iterations(self):
+        estimate = self.estimate("segment: data\n"
+                                 "    x 1 0\n"
+                                 "segment: code\n"
+                                 "    loop: read x\n"
+                                 "          load 0\n"
+                                 "          add x\n"
+                                 "          jump loop\n"
+                                 "          halt\n")
+
+        self.assertEqual(Polynomial.constant(5), estimate.best)
+        self.assertIsNone(estimate.worst)
+        self.assertFalse(estimate.loops[0].is_known)
+        self.assertIn("exit test", estimate.reasons[0])
+
+    def test_endless_program(self):
+        estimate = self.estimate("segment: code\n"
+                                 "    loop: load 0\n"
+                                 "          jump loop\n"
+                                 "          halt\n")
+
+        self.assertIsNone(estimate.best)
+        self.assertIsNone(estimate.worst)
+        self.assertIn("the program never halts", estimate.reasons)
+
+    def test_self_modifying_code(self):
+        estimate = self.estimate("segment: code\n"
+                                 "    start: load 7\n"
+                                 "           store start\n"
+                                 "           halt\n")
+
+        self.assertIsNone(estimate.worst)
+        self.assertIn("modifies the code", estimate.reasons[0])
+
+    def test_listing(self):
+        estimate = self.estimate(self.COUNTDOWN)
+
+        self.assertEqual([(4, 1, 0), (5, 1, 1), (6, 1, 1), (7, 1, 1), (8, 1, 1), (9, 1, 0)],
+                         estimate.listing)
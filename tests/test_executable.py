@@ -8,9 +8,13 @@
 #
 
 
+from rasp.assembler import ProgramMap
 from rasp.machine import Memory
-from rasp.executable import Loader
+from rasp.executable import BinaryFormat, Executable, Loader
 
+from io import BytesIO, StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
 
@@ -47,6 +51,132 @@ class TestLoader(TestCase):
         self.assertIsNotNone(debug_infos)
         self.assertEqual(10, debug_infos.find_source(0))
 
+    def test_skip_debug_infos(self):
+        debug_infos = self._load.from_stream(self.memory, StringIO("1 23 1 10 0 label"),
+                                             with_debug_infos=False)
+
+        self.assertEqual(23, self.memory.read(0))
+        self.assertIsNone(debug_infos)
+
     def test_invalid_content(self):
         with self.assertRaises(RuntimeError):
             self._load.from_text(self.memory, "2 XX 14")
+
+
+
+class TestBinaryFormat(TestCase):
+
+    def setUp(self):
+        self._load = Loader()
+        self.memory = Memory()
+        self._directory = TemporaryDirectory()
+        self.file_name = Path(self._directory.name) / "program.rx"
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def save_and_load(self, executable, file_format=Loader.BINARY):
+        self._load.save_as(executable, self.file_name, file_format)
+        return self._load.from_file(self.memory, self.file_name)
+
+    def verify_memory_is(self, *cells):
+        for address, value in enumerate(cells):
+            self.assertEqual(value, self.memory.read(address))
+
+    def test_code_and_data(self):
+        debug_infos = self.save_and_load(Executable([8, 2, 7, 0], [(4, 1, -3), (5, 2, 4)]))
+
+        self.verify_memory_is(8, 2, 7, 0, -3, 4, 4)
+        self.assertIsNone(debug_infos)
+
+    def test_unbounded_values(self):
+        self.save_and_load(Executable([8, 2**70], [(2, 1, -2**65)]))
+
+        self.verify_memory_is(8, 2**70, -2**65)
+
+    def test_debug_infos(self):
+        program_map = ProgramMap.from_table([(4, 0, "start"),
+                                             (5, 2, None),
+                                             (2, 4, "value")])
+
+        debug_infos = self.save_and_load(Executable([8, 2, 3, 4], [(4, 1, 5)], program_map))
+
+        self.assertEqual(program_map.as_table(), debug_infos.as_table())
+        self.assertEqual(4, debug_infos.find_address("value"))
+        self.assertEqual(5, debug_infos.find_source(2))
+        self.assertEqual(2, debug_infos.find_address_by_line(5))
+        self.assertEqual(5, debug_infos.size)
+        debug_infos.close()
+
+    def test_text_debug_infos_know_the_program_size(self):
+        program_map = ProgramMap.from_table([(4, 0, "start"), (2, 2, "value")])
+
+        debug_infos = self.save_and_load(Executable([8, 2], [(2, 3, 5)], program_map),
+                                         Loader.TEXT)
+
+        self.assertEqual(5, debug_infos.size)
+
+    def test_load_from_bytes(self):
+        program_map = ProgramMap.from_table([(4, 0, "start"), (2, 2, "value")])
+        self._load.save_as(Executable([8, 2], [(2, 1, 5)], program_map),
+                           self.file_name, Loader.BINARY)
+
+        debug_infos = self._load.from_stream(self.memory, BytesIO(self.file_name.read_bytes()))
+
+        self.verify_memory_is(8, 2, 5)
+        self.assertEqual(2, debug_infos.find_address("value"))
+        self.assertEqual(program_map.as_table(), debug_infos.as_table())
+
+    def test_unknown_symbols(self):
+        program_map = ProgramMap.from_table([(4, 0, "start"), (2, 2, "value")])
+
+        debug_infos = self.save_and_load(Executable([8, 2], [(2, 1, 5)], program_map))
+
+        with self.assertRaises(RuntimeError):
+            debug_infos.find_address("missing")
+        with self.assertRaises(RuntimeError):
+            debug_infos.find_source(1)
+        debug_infos.close()
+
+    def test_skip_debug_infos(self):
+        program_map = ProgramMap.from_table([(4, 0, "start")])
+        self._load.save_as(Executable([8, 2], [], program_map),
+                           self.file_name, Loader.BINARY)
+
+        debug_infos = self._load.from_file(self.memory, self.file_name,
+                                           with_debug_infos=False)
+
+        self.assertIsNone(debug_infos)
+
+    def test_text_is_detected(self):
+        debug_infos = self.save_and_load(Executable([8, 2], [(2, 1, 5)]), Loader.TEXT)
+
+        self.verify_memory_is(8, 2, 5)
+        self.assertIsNone(debug_infos)
+
+    def test_size_does_not_depend_on_reserved_data(self):
+        self._load.save_as(Executable([8, 2], [(2, 1000000, 0)]),
+                           self.file_name, Loader.BINARY)
+
+        self.assertLess(self.file_name.stat().st_size, 200)
+
+    def test_reserved_data_is_loaded(self):
+        self.save_and_load(Executable([8, 2], [(2, 1, 3), (3, 5000, 0), (5003, 2, 7)]))
+
+        self.assertEqual(3, self.memory.read(2))
+        self.assertEqual(0, self.memory.read(4000))
+        self.assertEqual(7, self.memory.read(5004))
+
+    def test_header_starts_with_magic(self):
+        self._load.save_as(Executable([7, 0]), self.file_name, Loader.BINARY)
+
+        self.assertTrue(self.file_name.read_bytes().startswith(BinaryFormat.MAGIC))
+
+    def test_unsupported_version(self):
+        self._load.save_as(Executable([7, 0]), self.file_name, Loader.BINARY)
+        content = bytearray(self.file_name.read_bytes())
+        content[len(BinaryFormat.MAGIC)] = BinaryFormat.VERSION + 1
+        self.file_name.write_bytes(content)
+
+        with self.assertRaises(RuntimeError):
+            self._load.from_file(self.memory, self.file_name)
@@ -0,0 +1,94 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from rasp.fuzz import ENGINES, Case, Generator, Outcome, compare, fuzz, run_reference
+
+from unittest import TestCase
+from unittest.mock import patch
+
+
+
+def run_without_subtract(case, max_cycles):
+    image = [8 if each == 5 else each for each in case.image]
+    return run_reference(Case(case.seed, image, case.inputs), max_cycles)
+
+
+
+class GeneratorTest(TestCase):
+
+    def test_same_seed_gives_the_same_case(self):
+        first, second = Generator(12).case(), Generator(12).case()
+        self.assertEqual((first.image, first.inputs), (second.image, second.inputs))
+
+    def test_different_seeds_give_different_cases(self):
+        self.assertNotEqual(Generator(1).case().image, Generator(2).case().image)
+
+
+
+class EngineTest(TestCase):
+
+    ENGINES = list(ENGINES)
+
+    def check(self, image, inputs=None, status=Outcome.HALTED):
+        case = Case(0, image, inputs or [])
+        self.assertIsNone(compare(case, self.ENGINES, 100))
+        self.assertEqual(status, run_reference(case, 100).status)
+
+    def test_jump_into_data(self):
+        self.check([8, 0, 6, 5, 7, 1, 2, 3])
+
+    def test_undefined_opcode(self):
+        self.check([1, 3, 42, 0])
+
+    def test_self_modifying_code(self):
+        self.check([8, 7, 4, 4, 1, 0])
+
+    def test_write_out_of_memory(self):
+        self.check([4, 1000], status=Outcome.ERROR)
+
+    def test_halt_at_the_end_of_memory(self):
+        self.check([6, 999])
+
+    def test_missing_input(self):
+        self.check([2, 10], status=Outcome.ERROR)
+
+    def test_infinite_loop(self):
+        self.check([6, 0], status=Outcome.TIMEOUT)
+
+
+
+class ShrinkerTest(TestCase):
+
+    @patch.dict(ENGINES, { "broken": run_without_subtract })
+    def test_shrinks_to_the_faulty_instruction(self):
+        engines = ["reference", "broken"]
+        mismatch = fuzz(seed=0, runs=50, engines=["broken"])[0]
+        self.assertEqual("broken", mismatch.engine)
+        self.assertIn(5, mismatch.case.image)
+        self.assertLessEqual(len(mismatch.case.image), 4)
+        self.assertIsNotNone(compare(mismatch.case, engines, 10000))
+
+
+
+class FuzzTest(TestCase):
+
+    def test_engines_agree(self):
+        self.assertEqual([], fuzz(seed=0, runs=100))
+
+    def test_parallel_runs(self):
+        self.assertEqual([], fuzz(seed=100, runs=20, jobs=2))
+
+    def test_unknown_engine(self):
+        with self.assertRaises(RuntimeError):
+            fuzz(engines=["turbo"])
+
+    def test_reference_alone(self):
+        with self.assertRaises(RuntimeError):
+            fuzz(engines=["reference"])
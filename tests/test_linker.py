@@ -0,0 +1,123 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from rasp.assembler import Assembler
+from rasp.assembly.parser import AssemblyParser
+from rasp.executable import Loader
+from rasp.linker import Linker, ObjectFile
+from rasp.machine import RASP
+
+from tests.fakes import FakeInputDevice, FakeOutputDevice
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+
+
+class LinkerTest(TestCase):
+
+    MAIN = ("segment: data\n"
+            "    value 1 0\n"
+            "segment: code\n"
+            "    start: read value\n"
+            "           load 0\n"
+            "           jump twice\n")
+
+    LIBRARY = ("segment: data\n"
+               "    result 1 0\n"
+               "segment: code\n"
+               "    twice: load 0\n"
+               "           add value\n"
+               "           add value\n"
+               "           store result\n"
+               "           print result\n"
+               "           halt 0\n")
+
+    def compile(self, source, name):
+        program = AssemblyParser().parse(source)
+        return Assembler().compile(program, name=name)
+
+    def run_executable(self, executable, *inputs):
+        machine = RASP(input_device=FakeInputDevice(list(inputs)),
+                       output_device=FakeOutputDevice())
+        machine.memory.load_image(0, executable.image)
+        machine.run()
+        return machine.output_device.values
+
+    def test_imports_and_relocations(self):
+        main = self.compile(self.MAIN, "main")
+
+        self.assertEqual({"value": 6, "start": 0}, main.exports)
+        self.assertEqual({"twice": [5]}, main.imports)
+        self.assertEqual([1], main.relocations)
+
+    def test_link_two_modules(self):
+        executable = Linker().link([self.compile(self.MAIN, "main"),
+                                    self.compile(self.LIBRARY, "library")])
+
+        self.assertEqual([42], self.run_executable(executable, 21))
+        self.assertEqual(18, executable.debug_infos.find_address("value"))
+        self.assertEqual(19, executable.debug_infos.find_address("result"))
+        self.assertEqual(6, executable.debug_infos.find_address("twice"))
+
+    def test_lines_are_looked_up_per_module(self):
+        executable = Linker().link([self.compile(self.MAIN, "main"),
+                                    self.compile(self.LIBRARY, "library")])
+
+        with TemporaryDirectory() as directory:
+            for each_format in (Loader.TEXT, Loader.BINARY):
+                file_name = str(Path(directory) / f"program.{each_format}")
+                Loader.save_as(executable, file_name, each_format)
+                debug_infos = Loader().from_file(RASP().memory, file_name)
+
+                self.assertEqual("library", debug_infos.find_module(6))
+                self.assertEqual("main", debug_infos.find_module(18))
+                self.assertEqual(0, debug_infos.find_address_by_line(4))
+                self.assertEqual(6, debug_infos.find_address_by_line(4, "library"))
+                self.assertEqual(4, debug_infos.find_source(6, "library"))
+                with self.assertRaises(RuntimeError):
+                    debug_infos.find_source(6)
+                if each_format == Loader.BINARY:
+                    debug_infos.close()
+
+    def test_duplicated_module(self):
+        with self.assertRaises(RuntimeError):
+            Linker().link([self.compile(self.MAIN, "main"),
+                           self.compile(self.LIBRARY, "main")])
+
+    def test_unresolved_symbol(self):
+        with self.assertRaises(RuntimeError):
+            Linker().link([self.compile(self.MAIN, "main")])
+
+    def test_ambiguous_symbol(self):
+        with self.assertRaises(RuntimeError):
+            Linker().link([self.compile(self.MAIN, "main"),
+                           self.compile(self.LIBRARY, "library"),
+                           self.compile(self.LIBRARY, "copy")])
+
+    def test_local_labels_are_qualified(self):
+        executable = Linker().link([self.compile(self.MAIN, "main"),
+                                    self.compile(self.LIBRARY, "library"),
+                                    self.compile(self.MAIN.replace("twice", "start")
+                                                 .replace("value", "other"), "other")])
+
+        self.assertEqual(0, executable.debug_infos.find_address("main.start"))
+        self.assertEqual(18, executable.debug_infos.find_address("other.start"))
+
+    def test_save_and_read(self):
+        module = self.compile(self.LIBRARY, "library")
+        with TemporaryDirectory() as directory:
+            object_file = Path(directory) / "library.ro"
+            module.save_as(object_file)
+
+            loaded = ObjectFile.read_from(object_file)
+
+        self.assertEqual(module.__dict__, loaded.__dict__)
@@ -9,10 +9,13 @@
 
 
 from rasp.instructions import Print, Halt, Read, Load, Add, Subtract, JumpIfPositive, Store
-from rasp.machine import RASP, Profiler
+from rasp.machine import MappedMemory, Memory, RAM, RASP, Profiler
 
 from tests.fakes import FakeInputDevice, FakeOutputDevice
 
+from array import array
+from os import remove
+from tempfile import NamedTemporaryFile
 from unittest import TestCase
 
 
@@ -130,3 +133,127 @@ class TestRASP(TestCase):
         self.machine.run()
 
         self.assertEqual(122, self.journal.values[0])
+
+
+
+class TestRAM(TestCase):
+
+    def setUp(self):
+        self.user = FakeInputDevice()
+        self.journal = FakeOutputDevice()
+
+    def _run(self, *instructions):
+        image = [cell for each in instructions for cell in each.cells]
+        machine = RAM(RAM.compile(image), self.user, self.journal)
+        machine.memory.load_image(0, image)
+        machine.run()
+        return machine
+
+    def test_add_two_values(self):
+        self.user.inputs = [34, 27]
+
+        self._run(Read(50),
+                  Read(51),
+                  Add(50),
+                  Add(51),
+                  Store(52),
+                  Print(52))
+
+        self.assertEqual(34 + 27, self.journal.values[-1])
+
+    def test_code_cannot_be_modified(self):
+        machine = self._run(Load(7),
+                            Store(4),
+                            Load(5),
+                            Store(11),
+                            Print(11))
+
+        self.assertEqual([5], self.journal.values)
+        self.assertEqual(7, machine.memory.peek(4))
+
+    def test_halt_outside_the_program(self):
+        machine = self._run(Load(1),
+                            JumpIfPositive(100))
+
+        self.assertTrue(machine.is_stopped)
+        self.assertEqual(102, machine.cpu.instruction_pointer)
+
+
+
+class TestMemory(TestCase):
+
+    def setUp(self):
+        self.memory = Memory(capacity=10)
+        self.profiler = Profiler()
+        self.memory.attach(self.profiler)
+
+    def test_load_image(self):
+        self.memory.load_image(2, [5, 6, 7])
+
+        self.assertEqual([0, 0, 5, 6, 7], [self.memory.read(address)
+                                           for address in range(5)])
+
+    def test_load_image_is_not_observed(self):
+        self.memory.load_image(0, [5, 6, 7])
+
+        self.assertEqual([], self.profiler.memory_coverage)
+
+    def test_load_image_beyond_capacity(self):
+        self.memory.load_image(8, [1, 2, 3, 4])
+
+        self.assertEqual(4, self.memory.read(11))
+
+    def test_fill(self):
+        self.memory.load_image(0, [5, 6, 7, 8])
+
+        self.memory.fill(1, 2, 0)
+
+        self.assertEqual([5, 0, 0, 8], [self.memory.read(address)
+                                        for address in range(4)])
+
+    def test_fill_beyond_capacity(self):
+        self.memory.fill(8, 4, 3)
+
+        self.assertEqual([0, 3, 3, 3, 3], [self.memory.read(address)
+                                           for address in range(7, 12)])
+
+
+
+class TestMappedMemory(TestMemory):
+
+    def setUp(self):
+        self.memory = MappedMemory(capacity=10)
+        self.addCleanup(self.memory.close)
+        self.profiler = Profiler()
+        self.memory.attach(self.profiler)
+
+    def test_read_beyond_capacity(self):
+        with self.assertRaises(IndexError):
+            self.memory.read(10)
+
+    def test_write_a_value_too_large(self):
+        with self.assertRaises(OverflowError):
+            self.memory.write(3, 2 ** 64)
+
+    def test_persist_cells(self):
+        with NamedTemporaryFile(suffix=".bin", delete=False) as cells:
+            self.addCleanup(remove, cells.name)
+        with MappedMemory(4, cells.name) as memory:
+            memory.load_image(0, [1, 2])
+            memory.write(3, -5)
+
+        with open(cells.name, "rb") as source:
+            words = array(MappedMemory.WORD, source.read())
+        self.assertEqual([1, 2, 0, -5], words.tolist())
+
+    def test_run_a_program(self):
+        journal = FakeOutputDevice()
+        machine = RASP(FakeInputDevice(), journal, self.memory)
+        machine.memory.load_program(
+            Load(20),
+            Store(8),
+            Print(8))
+
+        machine.run()
+
+        self.assertEqual(20, journal.values[-1])
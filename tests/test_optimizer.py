@@ -0,0 +1,153 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from rasp.assembly.ast import AssemblyProgram, Declaration, Operation
+from rasp.assembly.optimizer import PeepholeOptimizer
+from rasp.program import Program
+
+from unittest import TestCase
+
+
+
+class PeepholeOptimizerTest(TestCase):
+
+    def setUp(self):
+        self.optimizer = PeepholeOptimizer()
+
+    def optimize(self, *code):
+        program = AssemblyProgram(data=[Declaration("x", 1, 0)],
+                                  code=list(code))
+        return self.optimizer.optimize(program).code
+
+    def test_jump_to_jump(self):
+        code = self.optimize(
+            Operation("jump", "first"),
+            Operation("print", "x"),
+            Operation("jump", "second", label="first"),
+            Operation("halt", 0, label="second"))
+
+        self.assertEqual("second", code[0].operand)
+        self.assertEqual(1, self.optimizer.report[PeepholeOptimizer.JUMP_THREADING])
+
+    def test_jump_skips_a_known_load(self):
+        code = self.optimize(
+            Operation("load", 0, label="loop"),
+            Operation("add", "x"),
+            Operation("store", "x"),
+            Operation("load", 0),
+            Operation("jump", "loop"))
+
+        self.assertEqual(Operation("jump", "loop_next"), code[-1])
+        self.assertEqual("loop_next", code[1].label)
+
+    def test_store_then_add(self):
+        code = self.optimize(
+            Operation("store", "x"),
+            Operation("load", 0),
+            Operation("add", "x"),
+            Operation("print", "x"))
+
+        self.assertEqual([Operation("store", "x"), Operation("print", "x")], code)
+
+    def test_consecutive_loads(self):
+        code = self.optimize(
+            Operation("load", 3),
+            Operation("load", 4),
+            Operation("store", "x"))
+
+        self.assertEqual([Operation("load", 4), Operation("store", "x")], code)
+
+    def test_dead_code_after_halt(self):
+        code = self.optimize(
+            Operation("halt", 0),
+            Operation("print", "x"),
+            Operation("print", "x", label="end"))
+
+        self.assertEqual([Operation("halt", 0),
+                          Operation("print", "x", label="end")], code)
+
+    def test_dead_code_after_unconditional_jump(self):
+        code = self.optimize(
+            Operation("load", 1),
+            Operation("jump", "end"),
+            Operation("print", "x"),
+            Operation("print", "x", label="end"))
+
+        self.assertEqual([Operation("load", 1),
+                          Operation("print", "x", label="end")], code)
+        self.assertEqual(2, self.optimizer.report[PeepholeOptimizer.DEAD_CODE])
+
+    def test_keeps_source_locations(self):
+        code = self.optimize(
+            Operation("load", 3, location=4),
+            Operation("load", 4, location=5),
+            Operation("store", "x", location=6))
+
+        self.assertEqual([5, 6], [each.location for each in code])
+
+    def test_refuses_absolute_addresses(self):
+        code = self.optimize(
+            Operation("load", 3),
+            Operation("load", 4),
+            Operation("jump", 0))
+
+        self.assertEqual(3, len(code))
+        self.assertIsNotNone(self.optimizer.refusal)
+
+    def test_refuses_self_modifying_code(self):
+        self.optimize(
+            Operation("load", 3, label="start"),
+            Operation("store", "start"))
+
+        self.assertIsNotNone(self.optimizer.refusal)
+
+    def test_refuses_loading_a_label_address(self):
+        code = self.optimize(
+            Operation("load", "x"),
+            Operation("jump", "end"),
+            Operation("print", "x"),
+            Operation("halt", 0, label="end"))
+
+        self.assertEqual(4, len(code))
+        self.assertIn("'x'", self.optimizer.refusal)
+
+    def test_generated_labels_avoid_data_labels(self):
+        program = AssemblyProgram(
+            data=[Declaration("x", 1, 0), Declaration("loop_next", 1, 0)],
+            code=[Operation("load", 0, label="loop"),
+                  Operation("add", "x"),
+                  Operation("store", "x"),
+                  Operation("load", 0),
+                  Operation("jump", "loop")])
+
+        code = self.optimizer.optimize(program).code
+
+        self.assertEqual("loop_next_", code[1].label)
+        self.assertEqual(Operation("jump", "loop_next_"), code[-1])
+
+    def test_preserves_outputs_of_programs_loading_addresses(self):
+        source = ("segment: data\n"
+                  "  x 1 0\n"
+                  "  y 1 0\n"
+                  "segment: code\n"
+                  "        load x\n"
+                  "        store y\n"
+                  "        print y\n"
+                  "        load 0\n"
+                  "        jump next\n"
+                  "        print x\n"
+                  "  next: load y\n"
+                  "        jump done\n"
+                  "  done: halt 0\n")
+
+        outputs, _ = Program.from_assembly(source).run()
+        optimized_outputs, _ = Program.from_assembly(source, optimize=True).run()
+
+        self.assertEqual(outputs, optimized_outputs)
@@ -0,0 +1,123 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import rasp
+
+from rasp.assembler import Assembler
+from rasp.assembly.parser import AssemblyParser
+from rasp.executable import Loader
+from rasp.machine import RAM
+from rasp.program import Program
+
+from unittest import TestCase
+from unittest.mock import patch
+
+
+
+DOUBLE = """
+segment: data
+  value   1  0
+segment: code
+  start: read value
+         load 0
+         add value
+         add value
+         store value
+         print value
+         halt 0
+"""
+
+LOOP = """
+segment: code
+  start: load 0
+         jump start
+"""
+
+
+
+class ProgramTest(TestCase):
+
+    def setUp(self):
+        self.program = Program.from_assembly(DOUBLE)
+
+    def test_from_assembly(self):
+        self.assertEqual(15, self.program.size)
+        self.assertEqual(0, self.program.program_map.find_address("start"))
+
+    def test_from_files(self):
+        executable = Assembler().build(AssemblyParser().parse(DOUBLE))
+        with TemporaryDirectory() as directory:
+            for each_format in (Loader.TEXT, Loader.BINARY):
+                file_name = str(Path(directory) / f"double.{each_format}")
+                Loader.save_as(executable, file_name, each_format)
+                program = Program.from_file(file_name)
+                self.assertEqual(self.program.image, program.image)
+                self.assertEqual(14, program.program_map.find_address("value"))
+
+    def test_image_is_immutable(self):
+        with self.assertRaises(TypeError):
+            self.program.image[0] = 7
+
+    def test_machines_do_not_share_memory(self):
+        first = self.program.instantiate([3])
+        first.run()
+        second = self.program.instantiate([4])
+        self.assertEqual(0, second.memory.peek(14))
+        self.assertEqual(6, first.memory.peek(14))
+
+    def test_run(self):
+        outputs, statistics = self.program.run([21])
+        self.assertEqual([42], outputs)
+        self.assertEqual(7, statistics.cycles)
+        self.assertTrue(statistics.is_halted)
+
+    def test_run_with_a_cycle_budget(self):
+        outputs, statistics = Program.from_assembly(LOOP).run(max_cycles=10)
+        self.assertEqual(10, statistics.cycles)
+        self.assertFalse(statistics.is_halted)
+
+    def test_compiled_forms_are_cached(self):
+        compilations = []
+        compile = lambda program: compilations.append(program) or len(compilations)
+        self.assertEqual(1, self.program.compiled("engine", compile))
+        self.assertEqual(1, self.program.compiled("engine", compile))
+        self.assertEqual([self.program], compilations)
+
+    def test_run_on_a_ram_machine(self):
+        outputs, statistics = self.program.run([21], ram=True)
+        self.assertEqual([42], outputs)
+        self.assertEqual(7, statistics.cycles)
+
+    def test_ram_runs_through_the_fast_loop(self):
+        with patch.object(RAM, "run_one_cycle", side_effect=AssertionError):
+            outputs, statistics = rasp.run(self.program, [21], ram=True)
+        self.assertEqual([42], outputs)
+        self.assertEqual(7, statistics.cycles)
+
+    def test_ram_run_with_a_cycle_budget(self):
+        outputs, statistics = Program.from_assembly(LOOP).run(max_cycles=10, ram=True)
+        self.assertEqual(10, statistics.cycles)
+        self.assertFalse(statistics.is_halted)
+
+    def test_ram_machines_share_the_compiled_code(self):
+        first = self.program.instantiate([3], ram=True)
+        second = self.program.instantiate([4], ram=True)
+        self.assertIs(first.program, second.program)
+
+    def test_optimized(self):
+        optimized = Program.from_assembly(DOUBLE, optimize=True)
+        self.assertEqual([42], optimized.run([21])[0])
+
+    def test_rasp_run(self):
+        outputs, statistics = rasp.run(self.program, [5])
+        self.assertEqual([10], outputs)
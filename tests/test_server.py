@@ -0,0 +1,150 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from hashlib import sha256
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Thread
+
+import json
+import socket
+
+from rasp.assembler import Assembler
+from rasp.assembly.parser import AssemblyParser
+from rasp.executable import Loader
+from rasp.server import Client, ImageStore, JobServer
+
+from unittest import TestCase
+
+
+
+ECHO = """
+segment: data
+  value   1  0
+segment: code
+  read value
+  print value
+  print value
+  halt 0
+"""
+
+
+
+class ImageStoreTest(TestCase):
+
+    def setUp(self):
+        self.executable = Assembler().build(AssemblyParser().parse(ECHO), False)
+
+    def encode(self, file_format):
+        with TemporaryDirectory() as directory:
+            executable_file = Path(directory) / "echo.rx"
+            Loader.save_as(self.executable, executable_file, file_format)
+            return executable_file.read_bytes()
+
+    def test_keeps_only_the_loaded_cells(self):
+        for file_format in (Loader.TEXT, Loader.BINARY):
+            content = self.encode(file_format)
+            image = ImageStore().add(sha256(content).hexdigest(), content)
+            self.assertEqual(self.executable.image, image)
+
+
+
+class JobServerTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = TemporaryDirectory()
+        home = Path(cls.directory.name)
+        cls.socket_path = str(home / "rasp.sock")
+        cls.executable = str(home / "echo.rx")
+        program = AssemblyParser().parse(ECHO)
+        Loader.save_as(Assembler().build(program, False), cls.executable)
+        cls.server = JobServer(cls.socket_path, workers=1, max_cycles=100)
+        cls.thread = Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.directory.cleanup()
+
+    def exchange(self, *requests):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(self.socket_path)
+            stream = connection.makefile("rwb")
+            for each in requests:
+                stream.write((each + "\n").encode("utf-8"))
+            stream.flush()
+            connection.shutdown(socket.SHUT_WR)
+            return [json.loads(each) for each in stream]
+
+    def test_execute(self):
+        result = Client(self.socket_path).execute(self.executable, [7])
+        self.assertEqual("halted", result["status"])
+        self.assertEqual([7, 7], result["outputs"])
+        self.assertEqual(4, result["cycles"])
+
+    def test_reuses_loaded_images(self):
+        client = Client(self.socket_path)
+        client.execute(self.executable, [1])
+        hits = self.server.images.hits
+        client.execute(self.executable, [2])
+        self.assertEqual(hits + 1, self.server.images.hits)
+
+    def test_workers_keep_their_images(self):
+        client = Client(self.socket_path)
+        client.execute(self.executable, [1])
+        misses = self.server.worker_misses
+        client.execute(self.executable, [2])
+        self.assertEqual(misses, self.server.worker_misses)
+
+    def test_outputs_are_streamed(self):
+        outputs = []
+        result = Client(self.socket_path).execute(self.executable, [5],
+                                                  on_output=outputs.append)
+        self.assertEqual([5, 5], outputs)
+        key = sha256(Path(self.executable).read_bytes()).hexdigest()
+        replies = self.exchange(json.dumps({ "id": 1, "hash": key, "inputs": [3] }))
+        self.assertEqual(["output", "output", "result"], [each["event"] for each in replies])
+
+    def test_cycle_budget(self):
+        result = Client(self.socket_path).execute(self.executable, [7], 2)
+        self.assertEqual("timeout", result["status"])
+        self.assertEqual([7], result["outputs"])
+
+    def test_missing_input(self):
+        result = Client(self.socket_path).execute(self.executable, [])
+        self.assertEqual("error", result["status"])
+
+    def test_unknown_hash(self):
+        reply, = self.exchange(json.dumps({ "id": 3, "hash": "0" * 64 }))
+        self.assertEqual({ "id": 3, "event": "unknown", "hash": "0" * 64 }, reply)
+
+    def test_executable_not_matching_its_hash(self):
+        reply, = self.exchange(json.dumps({ "id": 3, "hash": "0" * 64,
+                                            "executable": "MTIz" }))
+        self.assertEqual("error", reply["event"])
+
+    def test_invalid_request(self):
+        reply, = self.exchange("this is not JSON")
+        self.assertEqual("error", reply["event"])
+
+    def test_several_jobs_on_one_connection(self):
+        Client(self.socket_path).execute(self.executable, [0])
+        key = sha256(Path(self.executable).read_bytes()).hexdigest()
+        replies = self.exchange(*[json.dumps({ "id": index, "hash": key, "inputs": [index] })
+                                  for index in range(3)])
+        results = { each["id"]: each for each in replies if each["event"] == "result" }
+        self.assertEqual({0, 1, 2}, set(results))
+
+    def test_missing_server(self):
+        with self.assertRaises(ConnectionError):
+            Client(self.socket_path + ".missing").execute(self.executable, [])
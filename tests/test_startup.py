@@ -0,0 +1,74 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import subprocess
+import sys
+
+from rasp.cli import Controller
+
+from unittest import TestCase
+
+
+
+class ExecuteStartupTest(TestCase):
+
+    NEEDLESS_MODULES = [
+        "pyparsing",
+        "logging",
+        "json",
+        "concurrent.futures",
+        "rasp.assembly.parser",
+        "rasp.analysis",
+        "rasp.debug",
+        "rasp.estimation",
+        "rasp.fuzz",
+        "rasp.testing"
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        with TemporaryDirectory() as directory:
+            source = Path(directory) / "test.asm"
+            source.write_text("segment: data\n"
+                              "  value 1 5\n"
+                              "segment: code\n"
+                              "  print value\n"
+                              "  halt\n")
+            Controller(StringIO()).run(["rasp", "assemble", str(source)])
+            cls.imports = cls._imported_modules(str(source.with_suffix(".rx")))
+
+    @staticmethod
+    def _imported_modules(executable_file):
+        script = "from rasp.cli import Controller; " \
+            f"Controller().run(['rasp', 'execute', {executable_file!r}])"
+        root = str(Path(__file__).resolve().parent.parent)
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", script],
+                                 cwd=root,
+                                 stdout=subprocess.DEVNULL,
+                                 stderr=subprocess.PIPE,
+                                 universal_newlines=True)
+        imports = []
+        for each_line in process.stderr.splitlines():
+            if not each_line.startswith("import time:") or "cumulative" in each_line:
+                continue
+            name = each_line.split("|")[-1]
+            imports.append(name.strip())
+        return imports
+
+    def test_imports_only_what_execute_needs(self):
+        self.assertIn("rasp.cli", self.imports)
+        for each in self.NEEDLESS_MODULES:
+            self.assertFalse([name for name in self.imports
+                              if name == each or name.startswith(each + ".")],
+                             f"'rasp execute' should not import '{each}'")
@@ -0,0 +1,142 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from tempfile import TemporaryDirectory
+
+from rasp import testing
+from rasp.coverage import Coverage
+from rasp.executable import BinaryFormat
+from rasp.testing import ImageCache, JUnitReport, Scenario, ScenarioLibrary, ScenarioTest
+
+from unittest import TestCase
+from unittest.mock import patch
+
+
+
+ECHO = """
+segment: data
+  value   1  0
+segment: code
+  read value
+  print value
+  halt 0
+"""
+
+LOOP = """
+segment: code
+  start: load 0
+         jump start
+"""
+
+
+
+class ScenarioLibraryTest(TestCase):
+
+    def test_reads_all_scenarios(self):
+        scenarios = ScenarioLibrary("tests/acceptance").all()
+        self.assertEqual(["Addition", "Multiplication"],
+                         [each.name for each in scenarios])
+        self.assertEqual(5, len(scenarios[1].tests))
+        self.assertEqual(13, scenarios[1].offset)
+
+    def test_missing_directory(self):
+        with self.assertRaises(FileNotFoundError):
+            ScenarioLibrary("does/not/exist").all()
+
+
+
+class ImageCacheTest(TestCase):
+
+    def test_compiles_each_program_once(self):
+        cache = ImageCache()
+        first = cache.image_of(Scenario("first", ECHO, []))
+        second = cache.image_of(Scenario("second", ECHO, []))
+        self.assertIs(first, second)
+        self.assertEqual((1, 1), (cache.misses, cache.hits))
+
+    def test_reuses_images_saved_on_disk(self):
+        with TemporaryDirectory() as directory:
+            expected = ImageCache(directory).image_of(Scenario("echo", ECHO, []))
+            cache = ImageCache(directory)
+            self.assertEqual(expected, cache.image_of(Scenario("echo", ECHO, [])))
+            self.assertEqual((0, 1), (cache.misses, cache.hits))
+
+    def test_ignores_images_of_another_format_version(self):
+        with TemporaryDirectory() as directory:
+            ImageCache(directory).image_of(Scenario("echo", ECHO, []))
+            with patch.object(BinaryFormat, "VERSION", BinaryFormat.VERSION + 1):
+                cache = ImageCache(directory)
+                cache.image_of(Scenario("echo", ECHO, []))
+            self.assertEqual((1, 0), (cache.misses, cache.hits))
+
+
+
+class TestRunnerTest(TestCase):
+
+    def run_tests(self, program, *tests, jobs=1, max_cycles=1000):
+        runner = testing.TestRunner(jobs=jobs, max_cycles=max_cycles)
+        return runner.run([Scenario("scenario", program, list(tests))])
+
+    def test_passed(self):
+        result, = self.run_tests(ECHO, ScenarioTest("echo", [5], [5]))
+        self.assertEqual(testing.TestResult.PASSED, result.status)
+        self.assertEqual(3, result.cycles)
+
+    def test_failed(self):
+        result, = self.run_tests(ECHO, ScenarioTest("echo", [5], [6]))
+        self.assertEqual(testing.TestResult.FAILED, result.status)
+        self.assertEqual([5], result.outputs)
+
+    def test_error_when_inputs_are_missing(self):
+        result, = self.run_tests(ECHO, ScenarioTest("echo", [], [5]))
+        self.assertEqual(testing.TestResult.ERROR, result.status)
+
+    def test_timeout(self):
+        result, = self.run_tests(LOOP, ScenarioTest("loop", [], []), max_cycles=50)
+        self.assertEqual(testing.TestResult.TIMEOUT, result.status)
+        self.assertEqual(50, result.cycles)
+
+    def test_invalid_program(self):
+        result, = self.run_tests("this is not assembly", ScenarioTest("any", [], []))
+        self.assertEqual(testing.TestResult.ERROR, result.status)
+
+    def test_parallel_run_keeps_the_order(self):
+        results = self.run_tests(ECHO,
+                                 *[ScenarioTest(str(value), [value], [value])
+                                   for value in range(6)],
+                                 jobs=2)
+        self.assertEqual([str(value) for value in range(6)],
+                         [each.name for each in results])
+        self.assertTrue(all(each.is_success for each in results))
+
+    def test_parallel_run_collects_coverage(self):
+        tests = [ScenarioTest(str(value), [value], [value]) for value in range(4)]
+        coverages = []
+        for jobs in (1, 2):
+            coverage = Coverage()
+            runner = testing.TestRunner(jobs=jobs, max_cycles=1000, coverage=coverage)
+            runner.run([Scenario("scenario", ECHO, tests)])
+            coverages.append(coverage.lines("scenario"))
+        self.assertEqual(coverages[0], coverages[1])
+        self.assertEqual({5: 4, 6: 4, 7: 4}, coverages[1])
+
+
+
+class JUnitReportTest(TestCase):
+
+    def test_reports_failures_and_cycles(self):
+        runner = testing.TestRunner(max_cycles=1000)
+        results = runner.run([Scenario("echo", ECHO, [ScenarioTest("ok", [1], [1]),
+                                                      ScenarioTest("ko", [1], [2])])])
+        suite = JUnitReport(results).as_xml().find("testsuite")
+        self.assertEqual(("2", "1", "0"),
+                         (suite.get("tests"), suite.get("failures"), suite.get("errors")))
+        cycles = [each.get("value") for each in suite.iter("property")]
+        self.assertEqual(["3", "3"], cycles)
@@ -0,0 +1,91 @@
+#
+# This file is part of rasp-machine.
+#
+# Copyright (C) 2021 by Franck Chauvel
+#
+# This code is licensed under the MIT License.
+# See LICENSE.txt for details
+#
+
+
+from io import StringIO
+
+import json
+
+from rasp.assembler import ProgramMap
+from rasp.instructions import Add, Halt, JumpIfPositive, Load, Print, Read, Store, Subtract
+from rasp.machine import RASP
+from rasp.timeline import Timeline
+
+from tests.fakes import FakeInputDevice, FakeOutputDevice
+
+from unittest import TestCase
+
+
+
+class TimelineTest(TestCase):
+
+    def setUp(self):
+        self.journal = FakeOutputDevice()
+        self.machine = RASP(FakeInputDevice([3]), self.journal)
+        self.machine.memory.load_program(
+            Read(20),            # 0: start
+            Load(0),             # 2: loop
+            Add(20),             # 4
+            Subtract(21),        # 6
+            Store(20),           # 8
+            JumpIfPositive(2),   # 10
+            Print(20),           # 12: done
+            Halt()               # 14
+        )
+        self.machine.memory.load_image(20, [0, 1])
+        self.program_map = ProgramMap.from_table([
+            (1, 0, "start"),
+            (2, 2, "loop"),
+            (3, 12, "done"),
+            (4, 20, "counter"),
+            (5, 21, "one")
+        ])
+
+    def record(self, bucket, program_map=None, cells=None):
+        output = StringIO()
+        timeline = Timeline(output, self.machine, program_map, cells, bucket)
+        timeline.attach()
+        self.machine.run()
+        timeline.close()
+        return json.loads(output.getvalue())["traceEvents"]
+
+    def spans(self, events):
+        return [(each["name"], each["ts"], each["dur"])
+                for each in events if each["ph"] == "X"]
+
+    def test_spans_follow_labels(self):
+        events = self.record(1, self.program_map)
+        self.assertEqual([("start", 0, 1), ("loop", 1, 20), ("done", 21, 2)],
+                         self.spans(events))
+
+    def test_without_labels(self):
+        events = self.record(1)
+        self.assertEqual([(Timeline.ENTRY, 0, 23)], self.spans(events))
+
+    def test_buckets_aggregate_spans(self):
+        events = self.record(10, self.program_map)
+        self.assertEqual([("loop", 0, 20), ("done", 20, 3)], self.spans(events))
+
+    def test_counters(self):
+        events = self.record(5, self.program_map, {"counter": 20})
+        values = [each["args"]["value"] for each in events
+                  if each["ph"] == "C" and each["name"] == "counter"]
+        self.assertEqual([3, 2, 1, 0, -1], values)
+
+    def test_input_and_output(self):
+        events = self.record(1000)
+        instants = [(each["name"], each["args"]) for each in events if each["ph"] == "i"]
+        self.assertEqual([("print", {"count": 1, "last": -1}),
+                          ("read", {"count": 1, "last": 3})],
+                         instants)
+        self.assertEqual([-1], self.journal.values)
+
+    def test_invalid_bucket(self):
+        with self.assertRaises(RuntimeError):
+            Timeline(StringIO(), self.machine, bucket=0)
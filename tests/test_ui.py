@@ -8,10 +8,15 @@
 #
 
 from io import StringIO
+from tempfile import NamedTemporaryFile
+
+import json
+import os
 
 from rasp.cli import Controller, ErrorCodes
 
 from unittest import TestCase
+from unittest.mock import patch
 
 
 class UiTests(TestCase):
@@ -46,6 +51,15 @@ class UiTests(TestCase):
         self.check_status(ErrorCodes.SOURCE_NOT_FOUND,
                           f"rasp assemble this_is/not_there.asm")
 
+    def test_assemble_with_an_unknown_symbol(self):
+        with NamedTemporaryFile("w", suffix=".asm", delete=False) as source:
+            source.write("segment: code\n   load 0\n   jump nowhere\n")
+        self.addCleanup(os.remove, source.name)
+        for each_command in ("assemble", "analyze", "estimate"):
+            self.check_status(ErrorCodes.SYNTAX_ERROR,
+                              f"rasp {each_command} {source.name}")
+        self.assertFalse(os.path.exists(source.name[:-len(".asm")] + ".rx"))
+
     def test_assemble_with_debug(self):
         self.check_status(ErrorCodes.OK,
                           f"rasp assemble --debug {self.TEST_PROGRAM}")
@@ -54,11 +68,149 @@ class UiTests(TestCase):
         self.check_status(ErrorCodes.OK,
                           f"rasp assemble --output test.rx {self.TEST_PROGRAM}")
 
+    def test_compile_and_link(self):
+        self.check_status(ErrorCodes.OK,
+                          f"rasp assemble -c -o test.ro {self.TEST_PROGRAM}")
+        self.check_status(ErrorCodes.OK,
+                          f"rasp link --debug -o test.rx test.ro")
+
+    def test_link_missing_file(self):
+        self.check_status(ErrorCodes.SOURCE_NOT_FOUND,
+                          f"rasp link -o test.rx not_there.ro")
+
+    def test_analyze(self):
+        self.check_status(ErrorCodes.OK,
+                          f"rasp analyze --dot test.dot {self.TEST_PROGRAM}")
+
+    def test_analyze_executable(self):
+        self.check_status(ErrorCodes.OK,
+                          f"rasp assemble --debug {self.TEST_PROGRAM}")
+        self.check_status(ErrorCodes.OK,
+                          f"rasp analyze {self.TEST_BINARY}")
+
+    def test_analyze_missing_file(self):
+        self.check_status(ErrorCodes.SOURCE_NOT_FOUND,
+                          f"rasp analyze not_there.asm")
+
+    def test_estimate(self):
+        self.check_status(ErrorCodes.OK,
+                          f"rasp estimate {self.TEST_PROGRAM}")
+
+    def test_estimate_missing_file(self):
+        self.check_status(ErrorCodes.SOURCE_NOT_FOUND,
+                          f"rasp estimate not_there.asm")
+
+    def test_debug_script(self):
+        self.check_status(ErrorCodes.OK,
+                          f"rasp assemble --debug {self.TEST_PROGRAM}")
+        with NamedTemporaryFile("w", suffix=".txt", delete=False) as script:
+            script.write("break at line 24\nrun\nshow result\n")
+        self.addCleanup(os.remove, script.name)
+        self.output = StringIO()
+        self.cli = Controller(self.output)
+        self.check_status(ErrorCodes.OK,
+                          f"rasp debug --script {script.name} {self.TEST_BINARY}")
+        records = json.loads(self.output.getvalue())
+        self.assertEqual(60, records[2]["results"][0]["cells"][0]["value"])
+
+    def test_debug_missing_script(self):
+        self.check_status(ErrorCodes.SOURCE_NOT_FOUND,
+                          f"rasp debug --script not_there.txt {self.TEST_BINARY}")
+
+    def test_test_scenarios(self):
+        self.addCleanup(os.remove, "test.xml")
+        self.check_status(ErrorCodes.OK,
+                          "rasp test --jobs 2 --junit test.xml tests/acceptance")
+        with open("test.xml") as report:
+            self.assertIn('name="cycles"', report.read())
+
+    def test_test_with_coverage(self):
+        self.addCleanup(os.remove, "test.info")
+        self.check_status(ErrorCodes.OK,
+                          "rasp test --jobs 2 --coverage test.info tests/acceptance")
+        with open("test.info") as lcov:
+            self.assertIn("acceptance/multiplication.yml", lcov.read())
+
+    def test_test_with_a_tight_cycle_budget(self):
+        self.check_status(ErrorCodes.TEST_FAILURE,
+                          "rasp test --max-cycles 10 tests/acceptance")
+
+    def test_test_without_pyyaml(self):
+        with patch.dict("sys.modules", {"yaml": None}):
+            self.check_status(ErrorCodes.UNKNOWN_ERROR, "rasp test tests/acceptance")
+        self.assertIn("rasp-machine[test]", self.output.getvalue())
+
+    def test_test_missing_directory(self):
+        self.check_status(ErrorCodes.SOURCE_NOT_FOUND,
+                          "rasp test does/not/exist")
+
+    def test_fuzz(self):
+        self.check_status(ErrorCodes.OK,
+                          "rasp fuzz --runs 20 --engine scenario")
+
+    def test_execute_without_server(self):
+        self.check_status(ErrorCodes.OK,
+                          f"rasp assemble {self.TEST_PROGRAM}")
+        self.check_status(ErrorCodes.SERVER_UNAVAILABLE,
+                          f"rasp execute --server missing.sock {self.TEST_BINARY}")
+
     def test_execute(self):
         self.check_status(ErrorCodes.OK,
                           f"rasp assemble {self.TEST_PROGRAM}")
         self.check_status(ErrorCodes.OK, f"rasp execute {self.TEST_BINARY}")
 
+    def test_execute_with_timeline(self):
+        self.check_status(ErrorCodes.OK,
+                          f"rasp assemble --debug {self.TEST_PROGRAM}")
+        self.check_status(ErrorCodes.OK,
+                          f"rasp execute --timeline test.json --track counter {self.TEST_BINARY}")
+        self.addCleanup(os.remove, "test.json")
+        with open("test.json") as timeline:
+            events = json.load(timeline)["traceEvents"]
+        self.assertIn("loop", [each["name"] for each in events])
+
+    def test_execute_with_coverage(self):
+        self.check_status(ErrorCodes.OK,
+                          f"rasp assemble --debug {self.TEST_PROGRAM}")
+        self.addCleanup(os.remove, "test.info")
+        for each_run in range(2):
+            self.check_status(ErrorCodes.OK,
+                              f"rasp execute --coverage test.info {self.TEST_BINARY}")
+        with open("test.info") as lcov:
+            self.assertIn("DA:11,12", lcov.read().splitlines())
+
+    def test_execute_with_coverage_without_debug_infos(self):
+        self.check_status(ErrorCodes.OK,
+                          f"rasp assemble {self.TEST_PROGRAM}")
+        self.check_status(ErrorCodes.MISSING_DEBUG_INFOS,
+                          f"rasp execute --coverage test.info {self.TEST_BINARY}")
+
+    def test_execute_with_a_memory_file(self):
+        self.check_status(ErrorCodes.OK,
+                          f"rasp assemble {self.TEST_PROGRAM}")
+        self.addCleanup(os.remove, "test.mem")
+        self.check_status(ErrorCodes.OK,
+                          f"rasp execute --memory-file test.mem --memory-size 5000 {self.TEST_BINARY}")
+        self.assertEqual(5000 * 8, os.path.getsize("test.mem"))
+
+    def test_execute_on_a_ram_machine(self):
+        self.check_status(ErrorCodes.OK,
+                          f"rasp assemble {self.TEST_PROGRAM}")
+        self.check_status(ErrorCodes.OK,
+                          f"rasp execute --ram --use-profiler {self.TEST_BINARY}")
+
+    def test_execute_with_a_cycle_budget(self):
+        self.check_status(ErrorCodes.OK,
+                          f"rasp assemble {self.TEST_PROGRAM}")
+        self.check_status(ErrorCodes.UNKNOWN_ERROR,
+                          f"rasp execute --max-cycles 3 {self.TEST_BINARY}")
+        self.assertIn("did not halt within 3 cycles", self.output.getvalue())
+
+    def test_execute_binary(self):
+        self.check_status(ErrorCodes.OK,
+                          f"rasp assemble --debug --format binary {self.TEST_PROGRAM}")
+        self.check_status(ErrorCodes.OK, f"rasp execute {self.TEST_BINARY}")
+
     def test_execute_with_profiler(self):
         self.check_status(ErrorCodes.OK,
                           f"rasp assemble {self.TEST_PROGRAM}")